@@ -87,6 +87,10 @@ setuptools.setup(
     download_url='https://github.com/thehyve/tmtk/tarball/{}/'.format(version_string),
 
     install_requires=required_packages,
+    extras_require={
+        # streaming reading and writing of .zst compressed study files
+        'zstd': ['zstandard'],
+    },
 
     setup_requires=[
         # dependency for `python setup.py bdist_wheel`
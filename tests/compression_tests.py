@@ -0,0 +1,67 @@
+import bz2
+import gzip
+import os
+import shutil
+import unittest
+
+import pandas as pd
+
+import tmtk
+from tests.commons import TestBase
+from tmtk.utils import compression
+
+
+def compress(path, opener, extension):
+    with open(path, 'rb') as source, opener(path + extension, 'wb') as target:
+        shutil.copyfileobj(source, target)
+    os.remove(path)
+
+
+class CompressionTests(TestBase):
+
+    @classmethod
+    def setup_class_hook(cls):
+        cls.study_dir = os.path.join(cls.temp_dir, 'valid_study')
+        shutil.copytree(os.path.join(cls.studies_dir, 'valid_study'), cls.study_dir)
+        cls.expected = tmtk.Study(os.path.join(cls.study_dir, 'study.params')).HighDim.cnv.df
+
+        compress(os.path.join(cls.study_dir, 'cnv', 'acgh_data.tsv'), gzip.open, '.gz')
+        compress(os.path.join(cls.study_dir, 'cnv', 'acgh_annotation', 'chromosomal_regions.tsv'), bz2.open, '.bz2')
+
+    def test_compressed_highdim(self):
+        study = tmtk.Study(os.path.join(self.study_dir, 'study.params'))
+        cnv = study.HighDim.cnv
+        self.assertTrue(cnv.path.endswith('acgh_data.tsv.gz'))
+        self.assertTrue(cnv.annotation_file.path.endswith('.bz2'))
+        self.assertEqual(list(cnv.header), list(self.expected.columns))
+        self.assertTrue(cnv.df.equals(self.expected))
+        self.assertTrue(cnv.validate())
+
+    def test_write_and_read(self):
+        df = pd.DataFrame({'a': ['1', '2'], 'b': ['x', 'y']})
+        for extension in ('.gz', '.bz2', '.xz'):
+            path = os.path.join(self.temp_dir, 'file.tsv' + extension)
+            tmtk.utils.df2file(df, path)
+            with open(path, 'rb') as f:
+                self.assertFalse(f.read().startswith(b'a\tb'))
+            self.assertTrue(tmtk.utils.file2df(path).equals(df))
+
+    def test_preload_estimate(self):
+        study = tmtk.Study(os.path.join(self.study_dir, 'study.params'))
+        path = study.HighDim.cnv.path
+        with gzip.open(path, 'rb') as f:
+            text_size = len(f.read())
+        self.assertGreater(text_size, os.path.getsize(path))
+        self.assertEqual(study._preload_estimate(path), text_size * tmtk.options.preload_size_factor)
+
+    def test_find_file(self):
+        path = os.path.join(self.study_dir, 'cnv', 'acgh_data.tsv')
+        self.assertEqual(compression.find_file(path), path + '.gz')
+        self.assertEqual(compression.find_file(path + '.missing'), path + '.missing')
+
+    @unittest.skipIf(compression.zstandard is None, 'zstandard is not installed')
+    def test_zstd(self):
+        df = pd.DataFrame({'a': ['1', '2'], 'b': ['x', 'y']})
+        path = os.path.join(self.temp_dir, 'file.tsv.zst')
+        tmtk.utils.df2file(df, path)
+        self.assertTrue(tmtk.utils.file2df(path).equals(df))
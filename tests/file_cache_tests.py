@@ -0,0 +1,88 @@
+import os
+import shutil
+from unittest.mock import patch
+
+import tmtk
+from tests.commons import TestBase
+from tmtk import options
+from tmtk.utils import file_cache
+
+
+class FileCacheTests(TestBase):
+
+    @classmethod
+    def setup_class_hook(cls):
+        cls.study_dir = os.path.join(cls.temp_dir, 'incomplete')
+        shutil.copytree(os.path.join(cls.studies_dir, 'incomplete'), cls.study_dir)
+        cls.params_path = os.path.join(cls.study_dir, 'study.params')
+
+    def setUp(self):
+        self._default = options.df_cache
+        options.df_cache = True
+
+    def tearDown(self):
+        options.df_cache = self._default
+        tmtk.utils.clear_df_cache(self.study_dir)
+
+    def test_cache_written_and_reused(self):
+        study = tmtk.Study(self.params_path)
+        datafile = study.Clinical.get_datafile('Cell-line_clinical.txt')
+        expected = datafile.df.copy()
+        self.assertTrue(os.path.exists(file_cache.cache_path(datafile.path)))
+
+        with patch('tmtk.utils.filebase.file2df') as file2df:
+            study = tmtk.Study(self.params_path)
+            df = study.Clinical.get_datafile('Cell-line_clinical.txt').df
+            file2df.assert_not_called()
+
+        self.assertTrue(df.equals(expected))
+
+    def test_cache_invalidated_on_change(self):
+        study = tmtk.Study(self.params_path)
+        datafile = study.Clinical.get_datafile('Cell-line_clinical.txt')
+        datafile.df.iloc[0, 1] = 'changed'
+        datafile.save()
+
+        df = tmtk.Study(self.params_path).Clinical.get_datafile('Cell-line_clinical.txt').df
+        self.assertEqual(df.iloc[0, 1], 'changed')
+
+    def test_touched_file_uses_hash(self):
+        study = tmtk.Study(self.params_path)
+        datafile = study.Clinical.get_datafile('Cell-line_clinical.txt')
+        datafile.df
+        path = datafile.path
+        signature = file_cache.file_signature(path, with_hash=True)
+        os.utime(path, ns=(signature['mtime'] + 10 ** 9, signature['mtime'] + 10 ** 9))
+        self.assertTrue(file_cache.signature_matches(signature, path))
+        self.assertIsNotNone(file_cache.read_df_cache(path))
+
+    def test_copied_study_uses_cache(self):
+        datafile = tmtk.Study(self.params_path).Clinical.get_datafile('Cell-line_clinical.txt')
+        datafile.df
+        copy_dir = os.path.join(self.temp_dir, 'incomplete_copy')
+        shutil.copytree(self.study_dir, copy_dir)
+
+        with patch('tmtk.utils.filebase.file2df') as file2df:
+            study = tmtk.Study(os.path.join(copy_dir, 'study.params'))
+            study.Clinical.get_datafile('Cell-line_clinical.txt').df
+            file2df.assert_not_called()
+
+    def test_clear_cache(self):
+        study = tmtk.Study(self.params_path)
+        datafile = study.Clinical.get_datafile('Cell-line_clinical.txt')
+        datafile.df
+        self.assertTrue(os.path.exists(file_cache.cache_path(datafile.path)))
+        study.clear_cache()
+        self.assertFalse(os.path.exists(file_cache.cache_path(datafile.path)))
+
+    def test_cache_dir(self):
+        cache_dir = os.path.join(self.temp_dir, 'cache_dir')
+        try:
+            options.df_cache_dir = cache_dir
+            study = tmtk.Study(self.params_path)
+            study.Clinical.get_datafile('Cell-line_clinical.txt').df
+            self.assertTrue(os.listdir(cache_dir))
+            self.assertTrue(tmtk.utils.clear_df_cache() > 0)
+            self.assertFalse(os.listdir(cache_dir))
+        finally:
+            options.df_cache_dir = ''
@@ -0,0 +1,81 @@
+import os
+import shutil
+from unittest.mock import patch
+
+import tmtk
+from tests.commons import TestBase
+from tmtk.utils import manifest, filebase
+from tmtk.utils.batch._wrapper import file_length
+
+
+class ManifestTests(TestBase):
+
+    @classmethod
+    def setup_class_hook(cls):
+        cls.study_dir = os.path.join(cls.temp_dir, 'valid_study')
+        shutil.copytree(os.path.join(cls.studies_dir, 'valid_study'), cls.study_dir)
+        cls.params_path = os.path.join(cls.study_dir, 'study.params')
+        cls.clinical_path = os.path.join(cls.study_dir, 'clinical', 'Cell-line_clinical.txt')
+
+    def test_minimal_study(self):
+        study = tmtk.Study(self.params_path, minimal=True)
+        manifest_path = os.path.join(self.study_dir, manifest.MANIFEST_NAME)
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+
+        with patch('tmtk.utils.manifest.describe_file') as describe:
+            study.manifest
+            describe.assert_not_called()
+        self.assertFalse(os.path.exists(manifest_path))
+
+        entry = study.refresh_manifest()[self.clinical_path]
+        self.assertEqual(entry['rows'], file_length(self.clinical_path))
+        self.assertEqual(entry['header'][0], 'Cell line name')
+        self.assertTrue(entry['tabs'])
+        self.assertTrue(os.path.exists(manifest_path))
+
+    def test_same_files_as_full_study(self):
+        minimal = tmtk.Study(self.params_path, minimal=True)
+        full = tmtk.Study(self.params_path)
+        self.assertEqual(minimal._manifest_paths(), full._manifest_paths())
+
+    def test_only_changed_files_are_read(self):
+        tmtk.Study(self.params_path, minimal=True).refresh_manifest()
+
+        with open(self.clinical_path, 'a') as f:
+            f.write('extra\trow\n')
+
+        with patch('tmtk.utils.manifest.describe_file', wraps=manifest.describe_file) as describe:
+            study = tmtk.Study(self.params_path, minimal=True)
+            entry = study.manifest[self.clinical_path]
+            describe.assert_called_once_with(self.clinical_path)
+
+        self.assertEqual(entry['rows'], file_length(self.clinical_path))
+
+    def test_batch_items(self):
+        study = tmtk.Study(self.params_path)
+        clinical = study.Clinical
+        expected = sum(file_length(path) for path in clinical._get_lazy_batch_items()[clinical.params.path])
+        self.assertEqual(study._study_total_batch_items[clinical.params.path], expected)
+
+    def test_batch_items_do_not_write_manifest(self):
+        study = tmtk.Study(self.params_path)
+        manifest_path = os.path.join(self.study_dir, manifest.MANIFEST_NAME)
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+
+        batch_items = study._study_total_batch_items
+        self.assertFalse(os.path.exists(manifest_path))
+
+        for hd in study.HighDim.high_dim_files:
+            expected = len(hd.sample_mapping.samples) * file_length(hd.path)
+            self.assertEqual(batch_items[hd.params.path], expected)
+
+    def test_tabs_from_manifest(self):
+        study = tmtk.Study(self.params_path)
+        study.manifest[self.clinical_path]
+        datafile = study.Clinical.get_datafile(os.path.basename(self.clinical_path))
+
+        with patch.object(filebase, 'open_file') as open_file:
+            self.assertTrue(datafile.tabs_in_first_line())
+            open_file.assert_not_called()
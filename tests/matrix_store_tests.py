@@ -0,0 +1,79 @@
+import os
+import shutil
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+import tmtk
+from tests.commons import TestBase
+from tmtk import options
+
+
+class MatrixStoreTests(TestBase):
+
+    @classmethod
+    def setup_class_hook(cls):
+        cls.study_dir = os.path.join(cls.temp_dir, 'valid_study')
+        shutil.copytree(os.path.join(cls.studies_dir, 'valid_study'), cls.study_dir)
+
+    def setUp(self):
+        self.study = tmtk.Study(os.path.join(self.study_dir, 'study.params'))
+
+    def tearDown(self):
+        self.study.clear_cache()
+
+    def test_matrix_equals_dataframe(self):
+        cnv = self.study.HighDim.cnv
+        store = cnv.matrix
+        self.assertIsInstance(store.values, np.memmap)
+        self.assertTrue(os.path.exists(store.matrix_path))
+
+        df = cnv.df
+        self.assertEqual(store.shape, (df.shape[0], df.shape[1] - 1))
+        self.assertEqual(list(store.biomarkers), list(df.iloc[:, 0].astype(str)))
+        np.testing.assert_array_equal(store.values, df.iloc[:, 1:].astype(float).values)
+
+    def test_loc(self):
+        store = self.study.HighDim.rnaseq.matrix
+        biomarkers, columns = list(store.biomarkers[[2, 0]]), list(store.columns[1:3])
+        selection = store.loc(biomarkers, columns)
+        self.assertEqual(list(selection.index), biomarkers)
+        np.testing.assert_array_equal(selection.values, store.values[[2, 0]][:, 1:3])
+        with self.assertRaises(KeyError):
+            store.loc(['not a biomarker'])
+
+    def test_float32(self):
+        store = self.study.HighDim.rnaseq.build_matrix_store(dtype='float32')
+        self.assertEqual(store.values.dtype, np.float32)
+
+    def test_rebuild_on_change(self):
+        expression = [f for f in self.study.HighDim.high_dim_files if isinstance(f, tmtk.highdim.Expression)][0]
+        store = expression.matrix
+        shape = store.shape
+
+        df = pd.read_csv(expression.path, sep='\t', dtype=str)
+        df.iloc[:-1].to_csv(expression.path, sep='\t', index=False)
+        self.assertFalse(store.is_current)
+        self.assertEqual(store.shape, (shape[0] - 1, shape[1]))
+
+    def test_copied_study_uses_store(self):
+        self.study.HighDim.cnv.matrix.values
+        copy_dir = os.path.join(self.temp_dir, 'valid_study_copy')
+        shutil.copytree(self.study_dir, copy_dir)
+
+        study = tmtk.Study(os.path.join(copy_dir, 'study.params'))
+        with patch.object(tmtk.highdim.MatrixStore, 'build') as build:
+            store = study.HighDim.cnv.matrix
+            store.values
+            build.assert_not_called()
+
+    def test_validation_with_store(self):
+        try:
+            options.highdim_matrix_store = True
+            cnv = self.study.HighDim.cnv
+            self.assertTrue(cnv.validate())
+            self.assertFalse(cnv.df_is_loaded)
+            self.assertTrue(cnv.matrix.is_current)
+        finally:
+            options.highdim_matrix_store = False
@@ -1,7 +1,10 @@
-from unittest.mock import patch
+from unittest.mock import patch, PropertyMock
 
 import os
 
+import pandas as pd
+
+import tmtk
 from tests.commons import TestBase, create_study_from_dir
 
 valid_inputs = ['0', '1', '', ''] * 3
@@ -50,3 +53,290 @@ class ReloadTests(TestBase):
     @patch('tmtk.params.base.get_input', side_effect=get_valid_input)
     def test_update_params(self, x):
         self.study.Clinical.params.update()
+
+    def test_change_tracking(self):
+        self.assertEqual(self.study.files_with_changes(), [])
+
+        variable = self.study.Clinical.get_variable(('Cell-line_clinical.txt', 2))
+        original = variable.values.copy()
+        variable.values = variable.values.apply(lambda x: 'changed')
+        self.assertTrue(variable.datafile.df_has_changed)
+
+        variable.values = original
+        self.assertFalse(variable.datafile.df_has_changed)
+
+        variable.data_label = 'New label'
+        self.assertIn(self.study.Clinical.ColumnMapping, self.study.files_with_changes())
+
+        self.study.HighDim.rnaseq.sample_mapping.study_id = 'OTHER'
+        self.assertTrue(self.study.HighDim.rnaseq.sample_mapping.df_has_changed)
+
+    def test_untracked_change(self):
+        datafile = self.study.Clinical.get_datafile('Cell-line_clinical.txt')
+        original = datafile.df.iloc[0, 1]
+        datafile.df.iloc[0, 1] = 'EDITED'
+        self.assertTrue(datafile.df_has_changed)
+        self.assertIn(datafile, self.study.files_with_changes())
+
+        datafile.df.iloc[0, 1] = original
+        self.assertFalse(datafile.df_has_changed)
+
+        datafile.df.iloc[0, 1] = None
+        self.assertTrue(datafile.df_has_changed)
+
+    def test_change_check_without_hashing(self):
+        with patch('tmtk.utils.filebase.hash_df_to_single_int') as hash_df:
+            self.study.Clinical.get_datafile('Cell-line_clinical.txt').df
+            self.assertEqual(self.study.files_with_changes(), [])
+            hash_df.assert_not_called()
+
+    def test_change_tracking_after_save(self):
+        self.study = self.study.write_to(os.path.join(self.temp_dir, 'test_tracking'))
+        column_mapping = self.study.Clinical.ColumnMapping
+        self.study.Clinical.get_variable(('Cell-line_clinical.txt', 2)).data_label = 'New label'
+        self.assertTrue(column_mapping.df_has_changed)
+        column_mapping.save()
+        self.assertFalse(column_mapping.df_has_changed)
+
+    def test_df2file_converts_path_columns_only(self):
+        delim = tmtk.utils.Mappings.PATH_DELIM
+        df = pd.DataFrame({'path': ['a{0}b'.format(delim), 'c'], 'value': ['x{0}y'.format(delim), 1]})
+        path = os.path.join(self.temp_dir, 'df2file', 'file.tsv')
+        tmtk.utils.df2file(df, path, path_columns=[0], chunksize=1)
+
+        self.assertEqual(df.iloc[0, 0], 'a{0}b'.format(delim))
+        with open(path, encoding='utf-8') as f:
+            self.assertEqual(f.read().splitlines(), ['path\tvalue', 'a\\b\tx{0}y'.format(delim), 'c\t1'])
+        self.assertEqual(os.listdir(os.path.dirname(path)), ['file.tsv'])
+
+        with self.assertRaises(tmtk.utils.PathError):
+            tmtk.utils.df2file(df, path)
+
+    def test_preload(self):
+        study = tmtk.Study(self.study.params.path, preload=True, workers=4)
+        self.assertTrue(study.load_timings)
+        for file_object in study.all_files:
+            if file_object.path in study.load_timings:
+                self.assertTrue(file_object.df_is_loaded)
+        self.assertTrue(study.Clinical.get_datafile('Cell-line_clinical.txt').df_is_loaded)
+
+    def test_preload_memory_budget(self):
+        datafile = self.study.Clinical.get_datafile('Cell-line_clinical.txt')
+        timings = self.study.preload(memory_budget=os.path.getsize(datafile.path) / 2 ** 20)
+        self.assertNotIn(datafile.path, timings)
+        self.assertFalse(datafile.df_is_loaded)
+
+    def test_write_to_copies_unchanged_files(self):
+        datafile = self.study.Clinical.get_datafile('Cell-line_clinical.txt')
+        self.assertFalse(datafile.df_is_loaded)
+        self.study.Clinical.get_variable(('Cell-line_clinical.txt', 2)).data_label = 'New label'
+
+        new_dir = os.path.join(self.temp_dir, 'test_copy_through')
+        new_study = self.study.write_to(new_dir)
+        self.assertFalse(datafile.df_is_loaded)
+
+        new_datafile = new_study.Clinical.get_datafile('Cell-line_clinical.txt')
+        with open(datafile.path, 'rb') as a, open(new_datafile.path, 'rb') as b:
+            self.assertEqual(a.read(), b.read())
+        self.assertEqual(new_study.Clinical.get_variable(('Cell-line_clinical.txt', 2)).data_label, 'New label')
+
+    def test_write_to_writes_untracked_changes(self):
+        datafile = self.study.Clinical.get_datafile('Cell-line_clinical.txt')
+        column_mapping = self.study.Clinical.ColumnMapping
+        datafile.df.iloc[0, 1] = 'EDITED'
+        column_mapping.df.iloc[0, 3] = 'EDITLABEL'
+
+        new_dir = os.path.join(self.temp_dir, 'test_untracked_changes')
+        self.study.write_to(new_dir, return_new=False)
+
+        for file_object, value in ((datafile, 'EDITED'), (column_mapping, 'EDITLABEL')):
+            with open(os.path.join(new_dir, 'clinical', file_object.name), encoding='utf-8') as f:
+                self.assertIn(value, f.read())
+
+    def test_write_to_hardlinks(self):
+        try:
+            tmtk.options.write_hardlinks = True
+            new_dir = os.path.join(self.temp_dir, 'test_hardlinks')
+            self.study.write_to(new_dir, return_new=False)
+        finally:
+            tmtk.options.write_hardlinks = False
+
+        datafile = self.study.Clinical.get_datafile('Cell-line_clinical.txt')
+        self.assertTrue(os.path.samefile(datafile.path, os.path.join(new_dir, 'clinical', datafile.name)))
+
+    def test_write_to_reuse_frames(self):
+        datafile = self.study.Clinical.get_datafile('Cell-line_clinical.txt')
+        df = datafile.df
+        new_dir = os.path.join(self.temp_dir, 'test_reuse_frames')
+
+        with patch('tmtk.utils.filebase.file2df', wraps=tmtk.utils.file2df) as file2df:
+            new_study = self.study.write_to(new_dir, reuse_frames=True)
+            new_datafile = new_study.Clinical.get_datafile('Cell-line_clinical.txt')
+            self.assertIs(new_datafile.df, df)
+            self.assertNotIn(new_datafile.path, [c[0][0] for c in file2df.call_args_list])
+
+        self.assertFalse(new_datafile.df_has_changed)
+        self.assertTrue(new_datafile.source_is_current)
+
+    def test_column_mapping_row_store(self):
+        column_mapping = self.study.Clinical.ColumnMapping
+        var_id = ('Cell-line_clinical.txt', 2)
+        self.assertEqual(column_mapping.ids, list(column_mapping.df.index))
+
+        column_mapping.set_concept_path(var_id, label='New label')
+        self.assertEqual(column_mapping.select_row(var_id), list(column_mapping.df.loc[var_id]))
+
+        column_mapping.df.loc[var_id, column_mapping.df.columns[5]] = 'CODE'
+        column_mapping.mark_changed()
+        self.assertEqual(column_mapping.select_row(var_id)[5], 'CODE')
+
+        # Changes made directly on the dataframe are seen without mark_changed().
+        column_mapping.df.loc[var_id, column_mapping.df.columns[3]] = 'EDITLABEL'
+        self.assertEqual(column_mapping.select_row(var_id)[3], 'EDITLABEL')
+        self.assertEqual(column_mapping.label_ids('EDITLABEL'), [var_id])
+        self.assertEqual(column_mapping.get_concept_path(var_id).rsplit('\\', 1)[-1], 'EDITLABEL')
+
+        column_mapping.df = column_mapping.df.iloc[1:]
+        self.assertEqual(column_mapping.ids, list(column_mapping.df.index))
+        with self.assertRaises(KeyError):
+            column_mapping.select_row(('not_a_file.txt', 1))
+
+        # Getting the ids does not rebuild the index, nor the positions of the rows.
+        index, positions = column_mapping.df.index, column_mapping._position_store
+        with patch.object(column_mapping, 'build_index') as build_index:
+            self.assertEqual(column_mapping.ids, list(index))
+            build_index.assert_not_called()
+        self.assertIs(column_mapping.df.index, index)
+        self.assertIs(column_mapping._position_store, positions)
+
+    def test_variable_registry(self):
+        clinical = self.study.Clinical
+        variables = clinical.all_variables
+        self.assertIs(clinical.all_variables[('Cell-line_clinical.txt', 2)], variables[('Cell-line_clinical.txt', 2)])
+
+        expected = {k for k, v in variables.items() if v.data_label not in clinical.ColumnMapping.RESERVED_KEYWORDS}
+        self.assertEqual(set(clinical.filtered_variables), expected)
+
+        clinical.get_variable(('Cell-line_clinical.txt', 2)).data_label = 'SUBJ_ID'
+        self.assertNotIn(('Cell-line_clinical.txt', 2), clinical.filtered_variables)
+
+        column_mapping = clinical.ColumnMapping
+        column_mapping.df.loc[('Cell-line_clinical.txt', 3), column_mapping.df.columns[3]] = 'OMIT'
+        column_mapping.mark_changed()
+        self.assertNotIn(('Cell-line_clinical.txt', 3), clinical.filtered_variables)
+
+        # Unchanged, the registry is reused without reading the column mapping.
+        with patch.object(type(column_mapping), 'df', new_callable=PropertyMock) as df:
+            self.assertIn(('Cell-line_clinical.txt', 2), clinical.all_variables)
+            df.assert_not_called()
+
+    def test_profile(self):
+        datafile = self.study.Clinical.get_datafile('Cell-line_clinical.txt')
+        age = self.study.Clinical.get_variable(('Cell-line_clinical.txt', 8))
+        self.assertTrue(age.is_numeric_in_datafile)
+        self.assertEqual(age.min, min(map(float, age.values)))
+        self.assertEqual(age.max, max(map(float, age.values)))
+        self.assertFalse(self.study.Clinical.get_variable(('Cell-line_clinical.txt', 9)).is_numeric_in_datafile)
+        self.assertTrue(self.study.Clinical.get_variable(('Cell-line_clinical.txt', 10)).is_empty)
+
+        # Changes made directly on the dataframe are seen without mark_changed().
+        datafile.df.iloc[0, 7] = '1000'
+        self.assertEqual(age.max, 1000)
+        datafile.df.iloc[0, 7] = 'old'
+        self.assertFalse(age.is_numeric_in_datafile)
+        self.assertIn('old', age.unique_values)
+
+        age.values = age.values.apply(lambda x: 'unknown')
+        self.assertFalse(age.is_numeric_in_datafile)
+        self.assertEqual(list(age.unique_values), ['unknown'])
+
+        profiles = self.study.Clinical.profile(workers=2)
+        self.assertEqual(profiles[datafile.name].keys(), set(range(datafile.df.shape[1])))
+        self.assertEqual(profiles[datafile.name][8].counts['Male'], (datafile.df.iloc[:, 8] == 'Male').sum())
+
+    def test_bulk_blueprint_updates(self):
+        clinical = self.study.Clinical
+        updates = pd.DataFrame.from_dict({('Cell-line_clinical.txt', 3): {3: 'Species'},
+                                          ('Cell-line_clinical.txt', 9): {1: 'Demographics', 3: 'Sex'}},
+                                         orient='index')
+        clinical.ColumnMapping.update_rows(updates)
+        self.assertEqual(clinical.get_variable(('Cell-line_clinical.txt', 3)).concept_path, 'Characteristics\\Species')
+        self.assertEqual(clinical.get_variable(('Cell-line_clinical.txt', 9)).concept_path, 'Demographics\\Sex')
+
+        var_id = ('Cell-line_clinical.txt', 9)
+        clinical.WordMapping.set_word_maps({var_id: {'Male': 'M'}})
+        clinical.WordMapping.set_word_maps({var_id: {'Female': 'F'}, ('Cell-line_clinical.txt', 7): {'x': 'y'}})
+        self.assertEqual(clinical.WordMapping.get_word_map(var_id), {'Female': 'F'})
+        self.assertEqual(clinical.WordMapping.df.shape[0], 2)
+
+    def test_word_map_batch(self):
+        word_mapping = self.study.Clinical.WordMapping
+        gender = self.study.Clinical.get_variable(('Cell-line_clinical.txt', 9))
+
+        with word_mapping.batch():
+            gender.word_map_dict = {'Male': 'M'}
+            word_mapping.set_word_map(('Cell-line_clinical.txt', 7), {'Caucasian': 'White'})
+            self.assertEqual(word_mapping.df.shape[0], 0)
+            self.assertEqual(word_mapping.get_word_map(gender.var_id), {'Male': 'M'})
+            self.assertTrue(gender.is_in_wordmap)
+
+        self.assertEqual(word_mapping.df.shape[0], 2)
+        self.assertEqual(gender.word_map_dict['Male'], 'M')
+        self.assertEqual(gender.word_mapped_not_present(), set())
+
+        with self.assertRaises(ValueError):
+            with word_mapping.batch():
+                gender.word_map_dict = {}
+                raise ValueError
+        self.assertEqual(word_mapping.get_word_map(gender.var_id), {'Male': 'M'})
+
+        word_mapping.df.iloc[list(word_mapping.df.index).index(gender.var_id), 3] = 'Man'
+        self.assertEqual(word_mapping.get_word_map(gender.var_id), {'Male': 'Man'})
+        self.assertEqual(word_mapping.word_map_dicts[gender.var_id], {'Male': 'Man'})
+
+    def test_lazy_change_snapshots(self):
+        study = tmtk.Study(self.study.params.path)
+        word_mapping = study.Clinical.WordMapping
+        self.assertFalse(word_mapping.df_is_loaded)
+        self.assertEqual(word_mapping.word_map_changes(silent=True), {})
+
+        var_id = ('Cell-line_clinical.txt', 9)
+        word_mapping.set_word_map(var_id, {'Male': 'M'})
+        self.assertEqual(word_mapping.word_map_changes(silent=True), {var_id: {'Male': 'M'}})
+
+        variable = study.Clinical.get_variable(var_id)
+        old_path = variable.concept_path
+        variable.data_label = 'Sex'
+        self.assertEqual(study.Clinical.ColumnMapping.path_changes(silent=True),
+                         {var_id: (old_path, variable.concept_path)})
+
+    def test_path_converter_series(self):
+        paths = ['\\Subjects\\Age_in+years', 'Demo+Gender', '\\\\Cell line\\', '', 'a_b+c']
+        for flags in ({}, {'to_internal': True}, {'from_internal': True}):
+            expected = [tmtk.utils.path_converter(p, **flags) for p in paths]
+            self.assertEqual(list(tmtk.utils.path_converter_series(paths, **flags)), expected)
+
+        cm = self.study.Clinical.ColumnMapping
+        for var_id in cm.ids[:5]:
+            row = cm.select_row(var_id)
+            self.assertEqual(cm.get_concept_path(var_id),
+                             tmtk.utils.path_converter(tmtk.utils.path_join(row[1], row[3])))
+
+    def test_add_datafiles(self):
+        clinical = self.study.Clinical
+        n_rows = clinical.ColumnMapping.df.shape[0]
+        df_a = pd.DataFrame({'SUBJ_ID': ['p1', 'p2'], 'Height': ['180', '175']}, columns=['SUBJ_ID', 'Height'])
+        df_b = pd.DataFrame({'SUBJ_ID': ['p1'], 'Weight': ['80']}, columns=['SUBJ_ID', 'Weight'])
+
+        with patch.object(clinical.ColumnMapping, 'build_index', wraps=clinical.ColumnMapping.build_index) as build:
+            clinical.add_datafiles([('a.tsv', df_a), ('b.tsv', df_b)])
+            build.assert_called_once()
+
+        cm = clinical.ColumnMapping
+        self.assertEqual(cm.df.shape[0], n_rows + 4)
+        self.assertEqual(list(cm.select_row(('a.tsv', 2))[:4]), ['a.tsv', 'a.tsv', 2, 'Height'])
+        self.assertEqual(cm.select_row(('b.tsv', 2))[3], 'Weight')
+        self.assertTrue(cm.df.index.is_monotonic_increasing)
+
+        cm.append_from_datafile(clinical.get_datafile('a.tsv'))
+        self.assertEqual(cm.df.shape[0], n_rows + 4)
@@ -1,7 +1,14 @@
+import gzip
+import os
+from collections import OrderedDict
+from unittest.mock import patch, PropertyMock
+
 import tmtk
 
 import pandas as pd
 from tests.commons import TestBase, create_study_from_dir
+from tmtk.toolbox.skinny_loader.i2b2demodata.observation_fact import ObservationFact
+from tmtk.toolbox.skinny_loader.shared import get_unix_timestamp, get_unix_timestamps
 
 
 class SkinnyTests(TestBase):
@@ -74,3 +81,122 @@ class SkinnyTests(TestBase):
         self.assertEqual(modifier_sort_index, '2')
         self.assertEqual(patient_dimension_type, 'SUBJECT')
         self.assertEqual(patient_sort_index, '1')
+
+    def test_patients_and_trial_visits(self):
+        patients = self.study.Clinical.get_patients()
+        self.assertEqual(list(patients.columns), ['gender', 'age'])
+        self.assertEqual(patients.loc['OBS336-201_03', 'gender'], 'F')
+        self.assertEqual(list(self.export.patient_dimension.df.sex_cd), list(patients.gender))
+
+        # Subjects without gender or age are numbered last.
+        patients = create_study_from_dir('wordmapped').Clinical.get_patients()
+        self.assertEqual(list(patients.index[-2:]), ['DLD1', 'SW1398'])
+
+        visits = self.study.Clinical.get_trial_visits()
+        self.assertEqual(visits.name[0], 'General')
+        self.assertEqual(visits.set_index('name').loc['Week 2', 'relative_time'], '2')
+        self.assertIsNone(visits.time_unit[0])
+
+    def test_columnar_observation_fact(self):
+        for study in (create_study_from_dir('TEST_17_1'), create_study_from_dir('survey')):
+            export = tmtk.toolbox.SkinnyExport(study, self.temp_dir)
+            per_variable = os.path.join(self.temp_dir, 'per_variable.tsv')
+            per_datafile = os.path.join(self.temp_dir, 'per_datafile.tsv')
+            try:
+                tmtk.options.columnar_observation_fact = False
+                ObservationFact(export, straight_to_disk=per_variable)
+                tmtk.options.columnar_observation_fact = True
+                ObservationFact(export, straight_to_disk=per_datafile)
+            finally:
+                tmtk.options.columnar_observation_fact = False
+
+            with open(per_variable, 'rb') as a, open(per_datafile, 'rb') as b:
+                self.assertEqual(a.read(), b.read())
+
+    def test_sharded_observation_fact(self):
+        export = tmtk.toolbox.SkinnyExport(create_study_from_dir('TEST_17_1'), self.temp_dir)
+        path = os.path.join(self.temp_dir, 'observation_fact.tsv')
+        observation_fact = ObservationFact(export, straight_to_disk=path)
+        with open(path, 'rb') as f:
+            expected = f.read()
+
+        observation_fact.write_to_disk(path, workers=2)
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), expected)
+
+        shards = observation_fact.write_to_disk(path, workers=2, keep_shards=True)
+        self.assertEqual(len(shards), len(observation_fact._variable_groups()))
+        self.assertTrue(all(os.path.exists(shard.path) for shard in shards))
+
+    def test_rewrite_after_date_change(self):
+        study = create_study_from_dir('TEST_17_1')
+        export = tmtk.toolbox.SkinnyExport(study, self.temp_dir)
+        path = os.path.join(self.temp_dir, 'observation_fact.tsv')
+        observation_fact = ObservationFact(export, straight_to_disk=path)
+
+        datafile = study.Clinical.get_datafile('OBS336-201_demog.txt')
+        df = datafile.df.copy()
+        df.iloc[:, 3] = '2017-01-01'
+        datafile.df = df
+        observation_fact.write_to_disk(path)
+        with open(path, 'rb') as f:
+            rewritten = f.read()
+
+        ObservationFact(export, straight_to_disk=path)
+        with open(path, 'rb') as f:
+            self.assertEqual(rewritten, f.read())
+
+    def test_interleaved_variable_order(self):
+        study = create_study_from_dir('TEST_17_1')
+        variables = list(study.Clinical.filtered_variables.items())
+        position = pd.Series([k[0] for k, _ in variables]).groupby([k[0] for k, _ in variables]).cumcount()
+        interleaved = OrderedDict(variables[i] for i in position.argsort(kind='mergesort').values)
+        self.assertNotEqual(list(interleaved), [k for k, _ in variables])
+
+        with patch.object(type(study.Clinical), 'filtered_variables', new_callable=PropertyMock,
+                          return_value=interleaved):
+            export = tmtk.toolbox.SkinnyExport(study, self.temp_dir)
+            observation_fact = ObservationFact(export)
+            expected = pd.concat([df for variable in interleaved.values()
+                                  for df in observation_fact.build_rows(variable)], ignore_index=True)
+            self.assertTrue(observation_fact.df.equals(expected))
+
+            path = os.path.join(self.temp_dir, 'interleaved.tsv')
+            ObservationFact(export, straight_to_disk=path)
+            with open(path, 'rb') as f:
+                expected = f.read()
+            observation_fact.write_to_disk(path, workers=2)
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read(), expected)
+
+    def test_compressed_export(self):
+        export = tmtk.toolbox.SkinnyExport(create_study_from_dir('TEST_17_1'), os.path.join(self.temp_dir, 'plain'))
+        plain = export.to_disk()
+        export.export_directory = os.path.join(self.temp_dir, 'gzip')
+        compressed = export.to_disk(compression='gzip', workers=2)
+
+        self.assertEqual(len(plain), len(compressed))
+        for (plain_path, plain_stats), (gzip_path, gzip_stats) in zip(plain.items(), compressed.items()):
+            self.assertEqual(gzip_path, plain_path.replace('plain', 'gzip') + '.gz')
+            self.assertEqual(gzip_stats.rows, plain_stats.rows)
+            with open(plain_path, 'rb') as a, gzip.open(gzip_path, 'rb') as b:
+                self.assertEqual(a.read(), b.read())
+
+    def test_unix_timestamps(self):
+        values = pd.Series(['2016-03-02', '2016-03-02 10:15:00', '2016-03-02T10:15:00',
+                            '2016-03-02T10:15:00.500', '2016-03-02'])
+        expected = list(values.apply(get_unix_timestamp))
+        self.assertEqual(list(get_unix_timestamps(values)), expected)
+        self.assertEqual(list(get_unix_timestamps(pd.to_datetime(values))), expected)
+        self.assertTrue(pd.isnull(get_unix_timestamps(pd.Series([None, '2016-03-02']))[0]))
+
+    def test_i2b2_secure_folders(self):
+        df = self.export.i2b2_secure.df
+        paths = set(df.c_fullname)
+        self.assertEqual(len(paths), df.shape[0])
+        for path in paths:
+            parent = path.rsplit('\\', 2)[0] + '\\'
+            self.assertTrue(parent == '\\' or parent in paths, parent)
+        folders = df[df.c_visualattributes == 'FA']
+        self.assertTrue((folders.c_dimcode == folders.c_fullname).all())
+        self.assertEqual(list(folders.c_hlevel), [path.count('\\') - 2 for path in folders.c_fullname])
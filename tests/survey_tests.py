@@ -26,6 +26,13 @@ class SurveyTests(TestBase):
         self.assertEqual(var.data_label, 'MODIFIER')
         self.assertIn('Missing Value', self.export.dimension_description.df.name.values)
 
+    def test_keyword_lookups(self):
+        column_mapping = self.study.Clinical.ColumnMapping
+        self.assertEqual(column_mapping.label_ids('SUBJ_ID', 'survey_data.tsv'), [('survey_data.tsv', 6)])
+        self.assertEqual(column_mapping.keyword_ids('MODIFIER', 'survey_data.tsv', 5), [('survey_data.tsv', 9)])
+        self.assertEqual(column_mapping.keyword_ids('MODIFIER', 'survey_data.tsv', 4), [])
+        self.assertEqual(self.study.Clinical.get_variable(('survey_data.tsv', 1)).start_date.column, 8)
+
     def test_modifier_observations(self):
         obs_df = self.export.observation_fact.df
         values = list(obs_df.loc[obs_df.concept_cd == 'description', 'tval_char'])
@@ -0,0 +1,76 @@
+import filecmp
+import os
+
+import pandas as pd
+
+import tmtk
+from tests.commons import TestBase
+from tmtk import options
+from tmtk.clinical.DataFile import format_numbers
+from tmtk.utils import df2file
+
+
+class TypedClinicalTests(TestBase):
+
+    def setUp(self):
+        self._default = options.typed_clinical_data
+        options.typed_clinical_data = True
+        self.study = tmtk.Study(os.path.join(self.studies_dir, 'TEST_17_1', 'study.params'))
+        self.datafile = self.study.Clinical.get_datafile('OBS336-201_demog.txt')
+
+    def tearDown(self):
+        options.typed_clinical_data = self._default
+
+    def test_column_types(self):
+        dtypes = self.datafile.df.dtypes
+        self.assertTrue(pd.api.types.is_float_dtype(dtypes['YOB']))
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(dtypes['BIRTH_DATE']))
+        self.assertTrue(pd.api.types.is_categorical_dtype(dtypes['Sex']))
+        # Subject identifiers are never converted.
+        self.assertEqual(dtypes['USUBJID'], object)
+
+    def test_variable_on_typed_column(self):
+        variable = self.study.Clinical.get_variable(('OBS336-201_demog.txt', 7))
+        self.assertTrue(variable.is_numeric_in_datafile)
+        self.assertEqual(variable.min, 1973)
+        self.assertEqual(variable.max, 1985)
+
+    def test_round_trip(self):
+        labs = self.study.Clinical.get_datafile('OBS336-201_labs.txt')
+        self.assertTrue((labs.df.dtypes != object).any())
+        path = os.path.join(self.temp_dir, labs.name)
+        df2file(labs.text_df(), path)
+        self.assertTrue(filecmp.cmp(path, labs.path, shallow=False))
+
+    def test_word_mapped_columns_stay_text(self):
+        study = tmtk.Study(os.path.join(self.studies_dir, 'valid_study', 'study.params'))
+        variable = study.Clinical.get_variable(('Cell-line_clinical.txt', 7))
+        self.assertEqual(variable.values.dtype, object)
+        self.assertIn('No Information', set(variable.mapped_values))
+
+    def test_export_parity(self):
+        for name in ('TEST_17_1', 'valid_study', 'wordmapped', 'incomplete'):
+            params_path = os.path.join(self.studies_dir, name, 'study.params')
+            typed_dir = os.path.join(self.temp_dir, 'typed', name)
+            text_dir = os.path.join(self.temp_dir, 'text', name)
+            tmtk.toolbox.SkinnyExport(tmtk.Study(params_path), typed_dir).to_disk()
+            options.typed_clinical_data = False
+            tmtk.toolbox.SkinnyExport(tmtk.Study(params_path), text_dir).to_disk()
+            options.typed_clinical_data = True
+
+            for root, _, files in os.walk(text_dir):
+                for file in files:
+                    text_path = os.path.join(root, file)
+                    typed_path = os.path.join(typed_dir, os.path.relpath(text_path, text_dir))
+                    self.assertTrue(filecmp.cmp(text_path, typed_path, shallow=False), typed_path)
+
+    def test_untyped_by_default(self):
+        options.typed_clinical_data = False
+        study = tmtk.Study(os.path.join(self.studies_dir, 'TEST_17_1', 'study.params'))
+        df = study.Clinical.get_datafile('OBS336-201_demog.txt').df
+        self.assertEqual(df.dtypes['YOB'], object)
+
+    def test_format_numbers(self):
+        series = pd.Series([1.0, 0.1, 1e-05, float('nan'), 12.5])
+        self.assertEqual(format_numbers(series).tolist()[:3], ['1', '0.1', '1e-05'])
+        self.assertTrue(pd.isnull(format_numbers(series)[3]))
@@ -26,6 +26,17 @@ class ValidationTests(TestBase):
     def test_cnv_highdim_validation(self):
         self.assertTrue(self.study.HighDim.cnv.validate())
 
+    def test_cnv_highdim_streaming_validation(self):
+        cnv = create_study_from_dir('valid_study').HighDim.cnv
+        self.assertTrue(cnv.validate())
+        self.assertFalse(cnv.df_is_loaded)
+
+        chunks = list(cnv.iter_chunks(chunksize=2))
+        self.assertTrue(all(chunk.shape[0] <= 2 for chunk in chunks))
+        self.assertEqual(sum(chunk.shape[0] for chunk in chunks), cnv.df.shape[0])
+        self.assertEqual(chunks[0].dtypes.iloc[0], object)
+        self.assertTrue(pd.api.types.is_numeric_dtype(chunks[0].dtypes.iloc[-1]))
+
     def test_proteomics_params_loading(self):
         self.assertEqual(self.study.Params.proteomics.datatype, 'proteomics')
 
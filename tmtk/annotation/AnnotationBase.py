@@ -1,6 +1,6 @@
 import os
 
-from ..utils import Mappings, TransmartBatch, PathError, FileBase, ValidateMixin
+from ..utils import Mappings, TransmartBatch, PathError, FileBase, ValidateMixin, find_file
 
 
 class AnnotationBase(FileBase, ValidateMixin):
@@ -15,7 +15,7 @@ class AnnotationBase(FileBase, ValidateMixin):
         :param path:
         """
         if params and params.is_viable():
-            self.path = os.path.join(params.dirname, params.ANNOTATIONS_FILE)
+            self.path = find_file(os.path.join(params.dirname, params.ANNOTATIONS_FILE))
             self.platform = params.get('PLATFORM')
             self.params = params
         elif path and os.path.exists(path):
@@ -1,11 +1,13 @@
 import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 
 import tmtk
 from .ColumnMapping import ColumnMapping
-from .DataFile import DataFile
+from .DataFile import DataFile, profile_df
 from .Ontology import OntologyMapping
 from .Variable import Variable, VarID
 from .WordMapping import WordMapping
@@ -31,6 +33,10 @@ class Clinical(ValidateMixin):
         self.Modifiers = None
         self.TrialVisits = None
         self._params = clinical_params
+        # Registry of Variable objects, see _variable_registry.
+        self._variables = {}
+        self._filtered_variables = {}
+        self._variables_key = None
 
     def __str__(self):
         return "ClinicalObject ({})".format(self.params.path)
@@ -60,9 +66,7 @@ class Clinical(ValidateMixin):
     @ColumnMapping.setter
     def ColumnMapping(self, value):
         self._ColumnMapping = value
-        for file in self.ColumnMapping.included_datafiles:
-            clinical_data_path = os.path.join(self.params.dirname, file)
-            self.add_datafile(clinical_data_path)
+        self.add_datafiles([os.path.join(self.params.dirname, file) for file in value.included_datafiles])
 
     def apply_blueprint(self, blueprint, omit_missing=False):
         """
@@ -103,79 +107,114 @@ class Clinical(ValidateMixin):
         :param omit_missing: if True, then variable that are not present in the blueprint
         will be set to OMIT.
         """
-        for variable in self.all_variables.values():
-            # The default blueprint key is a tuple containing the column name and the file name (without extension)
-            blueprint_key = (variable.header.strip(), Path(variable.filename).stem)
-            if blueprint_key not in blueprint:
-                # Fallback to assuming a column-name-only key
-                blueprint_key = blueprint_key[0]
+        column_mapping = self.ColumnMapping
+        updates = {}
+        word_maps = {}
+        checks = []
 
-            blueprint_var = blueprint.get(blueprint_key)
+        for var_id, variable in self.all_variables.items():
+            blueprint_var = self._blueprint_entry(blueprint, variable)
 
             if not blueprint_var:
                 self.msgs.info("Column with header {!r}. Not found in blueprint.".format(variable.header))
                 if omit_missing:
-                    variable.data_label = 'OMIT'
+                    updates[var_id.tuple] = {3: 'OMIT'}
                 continue
 
+            row = {}
             if blueprint_var.get('path') is not None:
-                variable.category_code = path_converter(blueprint_var.get('path'))
+                row[1] = path_converter(blueprint_var.get('path'))
 
             if blueprint_var.get('label') is not None:
-                variable.data_label = blueprint_var.get('label')
+                row[3] = blueprint_var.get('label')
 
             if blueprint_var.get('word_map'):
-                variable.word_map_dict = blueprint_var.get('word_map')
+                word_maps[var_id.tuple] = blueprint_var.get('word_map')
 
             if blueprint_var.get('concept_code'):
-                variable.concept_code = blueprint_var.get('concept_code')
+                row[5] = blueprint_var.get('concept_code')
 
             if blueprint_var.get('force_categorical') and blueprint_var.get('data_type'):
                 msg = "Both 'force_categorical' and 'data_type' found for {!r}".format(variable.header)
                 raise BlueprintException(msg)
 
             elif blueprint_var.get('data_type'):
-                variable.column_type = blueprint_var.get('data_type')
+                row[6] = blueprint_var.get('data_type')
 
             elif blueprint_var.get('force_categorical'):
-                variable.forced_categorical = blueprint_var.get('force_categorical') == "Y"
+                row[6] = 'CATEGORICAL' if blueprint_var.get('force_categorical') == "Y" else ''
 
             reference_column = blueprint_var.get('reference_column')
             if reference_column is not None:
                 try:
-                    variable.reference_column = variable.datafile.df.columns.get_loc(reference_column) + 1
+                    row[4] = variable.datafile.df.columns.get_loc(reference_column) + 1
                 except KeyError:
                     msg = 'Cannot find reference column {!r} within dataframe header'.format(reference_column)
                     raise BlueprintException(msg)
 
-            expected_numerical = blueprint_var.get('expected_numerical')
-            if expected_numerical and variable.is_numeric_in_datafile:
-                min_expected = expected_numerical.get('min', '')
-                try:
-                    min_const = float(min_expected if min_expected != '' else '-Inf')
-                except ValueError:
-                    self.msgs.warning("Expected numerical for min constraint ({}), got {!r}."
-                                      .format(variable.header, min_expected))
+            if row:
+                updates[var_id.tuple] = row
+            checks.append((variable, blueprint_var))
 
-                max_expected = expected_numerical.get('max', '')
-                try:
-                    max_const = float(max_expected if max_expected != '' else 'Inf')
-                except ValueError:
-                    self.msgs.warning("Expected numerical for max constraint ({}), got {!r}."
-                                      .format(variable.header, max_expected))
-
-                if min_const > variable.min or max_const < variable.max:
-                    self.msgs.warning("Value constraints exceeded for {}: {} to {}, where datafile has min:{}, max:{}".
-                                      format(variable.header, min_const, max_const, variable.min, variable.max)
-                                      )
-
-            expected_categorical = blueprint_var.get('expected_categorical')
-            if expected_categorical:
-                unexpected = set(variable.unique_values) - set(expected_categorical)
-                if unexpected:
-                    self.msgs.warning("Unexpected values for {}. Expected: {}. Also found: {}".
-                                      format(variable.header, expected_categorical, list(unexpected))
-                                      )
+        positions = sorted({position for row in updates.values() for position in row})
+        updates_df = pd.DataFrame({position: pd.Series([row.get(position) for row in updates.values()], dtype=object)
+                                   for position in positions})
+        updates_df.index = list(updates)
+        column_mapping.update_rows(updates_df)
+        self.WordMapping.set_word_maps(word_maps)
+
+        for variable, blueprint_var in checks:
+            self._check_blueprint_expectations(variable, blueprint_var)
+
+    @staticmethod
+    def _blueprint_entry(blueprint, variable):
+        """
+        Find the blueprint entry of a variable. The default blueprint key is a tuple
+        containing the column name and the file name (without extension), with a
+        fallback to a column-name-only key.
+        """
+        blueprint_key = (variable.header.strip(), Path(variable.filename).stem)
+        if blueprint_key not in blueprint:
+            blueprint_key = blueprint_key[0]
+        return blueprint.get(blueprint_key)
+
+    def _check_blueprint_expectations(self, variable, blueprint_var):
+        """
+        Warn if the values of a variable do not match the expected numerical
+        range or expected categories in its blueprint entry.
+        """
+        profile = variable.profile
+
+        expected_numerical = blueprint_var.get('expected_numerical')
+        if expected_numerical and profile.is_numeric:
+            min_expected = expected_numerical.get('min', '')
+            try:
+                min_const = float(min_expected if min_expected != '' else '-Inf')
+            except ValueError:
+                min_const = float('-Inf')
+                self.msgs.warning("Expected numerical for min constraint ({}), got {!r}."
+                                  .format(variable.header, min_expected))
+
+            max_expected = expected_numerical.get('max', '')
+            try:
+                max_const = float(max_expected if max_expected != '' else 'Inf')
+            except ValueError:
+                max_const = float('Inf')
+                self.msgs.warning("Expected numerical for max constraint ({}), got {!r}."
+                                  .format(variable.header, max_expected))
+
+            if min_const > profile.min or max_const < profile.max:
+                self.msgs.warning("Value constraints exceeded for {}: {} to {}, where datafile has min:{}, max:{}".
+                                  format(variable.header, min_const, max_const, profile.min, profile.max)
+                                  )
+
+        expected_categorical = blueprint_var.get('expected_categorical')
+        if expected_categorical:
+            unexpected = set(profile.unique) - set(expected_categorical)
+            if unexpected:
+                self.msgs.warning("Unexpected values for {}. Expected: {}. Also found: {}".
+                                  format(variable.header, expected_categorical, list(unexpected))
+                                  )
 
     def add_datafile(self, filename, dataframe=None):
         """
@@ -184,9 +223,42 @@ class Clinical(ValidateMixin):
         :param filename: path to file or filename of file in clinical directory.
         :param dataframe: if given, add `pd.DataFrame` to study.
         """
+        self.add_datafiles([(filename, dataframe)])
+
+    def add_datafiles(self, datafiles):
+        """
+        Add clinical data files to study. Columns of files that are not yet in the
+        column mapping are appended to it in one go, instead of once per file.
+
+        :param datafiles: list of paths or filenames of files in clinical directory,
+            or (filename, `pd.DataFrame`) tuples to add dataframes to study.
+        """
+        included = set(self.ColumnMapping.included_datafiles)
+        new_datafiles = []
+
+        for item in datafiles:
+            filename, dataframe = item if isinstance(item, tuple) else (item, None)
+            datafile = self._register_datafile(filename, dataframe)
 
+            if datafile.name not in included:
+                self.msgs.okay('Adding {!r} as clinical datafile to study.'.format(datafile.name))
+                new_datafiles.append(datafile)
+
+        if new_datafiles:
+            self.ColumnMapping.append_from_datafiles(new_datafiles)
+
+    def _register_datafile(self, filename, dataframe=None):
+        """
+        Create a `tmtk.DataFile` for a file or dataframe and make it an attribute
+        of this object, without changing the column mapping.
+
+        :param filename: path to file or filename of file in clinical directory.
+        :param dataframe: if given, use this `pd.DataFrame`.
+        :return: `tmtk.DataFile`.
+        """
         if isinstance(dataframe, pd.DataFrame):
             datafile = DataFile()
+            datafile.parent = self
             datafile.df = dataframe
 
         else:
@@ -196,6 +268,7 @@ class Clinical(ValidateMixin):
                 file_path = os.path.join(self.params.dirname, filename)
             assert os.path.exists(file_path), PathError(file_path)
             datafile = DataFile(file_path)
+            datafile.parent = self
 
             # Check if file is in de clinical directory
             if not os.path.dirname(os.path.abspath(filename)) == self.params.dirname:
@@ -209,10 +282,7 @@ class Clinical(ValidateMixin):
 
         safe_name = clean_for_namespace(datafile.name)
         self.__dict__[safe_name] = datafile
-
-        if datafile.name not in self.ColumnMapping.included_datafiles:
-            self.msgs.okay('Adding {!r} as clinical datafile to study.'.format(datafile.name))
-            self.ColumnMapping.append_from_datafile(datafile)
+        return datafile
 
     def get_variable(self, var_id: tuple):
         """
@@ -233,71 +303,89 @@ class Clinical(ValidateMixin):
         :param in_file:
         :return:
         """
-        sliced = self.ColumnMapping.df.iloc[:, 3] == label
-        if in_file:
-            sliced = sliced & (self.ColumnMapping.df.iloc[:, 0] == in_file)
-        return [self.get_variable(x[0]) for x in self.ColumnMapping.df[sliced].iterrows()]
+        return [self.get_variable(var_id) for var_id in self.ColumnMapping.label_ids(label, in_file or None)]
 
     def get_patients(self):
         """
-        Creates a dictionary that has subject identifiers as keys and each value is a map
-        that contains an nothing or an 'age' and/or 'gender' key that maps to this value.
+        Creates a dataframe with subject identifiers as index and 'gender' and 'age'
+        columns. If a subject has more than one value for a property, the last value
+        found is used. Missing values are NaN.
 
-        :return: patients dict.
+        :return: `pd.DataFrame`.
         """
+        subj_id_vars = self.find_variables_by_label('SUBJ_ID')
+        subjects = pd.Index(pd.concat([var.values for var in subj_id_vars] or [pd.Series([], dtype=object)],
+                                      ignore_index=True).unique())
+        patients = pd.DataFrame(index=subjects, columns=['gender', 'age'], dtype=object)
 
-        def add_patient_properties(subjects_dict, destination, labels):
+        def add_patient_properties(destination, labels):
             vars_ = [v for label in labels for v in self.find_variables_by_label(label)]
 
             if len(vars_) > 1:
                 print("More than one {!r} defined, will pick last "
                       "value found for each subject.".format(destination))
-
-            for var in vars_:
-                for k, v in zip(var.subj_id.values, var.values):
-                    if v in (None, '', pd.np.nan):
-                        continue
-
-                    subjects_dict[k].update({destination: v})
-
-        subj_id_vars = self.find_variables_by_label('SUBJ_ID')
-
-        # Create dictionary where every subject is a key with value as empty dictionary
-        subjects = {subj_id: {} for var in subj_id_vars for subj_id in var.values}
-
-        add_patient_properties(subjects, 'gender', ('gender', 'Gender', 'GENDER', 'sex', 'Sex', 'SEX'))
-        add_patient_properties(subjects, 'age', ('Age', 'age', 'AGE'))
-
-        return subjects
+            if not vars_:
+                return
+
+            values = pd.concat([pd.DataFrame({'subject': var.subj_id.values.values,
+                                              'value': var.values.astype(object).values})
+                                for var in vars_], ignore_index=True)
+            values = values[values.value.notnull() & ~values.value.isin([''])]
+            values = values.drop_duplicates('subject', keep='last').set_index('subject').value
+            patients[destination] = values.reindex(subjects).values
+
+        add_patient_properties('gender', ('gender', 'Gender', 'GENDER', 'sex', 'Sex', 'SEX'))
+        add_patient_properties('age', ('Age', 'age', 'AGE'))
+
+        # Keep the subject order of the original dictionary based implementation,
+        # which determines the patient numbers in the export. Subjects that have the
+        # property found first for the first subject come first, in file order.
+        has_gender = patients.gender.notnull().values
+        has_age = patients.age.notnull().values | ~has_gender
+        first = has_gender if has_gender[:1].any() else has_age
+        return patients.iloc[np.concatenate([np.flatnonzero(first), np.flatnonzero(~first)])]
 
     def get_trial_visits(self):
         """
-        Returns a list of all trial visits present in this study. Visits are identified
+        Returns a dataframe with all trial visits present in this study. Visits are identified
         by the TRIAL_VISIT_LABEL keyword in column mapping and can be annotated with
         a value and unit using the TrialVisits object.
 
-        :return: list of dicts.
+        :return: `pd.DataFrame` with name, relative_time and time_unit columns.
         """
+        visit_file = self.TrialVisits.df.iloc[:, :3]
+        visit_file.columns = ['name', 'relative_time', 'time_unit']
 
-        visit_labels = {'General': {'name': 'General'}}
-        visit_labels.update({l: {'name': l}
-                             for var in self.find_variables_by_label('TRIAL_VISIT_LABEL')
-                             for l in var.values})
-        visit_labels.update({l: {'name': l} for l in self.TrialVisits.df.iloc[:, 0]})
+        names = pd.concat([pd.Series(['General'], dtype=object)] +
+                          [var.values.astype(object) for var in self.find_variables_by_label('TRIAL_VISIT_LABEL')] +
+                          [visit_file.name.astype(object)], ignore_index=True)
+        names = names[names.notnull() & ~names.isin([''])].unique()
 
-        self.TrialVisits.df.apply(
-            lambda x: visit_labels[x[0]].update(
-                {'relative_time': x[1],
-                 'time_unit': x[2]}
-            ), axis=1
-        )
-        for missing in ('', None, pd.np.nan):
-            try:
-                visit_labels.pop(missing)
-            except KeyError:
-                pass
+        visits = pd.DataFrame({'name': names}).merge(
+            visit_file.drop_duplicates('name', keep='last').reset_index(drop=True), on='name', how='left')
+        return visits.astype(object).where(visits.notnull(), None)
 
-        return list(visit_labels.values())
+    def _variable_registry(self):
+        """
+        Build the dictionaries of all and filtered variables, or reuse them if the
+        column mapping and the set of data files have not changed since. Changes
+        to the column mapping are found by its version, so data labels changed
+        directly on its dataframe are only seen after calling mark_changed().
+        """
+        column_mapping = self.ColumnMapping
+        # The key holds the objects themselves, these are compared by identity.
+        key = (column_mapping, column_mapping._df_version, column_mapping._index_version,
+               tuple((obj, obj.name) for obj in self.__dict__.values() if isinstance(obj, DataFile)))
+        if key == self._variables_key:
+            return
+
+        ids = column_mapping.ids
+        self._variables = {VarID(var_id): self.get_variable(var_id) for var_id in ids}
+
+        reserved = column_mapping.df.iloc[:, 3].isin(column_mapping.RESERVED_KEYWORDS).values
+        filtered_ids = {VarID(var_id) for var_id, is_reserved in zip(ids, reserved) if not is_reserved}
+        self._filtered_variables = {k: v for k, v in self._variables.items() if k in filtered_ids}
+        self._variables_key = key
 
     @property
     def all_variables(self):
@@ -305,7 +393,8 @@ class Clinical(ValidateMixin):
         Dictionary where {`tmtk.VarID`: `tmtk.Variable`} for all variables in
         the column mapping file.
         """
-        return {VarID(var_id): self.get_variable(var_id) for var_id in self.ColumnMapping.ids}
+        self._variable_registry()
+        return dict(self._variables)
 
     @property
     def filtered_variables(self):
@@ -313,8 +402,33 @@ class Clinical(ValidateMixin):
         Dictionary where {`tmtk.VarID`: `tmtk.Variable`} for all variables in
         the column mapping file that do not have a data label in the RESERVED_KEYWORDS list
         """
-        return {k: v for k, v in self.all_variables.items()
-                if v.data_label not in self.ColumnMapping.RESERVED_KEYWORDS}
+        self._variable_registry()
+        return dict(self._filtered_variables)
+
+    def profile(self, workers=None):
+        """
+        Profile all columns of all data files, see :attr:`tmtk.clinical.DataFile.profile`.
+        Profiles are cached on the data files, so only files that have not been
+        profiled since they last changed are processed.
+
+        :param workers: if larger than 1, profile files in a pool of this many processes.
+        :return: dictionary with data file names as keys and profiles as values.
+        """
+        datafiles = [obj for obj in self.__dict__.values() if isinstance(obj, DataFile)]
+
+        if workers and workers > 1:
+            todo = []
+            for datafile in datafiles:
+                missing = datafile._missing_profiles()
+                if missing:
+                    todo.append((datafile, missing))
+
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = pool.map(profile_df, [d.df for d, _ in todo], [m for _, m in todo])
+                for (datafile, _), result in zip(todo, results):
+                    datafile._keep_profiles(result)
+
+        return {datafile.name: datafile.profile for datafile in datafiles}
 
     def validate_all(self, verbosity=3):
         for key, obj in self.__dict__.items():
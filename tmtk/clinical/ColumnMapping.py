@@ -1,8 +1,11 @@
 import os
+from collections import OrderedDict
+
+import numpy as np
 import pandas as pd
 
-from ..utils import (FileBase, Exceptions, Mappings, path_converter,
-                     path_join, column_map_diff, ValidateMixin)
+from ..utils import (FileBase, Exceptions, Mappings, path_converter, path_converter_series,
+                     path_join, column_map_diff, ValidateMixin, is_not_a_value)
 from ..params import ClinicalParams
 from .DataFile import DataFile
 
@@ -13,6 +16,11 @@ class ColumnMapping(FileBase, ValidateMixin):
     Can be initiated with by giving a clinical params file object.
     """
 
+    path_columns = (1, )
+
+    # Filename, category code, column number and data label are kept to determine path changes.
+    snapshot_columns = (0, 1, 2, 3)
+
     # Data label terms that should not be considered variables. These provide metadata
     # for all other column in the row of this data file.
     RESERVED_KEYWORDS = ('SUBJ_ID',
@@ -45,7 +53,14 @@ class ColumnMapping(FileBase, ValidateMixin):
             setattr(self.params, 'COLUMN_MAP_FILE', os.path.basename(self.path))
         super().__init__()
 
-        self._initial_paths = self.path_id_dict
+        # Positions of the rows of the dataframe by variable identifier tuple, see _position_store.
+        self._positions = OrderedDict()
+        self._duplicate_ids = {}
+        self._file_positions = {}
+        self._row_ids = []
+        self._positions_version = None
+        # Bumped every time an index is built, see build_index.
+        self._index_version = 0
 
     @property
     def included_datafiles(self):
@@ -55,8 +70,74 @@ class ColumnMapping(FileBase, ValidateMixin):
     @property
     def ids(self):
         """A list of variable identifier tuples."""
-        self.build_index()
-        return list(self.df.index)
+        self._position_store
+        return list(self._row_ids)
+
+    @property
+    def _position_store(self):
+        """
+        Dictionary with the position of the row of every variable identifier tuple, in
+        the order of the dataframe. It is only rebuilt after a new index has been built,
+        which happens when a dataframe is loaded or set. Values are always read from the
+        dataframe itself, so changes made directly on the dataframe are seen without
+        calling mark_changed(). Call :meth:`build_index` after changing the filename or
+        column number of a row directly on the dataframe.
+
+        :return: dict.
+        """
+        if self._index_version != self._positions_version:
+            positions, duplicates, files = OrderedDict(), {}, {}
+            row_ids = list(self.df.index)
+            for i, var_id in enumerate(row_ids):
+                if var_id in positions:
+                    duplicates[var_id] = duplicates.get(var_id, 1) + 1
+                positions[var_id] = i
+                files.setdefault(var_id[0], []).append(i)
+            self._file_positions = {k: np.array(v, dtype=int) for k, v in files.items()}
+            self._positions, self._duplicate_ids, self._row_ids = positions, duplicates, row_ids
+            self._positions_version = self._index_version
+        return self._positions
+
+    def _column_values(self, i):
+        """Values of a column by position. Selecting by name uses the column cache of pandas."""
+        return self.df[self.df.columns[i]].values
+
+    def _label_positions(self, label, filename=None):
+        """Positions of the rows with a data label, optionally only for one data file."""
+        self._position_store
+        labels = self._column_values(3)
+        if filename is None:
+            return np.flatnonzero(labels == label)
+        positions = self._file_positions.get(filename, np.array([], dtype=int))
+        return positions[labels[positions] == label]
+
+    def label_ids(self, label: str, filename: str = None) -> list:
+        """
+        Variable identifier tuples of all variables with a data label.
+
+        :param label: data label, e.g. 'SUBJ_ID'.
+        :param filename: if given, only variables in this data file.
+        :return: list of tuples of filename and column number.
+        """
+        return [self._row_ids[i] for i in self._label_positions(label, filename)]
+
+    def keyword_ids(self, label: str, filename: str, column: int) -> list:
+        """
+        Variable identifier tuples of the keyword variables with a data label that
+        apply to a column of a data file. A keyword variable applies to all columns
+        in its file if its reference column is empty, or else to the columns in its
+        comma separated reference column.
+
+        :param label: data label, e.g. 'SUBJ_ID' or 'MODIFIER'.
+        :param filename: name of data file.
+        :param column: column number.
+        :return: list of tuples of filename and column number.
+        """
+        positions = self._label_positions(label, filename)
+        references = self._column_values(4)
+        column = str(column)
+        return [self._row_ids[i] for i in positions
+                if is_not_a_value(references[i]) or column in str(references[i]).split(',')]
 
     def create_df(self):
         """
@@ -77,12 +158,64 @@ class ColumnMapping(FileBase, ValidateMixin):
         :param var_id: tuple of filename and column number.
         :return: list of items in selected row.
         """
-        rows = self.df.loc[tuple(var_id)]
+        var_id = tuple(var_id)
+        position = self._position_store[var_id]
+
+        if var_id in self._duplicate_ids:
+            raise Exceptions.TooManyValues(self._duplicate_ids[var_id], 1, var_id)
+        return list(self.df.iloc[position])
+
+    def select_item(self, var_id: tuple, i: int):
+        """
+        Select a single item in the row of a variable, see :meth:`select_row`.
+        This is faster than selecting the whole row.
+
+        :param var_id: tuple of filename and column number.
+        :param i: zero based column position.
+        :return: item.
+        """
+        var_id = tuple(var_id)
+        position = self._position_store[var_id]
+
+        if var_id in self._duplicate_ids:
+            raise Exceptions.TooManyValues(self._duplicate_ids[var_id], 1, var_id)
+        return self.df.iat[position, i]
+
+    def _set_values(self, var_id, positions, values):
+        """
+        Set items in the row of a variable.
+
+        :param var_id: tuple of filename and column number.
+        :param positions: list of zero based column positions.
+        :param values: list of new values for these columns.
+        """
+        self.df.loc[tuple(var_id), list(self.df.columns[positions])] = values
+        self.mark_changed()
 
-        if isinstance(rows, pd.Series):
-            return list(rows)
-        elif isinstance(rows, pd.DataFrame):
-            raise Exceptions.TooManyValues(rows.shape[0], 1, var_id)
+    def update_rows(self, updates):
+        """
+        Set items in the rows of many variables at once.
+
+        :param updates: `pd.DataFrame` with variable identifier tuples as index and
+            zero based column positions as columns. Missing values are not set.
+        """
+        if updates.empty:
+            return
+
+        updates = updates.copy()
+        updates.index = pd.MultiIndex.from_tuples([tuple(var_id) for var_id in updates.index])
+        aligned = updates.reindex(self.df.index)
+
+        for position in aligned.columns:
+            values = aligned[position].values
+            mask = pd.notnull(values)
+            if not mask.any():
+                continue
+            if self.df.iloc[:, position].dtype != object:
+                self.df[self.df.columns[position]] = self.df.iloc[:, position].astype(object)
+            self.df.iloc[mask, position] = values[mask]
+
+        self.mark_changed()
 
     def get_concept_path(self, var_id: tuple):
         """
@@ -92,8 +225,7 @@ class ColumnMapping(FileBase, ValidateMixin):
         :return str: concept path for this variable.
         """
         row = self.select_row(var_id)
-        cp = path_join(row[1], row[3])
-        return path_converter(cp)
+        return path_converter(path_join(row[1], row[3]))
 
     def set_concept_path(self, var_id: tuple, path=None, label=None):
         """
@@ -106,16 +238,8 @@ class ColumnMapping(FileBase, ValidateMixin):
         if path is None and label is None:
             raise Exception('Need to give path or label')
 
-        columns_to_update = [self.df.columns[1], self.df.columns[3]]
-        new_values = [path, label]
-        if path is None:
-            columns_to_update.pop(0)
-            new_values = new_values[1]
-        if label is None:
-            columns_to_update.pop(1)
-            new_values = new_values[0]
-
-        self.df.loc[tuple(var_id), columns_to_update] = new_values
+        positions, values = zip(*[(i, v) for i, v in ((1, path), (3, label)) if v is not None])
+        self._set_values(var_id, list(positions), list(values))
 
     def set_reference_column(self, var_id: tuple, value):
         """
@@ -125,7 +249,7 @@ class ColumnMapping(FileBase, ValidateMixin):
         :param var_id: tuple of filename and column number.
         :param value: value to set reference column to.
         """
-        self.df.loc[tuple(var_id), self.df.columns[4]] = value
+        self._set_values(var_id, [4], [value])
 
     def set_concept_code(self, var_id: tuple, value):
         """
@@ -134,7 +258,7 @@ class ColumnMapping(FileBase, ValidateMixin):
         :param var_id: tuple of filename and column number.
         :param value: value to set concept code to.
         """
-        self.df.loc[tuple(var_id), self.df.columns[5]] = value
+        self._set_values(var_id, [5], [value])
 
     def set_column_type(self, var_id: tuple, value: str):
         """
@@ -143,7 +267,7 @@ class ColumnMapping(FileBase, ValidateMixin):
         :param var_id: tuple of filename and column number.
         :param value: value to set column type to.
         """
-        self.df.loc[tuple(var_id), self.df.columns[6]] = value
+        self._set_values(var_id, [6], [value])
 
     @staticmethod
     def _df_mods(df):
@@ -169,6 +293,7 @@ class ColumnMapping(FileBase, ValidateMixin):
             df = self.df
         df.set_index(list(df.columns[[0, 2]]), drop=False, inplace=True)
         df.sort_index(inplace=True)
+        self._index_version += 1
         return df
 
     def append_from_datafile(self, datafile):
@@ -177,20 +302,36 @@ class ColumnMapping(FileBase, ValidateMixin):
 
         :param datafile: `tmtk.DataFile` object.
         """
+        self.append_from_datafiles([datafile])
 
-        if not isinstance(datafile, DataFile):
-            raise TypeError(datafile)
+    def append_from_datafiles(self, datafiles):
+        """
+        Appends the column mapping file with rows based on the column names of
+        all datafiles. New rows are added in a single concatenation, after which the
+        index is rebuilt once. Columns already in the column mapping file are skipped.
 
+        :param datafiles: list of `tmtk.DataFile` objects.
+        """
+        existing = self._position_store
         cols_min_four = [""] * (self.df.shape[1] - 4)
-        for i, name in enumerate(datafile.df.columns, 1):
-            var_id = (datafile.name, i)
-            try:
-                self.select_row(var_id)
-                self.msgs.warning("Skipping {!r}, already in column mapping file.".format(var_id))
-            except KeyError:
-                self.df.loc[i] = [datafile.name, datafile.name, i, name] + cols_min_four
+        new_rows = []
+
+        for datafile in datafiles:
+            if not isinstance(datafile, DataFile):
+                raise TypeError(datafile)
 
-        self.build_index()
+            for i, name in enumerate(datafile.df.columns, 1):
+                var_id = (datafile.name, i)
+                if var_id in existing:
+                    self.msgs.warning("Skipping {!r}, already in column mapping file.".format(var_id))
+                else:
+                    new_rows.append([datafile.name, datafile.name, i, name] + cols_min_four)
+
+        if not new_rows:
+            return
+
+        new_df = pd.DataFrame(new_rows, columns=self.df.columns)
+        self.df = pd.concat([self.df, new_df], ignore_index=True)
 
     @property
     def subj_id_columns(self):
@@ -205,7 +346,46 @@ class ColumnMapping(FileBase, ValidateMixin):
     @property
     def path_id_dict(self):
         """Dictionary with all variable ids as keys and paths as value."""
-        return {v: self.get_concept_path(v) for v in self.ids}
+        return self._concept_paths(self.df).to_dict()
+
+    @staticmethod
+    def _paths_by_id(df):
+        """Category code and data label by variable identifier tuple, without duplicates."""
+        df = df.set_index(list(df.columns[[0, 2]]), drop=False).iloc[:, [1, 3]]
+        return df[~df.index.duplicated(keep='last')]
+
+    @classmethod
+    def _concept_paths(cls, df, var_ids=None):
+        """
+        Converted concept paths of the variables in a column mapping dataframe.
+
+        :param df: `pd.DataFrame`.
+        :param var_ids: if given, only convert paths of these variables.
+        :return: `pd.Series` with variable identifier tuples as index.
+        """
+        df = cls._paths_by_id(df)
+        if var_ids is not None:
+            df = df[df.index.isin(var_ids)]
+        return path_converter_series(df.iloc[:, 0].str.cat(df.iloc[:, 1], sep=Mappings.PATH_DELIM))
+
+    def _path_diff(self):
+        """
+        Changes in concept paths since the dataframe was loaded. Only rows of which
+        the category code or data label changed are converted to concept paths.
+
+        :return: dictionary with variable identifier tuples as keys and (old, new) tuples as values.
+        """
+        if self.initial_df is None:
+            return {}
+
+        before, after = self._paths_by_id(self.initial_df), self._paths_by_id(self.df)
+        joined = pd.concat([before, after], axis=1, join='outer')
+        a, b = joined.iloc[:, :2].values, joined.iloc[:, 2:].values
+        changed = ~((a == b).all(axis=1))
+
+        var_ids = joined.index[changed]
+        return column_map_diff(self._concept_paths(self.initial_df, var_ids).to_dict(),
+                               self._concept_paths(self.df, var_ids).to_dict())
 
     def path_changes(self, silent=False):
         """
@@ -214,7 +394,7 @@ class ColumnMapping(FileBase, ValidateMixin):
         :param silent: if True, only print output.
         :return: if `silent=False` return dictionary with changes since load.
         """
-        diff = column_map_diff(self._initial_paths, self.path_id_dict)
+        diff = self._path_diff()
         if not silent:
             for var_id, item in diff.items():
                 print("{}: {}".format(*var_id))
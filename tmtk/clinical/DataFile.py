@@ -1,17 +1,328 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_numeric_dtype, is_datetime64_any_dtype
+
 import tmtk.utils as utils
+from tmtk import options
+from tmtk.utils.filebase import same_values
 
 
 class DataFile(utils.FileBase):
     """
     Class for clinical data files, does not do much more than tmkt.FileBase.
+
+    In typed mode (see `tmtk.options.typed_clinical_data`) columns are loaded as
+    float, datetime64 or categorical columns where this can be done without
+    losing the original text. On writing, typed columns are converted back to
+    their exact original text.
     """
 
-    def __init__(self, path=None):
+    # Text columns with at most this ratio of unique values become categorical.
+    CATEGORICAL_MAX_UNIQUE_RATIO = 0.5
+
+    # Date formats that are tried for columns with data type DATE.
+    DATE_FORMATS = ('%Y-%m-%d',
+                    '%Y-%m-%d %H:%M:%S',
+                    '%Y-%m-%dT%H:%M:%S',
+                    '%d-%m-%Y',
+                    '%d/%m/%Y',
+                    '%m/%d/%Y',
+                    '%Y/%m/%d')
+
+    # Data types in the column mapping file that have to be kept as text.
+    _TEXT_TYPES = ('CATEGORICAL', 'TEXT')
+
+    def __init__(self, path=None, typed=None):
         """
         Initialize this class by specifying a path to the data file.
 
         :param path: path to datafile.
+        :param typed: if True load in typed mode, if None use `tmtk.options.typed_clinical_data`.
         """
         self.path = path
+        self.typed = typed
+        self.parent = None
+        self._text_formats = {}
+        # Column profiles by zero based column index, together with a copy of the
+        # values of the column they were computed from, see column_profile.
+        self._profiles = {}
         super().__init__()
 
+    @property
+    def is_typed(self):
+        """True if this data file is loaded in typed mode."""
+        return options.typed_clinical_data if self.typed is None else self.typed
+
+    def _read_df(self):
+        df = super()._read_df()
+        if self.is_typed:
+            df = self._apply_types(df)
+        return df
+
+    def _column_schema(self):
+        """
+        Dictionary with zero based column index as key and a (data type, keep as text) tuple
+        as value, based on the column mapping and word mapping of the parent clinical object.
+        Keyword columns (e.g. SUBJ_ID) and word mapped columns are kept as text, so word
+        mapping and export see the values exactly as they are in the file.
+        """
+        clinical = self.parent
+        if clinical is None or clinical.ColumnMapping is None:
+            return {}
+
+        column_mapping = clinical.ColumnMapping
+        rows = column_mapping.df[column_mapping.df.iloc[:, 0] == self.name]
+
+        word_mapped = set()
+        if clinical.WordMapping is not None:
+            wm = clinical.WordMapping.df
+            word_mapped = set(wm.loc[wm.iloc[:, 0] == self.name].iloc[:, 1])
+
+        schema = {}
+        for row in rows.itertuples(index=False):
+            column, label = row[2], row[3]
+            data_type = row[6] if len(row) > 6 else ''
+            keep_text = label in column_mapping.RESERVED_KEYWORDS or column in word_mapped
+            schema[column - 1] = (data_type, keep_text)
+        return schema
+
+    def _apply_types(self, df):
+        """
+        Convert text columns to typed columns where the original text can be restored.
+
+        :param df: `pd.DataFrame` with text columns as read from disk.
+        :return: `pd.DataFrame`.
+        """
+        schema = self._column_schema()
+        self._text_formats = {}
+
+        for i, name in enumerate(df.columns):
+            column = df[name]
+            if column.dtype != object:
+                continue
+
+            data_type, keep_text = schema.get(i, ('', True))
+            if keep_text:
+                continue
+            values = column.dropna()
+
+            if data_type == 'DATE':
+                converted = self._sniff_date(values)
+                if converted is not None:
+                    fmt, parsed = converted
+                    df[name] = parsed.reindex(column.index)
+                    self._text_formats[i] = ('date', fmt)
+                    continue
+
+            if data_type not in self._TEXT_TYPES + ('DATE',):
+                parsed = self._sniff_numeric(values)
+                if parsed is not None:
+                    df[name] = parsed.reindex(column.index)
+                    self._text_formats[i] = ('number', None)
+                    continue
+
+            if len(column) and values.nunique() <= len(column) * self.CATEGORICAL_MAX_UNIQUE_RATIO:
+                df[name] = column.astype('category')
+
+        return df
+
+    @staticmethod
+    def _sniff_numeric(values):
+        """
+        Parse text values as floats if every value is restored exactly by
+        :func:`format_numbers`. Returns None otherwise.
+        """
+        try:
+            parsed = pd.to_numeric(values)
+        except (ValueError, TypeError):
+            return None
+
+        parsed = parsed.astype(np.float64)
+        if (format_numbers(parsed) != values).any():
+            return None
+        return parsed
+
+    def _sniff_date(self, values):
+        """
+        Find a date format for which all values are restored exactly. Returns a
+        tuple of the format and the parsed values, or None.
+        """
+        for fmt in self.DATE_FORMATS:
+            parsed = pd.to_datetime(values, format=fmt, errors='coerce')
+            if parsed.isnull().any():
+                continue
+            if (parsed.dt.strftime(fmt) == values).all():
+                return fmt, parsed
+
+    def text_column(self, i):
+        """
+        Column with its original text, also if it is a typed column. Categorical
+        columns are returned as text as well. Columns that are not typed are
+        returned as they are.
+
+        :param i: zero based column index.
+        :return: `pd.Series`.
+        """
+        column = self.df.iloc[:, i]
+        kind, fmt = self._text_formats.get(i, (None, None))
+        if kind == 'number' and pd.api.types.is_float_dtype(column):
+            return format_numbers(column)
+        if kind == 'date' and pd.api.types.is_datetime64_any_dtype(column):
+            return column.dt.strftime(fmt).where(column.notnull())
+        if pd.api.types.is_categorical_dtype(column):
+            return column.astype(object)
+        return column
+
+    def text_df(self):
+        """
+        Dataframe with all typed columns converted back to their original text.
+
+        :return: `pd.DataFrame`.
+        """
+        df = self.df  # Loading the dataframe sets the text formats.
+        if not self._text_formats:
+            return df
+
+        text_df = pd.concat([self.text_column(i) if i in self._text_formats else df.iloc[:, i]
+                             for i in range(df.shape[1])], axis=1)
+        text_df.columns = df.columns
+        return text_df
+
+    def _cached_profile(self, i):
+        """
+        The cached profile of a column, or None if the column has not been profiled
+        or no longer holds the values it was profiled with.
+        """
+        cached = self._profiles.get(i)
+        if cached is None:
+            return None
+        values, column_profile = cached
+        if same_values(self.df.iloc[:, i].values, values):
+            return column_profile
+        del self._profiles[i]
+
+    def _missing_profiles(self):
+        """Zero based indices of the columns without a valid cached profile."""
+        return [i for i in range(self.df.shape[1]) if self._cached_profile(i) is None]
+
+    def _keep_profiles(self, profiles):
+        """Cache profiles by column index, with a copy of the values of their columns."""
+        df = self.df
+        for i, column_profile in profiles.items():
+            self._profiles[i] = df.iloc[:, i].values.copy(), column_profile
+
+    @property
+    def profile(self):
+        """
+        Dictionary with a :class:`ColumnProfile` for every column, by zero based
+        column index. Columns are profiled in one pass on first request, and the
+        results are cached while the values of their column do not change.
+
+        :return: dict.
+        """
+        return {i: self.column_profile(i) for i in range(self.df.shape[1])}
+
+    def column_profile(self, i):
+        """
+        The :class:`ColumnProfile` of a single column, see :attr:`profile`.
+
+        :param i: zero based column index.
+        :return: `ColumnProfile`.
+        """
+        column_profile = self._cached_profile(i)
+        if column_profile is None and i < self.df.shape[1]:
+            self._keep_profiles(profile_df(self.df, self._missing_profiles()))
+            column_profile = self._profiles[i][1]
+        return column_profile
+
+    def _track_columns(self, columns):
+        super()._track_columns(columns)
+        for i in columns:
+            self._profiles.pop(i, None)
+
+    def adopt_df(self, other):
+        super().adopt_df(other)
+        self._text_formats = dict(other._text_formats)
+
+
+def format_numbers(series):
+    """
+    Format floats as text, integers without decimals and other numbers in
+    their shortest representation. Missing values stay missing.
+
+    :param series: `pd.Series` with floats.
+    :return: `pd.Series` with strings.
+    """
+    values = series.values.astype(np.float64)
+    is_int = np.isfinite(values) & (np.floor(values) == values) & (np.abs(values) < 2 ** 53)
+    text = pd.Series([repr(float(x)) for x in values], index=series.index, dtype=object, name=series.name)
+    text[is_int] = pd.Series(values[is_int].astype(np.int64).astype(str), index=series.index[is_int])
+    return text.where(series.notnull())
+
+
+# Summary of the values in a data file column. Numbers are only given
+# if all values in the column can be converted to float.
+ColumnProfile = namedtuple('ColumnProfile', ['is_numeric', 'min', 'max', 'nulls', 'is_empty', 'unique', 'counts'])
+
+
+def as_floats(values):
+    """
+    Convert values to a float array, as :func:`float` would. Returns None if
+    any of the values cannot be converted.
+
+    :param values: array like.
+    :return: `np.ndarray` or None.
+    """
+    values = np.asarray(values, dtype=object)
+    floats = pd.to_numeric(pd.Series(values), errors='coerce').values.astype(np.float64)
+
+    # Values not understood by pandas, or missing, are converted one by one.
+    for i in np.flatnonzero(np.isnan(floats)):
+        try:
+            floats[i] = float(values[i])
+        except (ValueError, TypeError):
+            return None
+    return floats
+
+
+def profile_column(column):
+    """
+    Profile a single column.
+
+    :param column: `pd.Series`.
+    :return: `ColumnProfile`.
+    """
+    unique = column.unique()
+    counts = column.value_counts(dropna=False)
+    nulls = int(column.isnull().sum() + column.isin(['']).sum())
+
+    if is_numeric_dtype(column):
+        floats = column.values.astype(np.float64)
+    elif is_datetime64_any_dtype(column):
+        floats = None
+    else:
+        floats = as_floats(unique)
+
+    is_numeric = floats is not None
+    min_ = max_ = None
+    if is_numeric:
+        floats = floats[~np.isnan(floats)]
+        min_, max_ = (float(floats.min()), float(floats.max())) if len(floats) else (np.nan, np.nan)
+
+    return ColumnProfile(is_numeric=is_numeric, min=min_, max=max_, nulls=nulls,
+                         is_empty=nulls == len(column), unique=unique, counts=counts)
+
+
+def profile_df(df, columns=None):
+    """
+    Profile the columns of a dataframe.
+
+    :param df: `pd.DataFrame`.
+    :param columns: zero based column indices, defaults to all columns.
+    :return: dictionary with column index as key and `ColumnProfile` as value.
+    """
+    if columns is None:
+        columns = range(df.shape[1])
+    return {i: profile_column(df.iloc[:, i]) for i in columns}
@@ -1,6 +1,9 @@
-from ..utils import Mappings, path_converter, ReservedKeywordException, is_not_a_value
+from ..utils import Mappings, path_converter, ReservedKeywordException
 
 import pandas as pd
+from pandas.api.types import is_object_dtype
+
+from .DataFile import as_floats
 
 
 class VarID:
@@ -109,7 +112,31 @@ class Variable:
 
     @values.setter
     def values(self, series: pd.Series):
-        self.datafile.df.iloc[:, self._zero_column] = series
+        self.datafile._track_columns([self._zero_column])
+        df = self.datafile.df
+        if not is_object_dtype(df.iloc[:, self._zero_column]):
+            # Typed columns cannot hold arbitrary new values.
+            df[df.columns[self._zero_column]] = df.iloc[:, self._zero_column].astype(object)
+        df.iloc[:, self._zero_column] = series
+
+    @property
+    def text_values(self):
+        """
+        Values as text exactly as found in the datafile, also if the datafile
+        is loaded in typed mode, see :meth:`tmtk.DataFile.text_column`.
+
+        :return: `pd.Series`.
+        """
+        return self.datafile.text_column(self._zero_column)
+
+    @property
+    def profile(self):
+        """
+        Profile of the values of this variable in the datafile.
+
+        :return: `tmtk.clinical.DataFile.ColumnProfile`.
+        """
+        return self.datafile.column_profile(self._zero_column)
 
     @property
     def unique_values(self):
@@ -117,7 +144,7 @@ class Variable:
 
         :return: Unique set of values in the datafile.
         """
-        return self.values.unique()
+        return self.profile.unique
 
     @property
     def var_id(self):
@@ -134,21 +161,15 @@ class Variable:
 
         :return: bool.
         """
-        try:
-            set(map(float, self.values))
-            return True
-        except (ValueError, TypeError):
-            return False
+        return self.profile.is_numeric
 
     @property
     def min(self):
-        if self.is_numeric_in_datafile:
-            return min(set(map(float, self.values)))
+        return self.profile.min
 
     @property
     def max(self):
-        if self.is_numeric_in_datafile:
-            return max(set(map(float, self.values)))
+        return self.profile.max
 
     @property
     def is_numeric(self):
@@ -164,11 +185,8 @@ class Variable:
         if not self.is_in_wordmap:
             return self.is_numeric_in_datafile
         else:
-            try:
-                set(map(float, self.mapped_values))
-                return True
-            except (ValueError, TypeError):
-                return False
+            word_map = self.word_map_dict
+            return as_floats([word_map.get(v, v) for v in self.unique_values]) is not None
 
     @property
     def is_empty(self):
@@ -177,7 +195,7 @@ class Variable:
 
         :return: bool.
         """
-        return self.values.apply(is_not_a_value).all()
+        return self.profile.is_empty
 
     @property
     def concept_path(self):
@@ -198,7 +216,7 @@ class Variable:
 
         :return: str.
         """
-        return self.parent.ColumnMapping.select_row(self.var_id)[1]
+        return self.parent.ColumnMapping.select_item(self.var_id, 1)
 
     @category_code.setter
     def category_code(self, value):
@@ -224,7 +242,7 @@ class Variable:
 
         :return: str.
         """
-        return self.parent.ColumnMapping.select_row(self.var_id)[3]
+        return self.parent.ColumnMapping.select_item(self.var_id, 3)
 
     @data_label.setter
     def data_label(self, value):
@@ -239,7 +257,7 @@ class Variable:
 
         :return: dict.
         """
-        values = set(self.values)
+        values = set(self.text_values)
         d = dict(zip(values, values))
         d.update(self.parent.WordMapping.get_word_map(self.var_id))
         return d
@@ -251,14 +269,14 @@ class Variable:
     @property
     def mapped_values(self):
         """
-        Data items after word mapping.
+        Data items as text after word mapping.
 
         :return: list.
         """
         if self.is_in_wordmap:
-            return self.values.map(self.word_map_dict)
+            return self.text_values.map(self.word_map_dict)
         else:
-            return self.values
+            return self.text_values
 
     @property
     def forced_categorical(self):
@@ -280,7 +298,7 @@ class Variable:
 
         :return: bool.
         """
-        return tuple(self.var_id) in self.parent.WordMapping.df.index
+        return self.parent.WordMapping.has_word_map(self.var_id)
     
     def word_mapped_not_present(self):
         """
@@ -288,20 +306,8 @@ class Variable:
 
         :return: set.
         """
-        if not self.is_in_wordmap:
-            return set()
-
-        mapped_value_column = self.parent.WordMapping.df.columns[2]
-
-        t_index = tuple(self.var_id)
-        mapped_values = self.parent.WordMapping.df.loc[t_index, mapped_value_column]
-
-        if type(mapped_values) != str:
-            mapped_values = set(mapped_values)
-        else:
-            mapped_values = {mapped_values}
-
-        return mapped_values - set(self.values)
+        mapped_values = set(self.parent.WordMapping.get_word_map(self.var_id))
+        return mapped_values - set(self.text_values)
 
     @property
     def header(self):
@@ -321,7 +327,7 @@ class Variable:
 
     @property
     def reference_column(self):
-        return self.parent.ColumnMapping.select_row(self.var_id)[4]
+        return self.parent.ColumnMapping.select_item(self.var_id, 4)
 
     @reference_column.setter
     def reference_column(self, value):
@@ -329,7 +335,7 @@ class Variable:
 
     @property
     def concept_code(self):
-        return self.parent.ColumnMapping.select_row(self.var_id)[5]
+        return self.parent.ColumnMapping.select_item(self.var_id, 5)
 
     @concept_code.setter
     def concept_code(self, value):
@@ -346,7 +352,7 @@ class Variable:
             return self.parent.Modifiers.df.loc[self.modifier_code, self.parent.Modifiers.df.columns[3]]
         else:
             try:
-                return self.parent.ColumnMapping.select_row(self.var_id)[6]
+                return self.parent.ColumnMapping.select_item(self.var_id, 6)
             except IndexError:
                 return None
 
@@ -357,7 +363,7 @@ class Variable:
     @property
     def modifier_code(self):
         """ Requires implementation, always returns '@'."""
-        return self.parent.ColumnMapping.select_row(self.var_id)[6] if self.data_label == 'MODIFIER' else '@'
+        return self.parent.ColumnMapping.select_item(self.var_id, 6) if self.data_label == 'MODIFIER' else '@'
 
     def _get_all(self, label: str):
         """
@@ -369,11 +375,8 @@ class Variable:
         :param str label: data label.
         :return list: a list of variables.
         """
-        vars_ = self.parent.find_variables_by_label(label, self.var_id.filename)
-        inclusion_criteria = (None, pd.np.nan, '')
-        return [var for var in vars_
-                if var.reference_column in inclusion_criteria
-                or str(self.column) in str(var.reference_column).split(',')]
+        var_ids = self.parent.ColumnMapping.keyword_ids(label, self.var_id.filename, self.column)
+        return [self.parent.get_variable(var_id) for var_id in var_ids]
 
     def _get_one_or_none(self, label: str):
         """
@@ -1,4 +1,5 @@
 import os
+from contextlib import contextmanager
 
 import pandas as pd
 
@@ -11,6 +12,9 @@ class WordMapping(FileBase, ValidateMixin):
     Class representing the word mapping file.
     """
 
+    # All columns are kept to determine word map changes.
+    snapshot_columns = (0, 1, 2, 3)
+
     def __init__(self, params=None):
         """
         Initialize by giving a params object.
@@ -29,12 +33,54 @@ class WordMapping(FileBase, ValidateMixin):
             self.params.__dict__['WORD_MAP_FILE'] = os.path.basename(self.path)
 
         super().__init__()
-        self._initial_word_map = self.word_map_dicts
+
+        # Positions of the rows of every variable identifier tuple, see _position_store.
+        self._positions = {}
+        self._positions_version = None
+        # Bumped every time an index is built, see build_index.
+        self._index_version = 0
+        # Word maps set inside a batch, by variable identifier tuple.
+        self._pending = None
 
     def _validate_dimensions(self):
         if self.df.shape[1] != 4:
             self.msgs.error("Wordmapping file does not have 4 columns!")
 
+    @property
+    def _position_store(self):
+        """
+        Dictionary with the positions of the rows of every variable identifier tuple.
+        It is only rebuilt after a new index has been built, which happens when a
+        dataframe is loaded or set. Values are always read from the dataframe itself,
+        so changes made directly on the dataframe are seen without calling
+        mark_changed(). Call :meth:`build_index` after changing the filename or column
+        number of a row directly on the dataframe.
+
+        :return: dict.
+        """
+        df = self.df
+        if self._index_version != self._positions_version:
+            positions = {}
+            for i, var_id in enumerate(df.index):
+                positions.setdefault(var_id, []).append(i)
+            self._positions, self._positions_version = positions, self._index_version
+        return self._positions
+
+    @staticmethod
+    def _group(df, var_ids=None):
+        """
+        Group the rows of a word mapping dataframe by variable identifier tuple.
+
+        :param df: `pd.DataFrame`.
+        :param var_ids: if given, only include these variables.
+        :return: dictionary with {datafile value: mapped value} dictionaries.
+        """
+        word_maps = {}
+        for var_id, value, mapped in zip(zip(df.iloc[:, 0], df.iloc[:, 1]), df.iloc[:, 2], df.iloc[:, 3]):
+            if var_ids is None or var_id in var_ids:
+                word_maps.setdefault(var_id, {})[value] = mapped
+        return word_maps
+
     def get_word_map(self, var_id):
         """
         Return dict with value in data file, and the mapped value
@@ -44,16 +90,13 @@ class WordMapping(FileBase, ValidateMixin):
         :return: dict.
         """
         var_id = tuple(var_id)
-
-        if var_id in self.df.index:
-            rows = self.df.loc[var_id]
-            if isinstance(rows, pd.DataFrame):
-                return dict(zip(rows.iloc[:, 2], rows.iloc[:, 3]))
-            else:
-                return {rows[2]: rows[3]}
-
-        else:
+        if self._pending is not None and var_id in self._pending:
+            return dict(self._pending[var_id])
+        positions = self._position_store.get(var_id)
+        if not positions:
             return {}
+        df = self.df
+        return dict(zip(df[df.columns[2]].values[positions], df[df.columns[3]].values[positions]))
 
     def set_word_map(self, var_id, d):
         """
@@ -62,16 +105,65 @@ class WordMapping(FileBase, ValidateMixin):
         :param var_id: variable identifier tuple.
         :param d: dictionary that contains the value map.
         """
-        var_id = tuple(var_id)
+        self.set_word_maps({tuple(var_id): d})
+
+    def set_word_maps(self, word_maps):
+        """
+        Set the word mappings for many variables at once. Existing mappings of
+        these variables are replaced. Inside :meth:`batch` the changes are
+        collected and only written to the dataframe at the end of the batch.
+
+        :param word_maps: dictionary with variable identifier tuples as keys and
+            value map dictionaries as values.
+        """
+        word_maps = {tuple(var_id): dict(d) for var_id, d in word_maps.items()}
+        if self._pending is not None:
+            self._pending.update(word_maps)
+        elif word_maps:
+            self._write_word_maps(word_maps)
 
-        self.df.drop(var_id, inplace=True, errors='ignore')
+    def _write_word_maps(self, word_maps):
+        df = self.df
+        keep = ~df.index.isin(list(word_maps))
+        new_rows = pd.DataFrame([[var_id[0], var_id[1], k, v]
+                                 for var_id, d in word_maps.items() for k, v in d.items()],
+                                columns=df.columns)
 
-        self.df = self.df.append(
-                        pd.DataFrame(
-                            [[var_id[0], var_id[1], k, v] for k, v in d.items()],
-                            columns=self.df.columns
-                        ),
-                        ignore_index=True)
+        self.df = pd.concat([df[keep], new_rows], ignore_index=True)
+
+    @contextmanager
+    def batch(self):
+        """
+        Context manager to collect word map changes and write them to the
+        dataframe once, when the outermost batch ends without an exception.
+        If an exception occurs, the changes of the batch are discarded.
+
+            with clinical.WordMapping.batch():
+                for var_id, d in word_maps.items():
+                    clinical.WordMapping.set_word_map(var_id, d)
+        """
+        if self._pending is not None:
+            yield
+            return
+
+        self._pending = {}
+        try:
+            yield
+            pending = self._pending
+        finally:
+            self._pending = None
+
+        if pending:
+            self._write_word_maps(pending)
+
+    def has_word_map(self, var_id):
+        """
+        True if the variable has a word mapping.
+
+        :param var_id: tuple of filename and column number.
+        :return: bool.
+        """
+        return bool(self.get_word_map(var_id))
 
     @property
     def included_datafiles(self):
@@ -91,6 +183,7 @@ class WordMapping(FileBase, ValidateMixin):
             df = self.df
         df.set_index(list(df.columns[[0, 1]]), drop=False, inplace=True)
         df.sort_index(inplace=True)
+        self._index_version += 1
         return df
 
     def create_df(self):
@@ -117,7 +210,44 @@ class WordMapping(FileBase, ValidateMixin):
     @property
     def word_map_dicts(self):
         """Dictionary with all variable ids as keys and word map dicts as value."""
-        return {t: self.get_word_map(t) for t in self.df.index}
+        word_maps = self._group(self.df)
+        for var_id, d in (self._pending or {}).items():
+            if d:
+                word_maps[var_id] = dict(d)
+            else:
+                word_maps.pop(var_id, None)
+        return word_maps
+
+    def _word_map_diff(self):
+        """
+        Changes in word maps since the dataframe was loaded. Rows of the initial
+        and current dataframe are compared in one merge, only variables with
+        changed rows are compared in detail.
+
+        :return: dictionary with variable identifier tuples as keys and dictionaries as values.
+        """
+        if self.initial_df is None or self.initial_df.shape[1] < 4:
+            return {}
+
+        def rows(df):
+            df = df.iloc[:, :4].copy()
+            df.columns = ['filename', 'column', 'value', 'mapped']
+            df['column'] = df['column'].astype(int)
+            return df.drop_duplicates(['filename', 'column', 'value'], keep='last').reset_index(drop=True)
+
+        current = self.df if self._pending is None else \
+            pd.concat([self.df[~self.df.index.isin(list(self._pending))],
+                       pd.DataFrame([[var_id[0], var_id[1], k, v] for var_id, d in self._pending.items()
+                                     for k, v in d.items()], columns=self.df.columns)], ignore_index=True)
+
+        before, after = rows(self.initial_df), rows(current)
+        merged = before.merge(after, on=['filename', 'column', 'value'], how='outer', indicator=True)
+        changed = merged[(merged._merge != 'both') | (merged.mapped_x != merged.mapped_y)]
+        var_ids = set(zip(changed.filename, changed.column))
+        if not var_ids:
+            return {}
+
+        return word_map_diff(self._group(self.initial_df, var_ids), self._group(current, var_ids))
 
     def word_map_changes(self, silent=False):
         """
@@ -126,7 +256,7 @@ class WordMapping(FileBase, ValidateMixin):
         :param silent: if True, only print output.
         :return: if `silent=False` return dictionary with changes since load.
         """
-        diff = word_map_diff(self._initial_word_map, self.word_map_dicts)
+        diff = self._word_map_diff()
         if not silent:
             for var_id, d in diff.items():
                 print("{}: {}".format(*var_id))
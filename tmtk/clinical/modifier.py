@@ -10,6 +10,8 @@ class Modifiers(FileBase):
     Class representing the modifiers file.
     """
 
+    path_columns = (0, )
+
     def __init__(self, params=None):
         """
         Initialize by giving a params object.
@@ -34,18 +34,20 @@ class CopyNumberVariation(HighDimBase):
     def _validate_probabilities(self):
 
         bad_regions = []
-        bad_samples = []
-        everything_okay = True
+        bad_samples = set()
 
-        for sample in set(self.samples):
-            columns = self.header.str.contains(sample + '.prob')
-            sample_df = self.df.iloc[:, columns].astype(float)
-            not_full_nan = ~sample_df.isnull().all(axis=1)
-            not_near_1 = ~sample_df.sum(axis=1).between(0.99, 1.01) & not_full_nan
-            if any(not_near_1):
-                everything_okay = False
-                bad_samples.append(sample)
-                [bad_regions.append(x) for x in self.df.loc[not_near_1, self.df.columns[0]]]  # Adds region ids to list.
+        sample_columns = {sample: self.header.str.contains(sample + '.prob') for sample in set(self.samples)}
+
+        for chunk in self.iter_numeric_chunks():
+            for sample, columns in sample_columns.items():
+                sample_df = chunk.iloc[:, columns].astype(float)
+                not_full_nan = ~sample_df.isnull().all(axis=1)
+                not_near_1 = ~sample_df.sum(axis=1).between(0.99, 1.01) & not_full_nan
+                if any(not_near_1):
+                    bad_samples.add(sample)
+                    bad_regions += list(chunk.loc[not_near_1, chunk.columns[0]])  # Adds region ids to list.
+
+        everything_okay = not bad_samples
 
         if not everything_okay:
             m = 'Samples ({}) where have regions where CNV probabilities do not approximate 1. ' \
@@ -1,9 +1,12 @@
 import pandas as pd
 import os
 
+from .MatrixStore import MatrixStore
 from .SampleMapping import SampleMapping
 
-from ..utils import FileBase, ValidateMixin, PathError, ClassError, TransmartBatch, summarise
+from tmtk import options
+from ..utils import (FileBase, ValidateMixin, PathError, ClassError, TransmartBatch, summarise, cached_property,
+                     find_file, open_file)
 from ..annotation import ChromosomalRegions
 
 
@@ -21,16 +24,17 @@ class HighDimBase(FileBase, ValidateMixin):
         """
         if params and params.is_viable():
             self.params = params
-            self.path = os.path.join(params.dirname, params.DATA_FILE)
+            self.path = find_file(os.path.join(params.dirname, params.DATA_FILE))
         elif path and os.path.exists(self.path):
             self.path = path
         else:
             raise PathError
 
         super().__init__()
+        self._matrix_store = None
 
         if hasattr(params, 'MAP_FILENAME'):
-            self.sample_mapping = SampleMapping(os.path.join(params.dirname, params.MAP_FILENAME))
+            self.sample_mapping = SampleMapping(find_file(os.path.join(params.dirname, params.MAP_FILENAME)))
             self.platform = self.sample_mapping.platform
 
             self._parent = parent
@@ -43,6 +47,102 @@ class HighDimBase(FileBase, ValidateMixin):
     def __repr__(self):
         return 'HighDim: {} ({})'.format(self.params.datatype, self.params.dirname)
 
+    @property
+    def header(self):
+        """Header of the data file. Only the first line is read if the dataframe is not loaded."""
+        if self.df_is_loaded:
+            return self.df.columns
+        return pd.Index(self._file_header)
+
+    @cached_property
+    def _file_header(self):
+        # Kept as a list, pd.Index objects can hold references to themselves.
+        with open_file(self.path) as f:
+            return list(pd.read_csv(f, sep='\t', nrows=0).columns)
+
+    def iter_chunks(self, chunksize=None):
+        """
+        Iterate over the rows of the data file in chunks, without loading the entire
+        file. The first column contains the biomarker identifiers as strings, the
+        other columns are parsed as numbers where possible. If the dataframe has been
+        loaded already, chunks of the in memory dataframe are used instead.
+
+        :param chunksize: number of rows per chunk, defaults to `tmtk.options.highdim_chunksize`.
+        :return: generator of `pd.DataFrame` objects.
+        """
+        chunksize = chunksize or options.highdim_chunksize
+
+        if self.df_is_loaded:
+            for start in range(0, max(self.df.shape[0], 1), chunksize):
+                yield self._typed_chunk(self.df.iloc[start:start + chunksize])
+            return
+
+        header = self.header
+        empty = True
+        with open_file(self.path) as f:
+            for chunk in pd.read_csv(f, sep='\t', chunksize=chunksize, dtype={header[0]: object}):
+                empty = False
+                yield chunk
+
+        if empty:
+            yield pd.DataFrame(columns=header)
+
+    @staticmethod
+    def _typed_chunk(chunk):
+        chunk = chunk.copy()
+        for column in chunk.columns[1:]:
+            try:
+                chunk[column] = pd.to_numeric(chunk[column])
+            except (ValueError, TypeError):
+                pass
+        return chunk
+
+    @property
+    def matrix(self):
+        """
+        :class:`MatrixStore` with the numerical values of the data file on disk, as
+        a memory mapped array. The store is created on first use and rebuilt when
+        the data file changes.
+        """
+        if self._matrix_store is None:
+            self._matrix_store = MatrixStore(self.path)
+        return self._matrix_store
+
+    def build_matrix_store(self, dtype=None):
+        """
+        Convert the data file to a memory mapped matrix store, unless an up to date
+        store exists already.
+
+        :param dtype: 'float32' or 'float64', defaults to `tmtk.options.highdim_matrix_dtype`.
+        :return: :class:`MatrixStore`.
+        """
+        self._matrix_store = MatrixStore(self.path, dtype=dtype)
+        self._matrix_store.values
+        return self._matrix_store
+
+    @property
+    def _use_matrix_store(self):
+        return options.highdim_matrix_store and not self.df_is_loaded
+
+    def iter_numeric_chunks(self, chunksize=None):
+        """
+        Like :meth:`iter_chunks`, but reads from the matrix store if
+        `tmtk.options.highdim_matrix_store` is set and the dataframe is not loaded.
+
+        :param chunksize: number of rows per chunk, defaults to `tmtk.options.highdim_chunksize`.
+        :return: generator of `pd.DataFrame` objects.
+        """
+        if self._use_matrix_store:
+            return self.matrix.iter_chunks(chunksize)
+        return self.iter_chunks(chunksize)
+
+    @property
+    def data_biomarkers(self):
+        """Series with the biomarker identifiers in the first column of the data file."""
+        if self._use_matrix_store:
+            return pd.Series(self.matrix.biomarkers)
+        return pd.concat([chunk.iloc[:, 0] for chunk in self.iter_chunks()], ignore_index=True)
+
     def _check_header_extensions(self):
 
         illegal_header_items = []
@@ -80,7 +180,7 @@ class HighDimBase(FileBase, ValidateMixin):
         elif not isinstance(destination, pd.DataFrame):
             raise ClassError(found=type(destination), expected='pd.DataFrame, or ChromosomalRegions')
 
-        remapped = remap_chromosomal_regions(datafile=self.df,
+        remapped = remap_chromosomal_regions(datafile=self.iter_chunks(),
                                              origin_platform=self.annotation_file.df,
                                              destination_platform=destination)
         return remapped
@@ -92,10 +192,20 @@ class HighDimBase(FileBase, ValidateMixin):
                               ).get_loading_namespace()
 
     def _get_lazy_batch_items(self):
-        return {self.params.path: (len(self.sample_mapping.samples), self.path)}
+        manifest = self._manifest
+        if manifest is None:
+            return {self.params.path: (len(self.sample_mapping.samples), self.path)}
+
+        sample_mapping = self.sample_mapping
+        if sample_mapping.df_is_loaded:
+            samples = len(sample_mapping.samples)
+        else:
+            samples = manifest.rows(sample_mapping.path)
+        return {self.params.path: samples * manifest.rows(self.path)}
 
     def _validate_missing_annotation(self):
-        missing_annotations = list(self.df.iloc[:, 0][~self.df.iloc[:, 0].isin(self.annotation_file.biomarkers)])
+        data_biomarkers = self.data_biomarkers
+        missing_annotations = list(data_biomarkers[~data_biomarkers.isin(self.annotation_file.biomarkers)])
 
         if missing_annotations:
             self.msgs.warning('Missing annotations found.', warning_list=missing_annotations)
@@ -103,7 +213,7 @@ class HighDimBase(FileBase, ValidateMixin):
             self.msgs.okay('All data items have associated annotations.')
 
     def _validate_missing_data_items(self):
-        missing_data = list(self.annotation_file.biomarkers[~self.annotation_file.biomarkers.isin(self.df.iloc[:, 0])])
+        missing_data = list(self.annotation_file.biomarkers[~self.annotation_file.biomarkers.isin(self.data_biomarkers)])
 
         if not missing_data:
             self.msgs.okay('The entire annotation platform seems to have associated data.')
@@ -0,0 +1,186 @@
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from tmtk import options
+from ..utils import file_cache, open_file
+
+MATRIX_SUFFIX = '.matrix'
+INDEX_SUFFIX = '.matrix.index'
+
+
+class MatrixStore:
+    """
+    Numerical part of a high dimensional data file, stored as a memory mapped
+    array on disk. Biomarkers (first column) and column names (header) are
+    kept in a separate index file. The values are read through the page cache
+    of the operating system, so only the parts that are used take up memory.
+
+    The store describes the source file on disk and is rebuilt automatically
+    when that file changes. Values that are not numerical are stored as NaN.
+    """
+
+    __slots__ = ('path', 'dtype', '_index', '_values')
+
+    def __init__(self, path, dtype=None):
+        """
+        :param path: path to the high dimensional data file.
+        :param dtype: numpy float type of the store, defaults to `tmtk.options.highdim_matrix_dtype`.
+        """
+        self.path = path
+        self.dtype = np.dtype(dtype or options.highdim_matrix_dtype)
+        self._index = None
+        self._values = None
+
+    def __repr__(self):
+        return 'MatrixStore: {} ({})'.format(self.path, self.dtype)
+
+    @property
+    def matrix_path(self):
+        return file_cache.cache_path(self.path, suffix=MATRIX_SUFFIX)
+
+    @property
+    def index_path(self):
+        return file_cache.cache_path(self.path, suffix=INDEX_SUFFIX)
+
+    def _read_index(self):
+        try:
+            with open(self.index_path, 'rb') as f:
+                return pickle.load(f)
+        except Exception:
+            return None
+
+    @property
+    def is_current(self):
+        """True if the store on disk exists and matches the source file."""
+        index = self._index or self._read_index()
+        return (index is not None
+                and index.get('dtype') == self.dtype.str
+                and os.path.exists(self.matrix_path)
+                and file_cache.signature_matches(index.get('signature'), self.path))
+
+    def build(self, chunksize=None):
+        """
+        Convert the source file to a memory mapped store. The source file is
+        read in chunks, so the whole file is never loaded at once.
+
+        :param chunksize: number of rows per chunk, defaults to `tmtk.options.highdim_chunksize`.
+        """
+        self._values = None
+        signature = file_cache.file_signature(self.path, with_hash=True)
+        with open_file(self.path) as source:
+            header = pd.read_csv(source, sep='\t', nrows=0).columns
+
+        biomarkers = []
+        tmp_path = '{}.{}.tmp'.format(self.matrix_path, os.getpid())
+        os.makedirs(os.path.dirname(self.matrix_path), exist_ok=True)
+
+        with open(tmp_path, 'wb') as f, open_file(self.path) as source:
+            for chunk in pd.read_csv(source, sep='\t', dtype={header[0]: object},
+                                     chunksize=chunksize or options.highdim_chunksize):
+                biomarkers.append(chunk.iloc[:, 0])
+                values = chunk.iloc[:, 1:].apply(pd.to_numeric, errors='coerce')
+                f.write(np.ascontiguousarray(values.values, dtype=self.dtype).tobytes())
+
+        biomarkers = pd.concat(biomarkers, ignore_index=True) if biomarkers else pd.Series([], dtype=object)
+        index = {'dtype': self.dtype.str,
+                 'signature': signature,
+                 'biomarkers': pd.Index(biomarkers, name=header[0]),
+                 'columns': header[1:]}
+
+        os.replace(tmp_path, self.matrix_path)
+        with open(self.index_path, 'wb') as f:
+            pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        self._index = index
+
+    def _ensure_current(self):
+        if self._values is not None:
+            if file_cache.same_state(self._index['signature'], file_cache.file_signature(self.path)):
+                return
+
+        self._index = self._read_index()
+        if not self.is_current:
+            self.build()
+        elif self._index['signature']['mtime'] != os.stat(self.path).st_mtime_ns:
+            # Source file was touched, but has the same contents.
+            self._index['signature'] = file_cache.file_signature(self.path, with_hash=True)
+            with open(self.index_path, 'wb') as f:
+                pickle.dump(self._index, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        shape = (len(self._index['biomarkers']), len(self._index['columns']))
+        if shape[0] * shape[1]:
+            self._values = np.memmap(self.matrix_path, dtype=self.dtype, mode='r', shape=shape)
+        else:
+            self._values = np.empty(shape, dtype=self.dtype)
+
+    @property
+    def values(self):
+        """Read only memory mapped `np.ndarray` with biomarkers as rows and columns as in the header."""
+        self._ensure_current()
+        return self._values
+
+    @property
+    def biomarkers(self):
+        """`pd.Index` of the biomarkers in the first column of the data file."""
+        self._ensure_current()
+        return self._index['biomarkers']
+
+    @property
+    def columns(self):
+        """`pd.Index` of the column names of the numerical columns."""
+        self._ensure_current()
+        return self._index['columns']
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def loc(self, biomarkers=None, columns=None):
+        """
+        Select values by biomarker and column name. Only the selected values are read.
+
+        :param biomarkers: list of biomarkers, or None for all.
+        :param columns: list of column names, or None for all.
+        :return: `pd.DataFrame` with biomarkers as index.
+        """
+        values = self.values
+        rows = slice(None) if biomarkers is None else self._positions(self.biomarkers, biomarkers)
+        cols = slice(None) if columns is None else self._positions(self.columns, columns)
+        return pd.DataFrame(np.array(values[rows][:, cols]),
+                            index=self.biomarkers[rows],
+                            columns=self.columns[cols])
+
+    @staticmethod
+    def _positions(index, labels):
+        positions = index.get_indexer(labels)
+        if (positions == -1).any():
+            raise KeyError([label for label, p in zip(labels, positions) if p == -1])
+        return positions
+
+    def iter_chunks(self, chunksize=None):
+        """
+        Iterate over the store in chunks formatted like the data file, so with the
+        biomarkers in the first column.
+
+        :param chunksize: number of rows per chunk, defaults to `tmtk.options.highdim_chunksize`.
+        :return: generator of `pd.DataFrame` objects.
+        """
+        chunksize = chunksize or options.highdim_chunksize
+        values, biomarkers = self.values, self.biomarkers
+
+        for start in range(0, max(len(biomarkers), 1), chunksize):
+            chunk = pd.DataFrame(np.array(values[start:start + chunksize]), columns=self.columns)
+            chunk.insert(0, biomarkers.name, biomarkers[start:start + chunksize].values)
+            yield chunk
+
+    def clear(self):
+        """Remove the store from disk."""
+        self._index = self._values = None
+        for path in (self.matrix_path, self.index_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
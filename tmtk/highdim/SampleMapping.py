@@ -1,6 +1,8 @@
 import os
 
-from ..utils import ValidateMixin, FileBase, md5, path_converter
+import pandas as pd
+
+from ..utils import ValidateMixin, FileBase, md5, path_converter, path_converter_series
 
 
 class SampleMapping(FileBase, ValidateMixin):
@@ -8,6 +10,8 @@ class SampleMapping(FileBase, ValidateMixin):
     Base class for subject sample mapping
     """
 
+    path_columns = (8, )
+
     def __init__(self, path=None):
         if not os.path.exists(path):
             self.path = self.create_sample_mapping(path)
@@ -26,34 +30,26 @@ class SampleMapping(FileBase, ValidateMixin):
 
     @property
     def _converted_paths(self):
-        return self.df.apply(self._find_path, axis=1)
+        df = self.df
+        columns = [df.iloc[:, i].astype(str) for i in (4, 5, 6, 7)]
+        paths = [self._fill_placeholders(cp, *values) for cp, *values in zip(df.iloc[:, 8], *columns)]
+        return path_converter_series(pd.Series(paths, index=df.index, dtype=object))
 
     @staticmethod
-    def _find_path(row):
-        cp = row.iloc[8]
+    def _fill_placeholders(cp, platform, sample_type, tissue_type, time_point):
         # Legacy
-        cp = cp.replace('ATTR1', str(row.iloc[6]))
-        cp = cp.replace('ATTR2', str(row.iloc[7]))
+        cp = cp.replace('ATTR1', tissue_type)
+        cp = cp.replace('ATTR2', time_point)
 
         # Current
-        cp = cp.replace('PLATFORM', str(row.iloc[4]))
-        cp = cp.replace('SAMPLETYPE', str(row.iloc[5]))
-        cp = cp.replace('TISSUETYPE', str(row.iloc[6]))
-        cp = cp.replace('TIMEPOINT', str(row.iloc[7]))
-
-        return path_converter(cp)
+        cp = cp.replace('PLATFORM', platform)
+        cp = cp.replace('SAMPLETYPE', sample_type)
+        cp = cp.replace('TISSUETYPE', tissue_type)
+        cp = cp.replace('TIMEPOINT', time_point)
+        return cp
 
     def update_concept_paths(self, path_dict):
-        self.df.iloc[:, 8] = self.df.apply(lambda x: self._update_row(x, path_dict), axis=1)
-
-    def _update_row(self, row, path_dict):
-        current_path = self._find_path(row)
-        current_md5 = md5(path_converter(current_path))
-        new_path = path_dict.get(current_md5)
-        if new_path:
-            return new_path
-        else:
-            return current_path
+        self.df.iloc[:, 8] = self._converted_paths.map(lambda p: path_dict.get(md5(p)) or p)
 
     def __str__(self):
         return self.path
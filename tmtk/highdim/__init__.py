@@ -5,4 +5,5 @@ from .Expression import Expression
 from .Proteomics import Proteomics
 from .ReadCounts import ReadCounts
 from .Mirna import Mirna
+from .MatrixStore import MatrixStore
 from .SampleMapping import SampleMapping
@@ -14,6 +14,8 @@ def type_validator(type_):
 
 is_bool = type_validator(bool)
 is_str = type_validator(str)
+is_int = type_validator(int)
+is_float = type_validator(float)
 
 
 class OptionWrapper:
@@ -106,3 +108,113 @@ register_option('arborist_url',
                 doc='\nNot used currently.',
                 validator=is_str)
 
+
+df_cache_doc = """
+If True, dataframes loaded from study files are also stored in a binary
+cache file next to the original file. On subsequent loads of unchanged
+files the cache is used instead of parsing the text file again. Cache
+files are invalidated when size, modification time or contents of the
+original file change. Use tmtk.utils.clear_df_cache() to remove them.
+Cache files are pickles and loading them can execute arbitrary code, so
+only enable this for studies from trusted sources, or set df_cache_dir.
+"""
+register_option('df_cache',
+                default=False,
+                doc=df_cache_doc,
+                validator=is_bool)
+
+df_cache_dir_doc = """
+Directory to store dataframe cache files in. By default (empty string)
+cache files are written as hidden files next to the original files.
+"""
+register_option('df_cache_dir',
+                default='',
+                doc=df_cache_dir_doc,
+                validator=is_str)
+
+highdim_chunksize_doc = """
+Number of rows per chunk when high dimensional data files are streamed
+from disk instead of loaded as a whole, e.g. during validation. This
+bounds the memory used for these operations.
+"""
+register_option('highdim_chunksize',
+                default=10000,
+                doc=highdim_chunksize_doc,
+                validator=is_int)
+
+typed_clinical_data_doc = """
+If True, clinical data files are loaded with typed columns. Based on the
+data types in the column mapping, numerical columns are loaded as floats,
+DATE columns as datetimes and other low cardinality columns as categorical.
+Columns are only converted if their original text can be restored exactly,
+so saving a study does not change the files on disk. Keyword columns
+(e.g. SUBJ_ID) and word mapped columns are kept as text.
+"""
+register_option('typed_clinical_data',
+                default=False,
+                doc=typed_clinical_data_doc,
+                validator=is_bool)
+
+highdim_matrix_store_doc = """
+If True, validation of high dimensional data files reads the numerical
+values from a memory mapped matrix store (see HighDimBase.matrix) instead
+of parsing the text file. The store is written next to the data file, or
+in df_cache_dir, and is rebuilt when the data file changes.
+"""
+register_option('highdim_matrix_store',
+                default=False,
+                doc=highdim_matrix_store_doc,
+                validator=is_bool)
+
+highdim_matrix_dtype_doc = """
+Numpy float type used for high dimensional matrix stores, 'float64' or
+'float32'. The latter halves the size of the store at the cost of precision.
+"""
+register_option('highdim_matrix_dtype',
+                default='float64',
+                doc=highdim_matrix_dtype_doc,
+                validator=is_str)
+
+preload_memory_budget_doc = """
+Maximum memory in MB that Study.preload() (or Study(preload=True)) may use
+for loaded dataframes. Files that would exceed it are not preloaded, but
+load lazily on first use. 0 means no limit.
+"""
+register_option('preload_memory_budget',
+                default=0,
+                doc=preload_memory_budget_doc,
+                validator=is_int)
+
+preload_size_factor_doc = """
+Estimate of the memory in bytes a loaded dataframe takes per byte of text
+in its file, used by Study.preload() to keep within preload_memory_budget.
+The size of compressed files is taken after decompression, see
+tmtk.utils.Manifest. The default fits text columns, typed clinical data
+(see typed_clinical_data) and high dimensional data usually take less.
+"""
+register_option('preload_size_factor',
+                default=3.0,
+                doc=preload_size_factor_doc,
+                validator=is_float)
+
+write_hardlinks_doc = """
+If True, Study.write_to() and FileBase.write_to() create hard links for
+files that did not change, instead of copies. This is fastest, but the
+original and the new study then share these files on disk: modifying one
+in place (outside of tmtk) also modifies the other.
+"""
+register_option('write_hardlinks',
+                default=False,
+                doc=write_hardlinks_doc,
+                validator=is_bool)
+
+columnar_observation_fact_doc = """
+If True, the observation_fact table of SkinnyExport is built per clinical
+datafile instead of per variable. All variables of a file are melted into
+long format at once, which is much faster for studies with many variables.
+The resulting table is the same.
+"""
+register_option('columnar_observation_fact',
+                default=False,
+                doc=columnar_observation_fact_doc,
+                validator=is_bool)
@@ -1,4 +1,5 @@
 from .base import ParamsBase
+from ..utils import find_file
 import os
 
 
@@ -35,7 +36,7 @@ class AnnotationParams(ParamsBase):
             else returns False.
         """
         if self.get('ANNOTATIONS_FILE') and self.get('PLATFORM'):
-            file_found = os.path.exists(os.path.join(self.dirname, self.ANNOTATIONS_FILE))
+            file_found = os.path.exists(find_file(os.path.join(self.dirname, self.ANNOTATIONS_FILE)))
             return file_found
         else:
             return False
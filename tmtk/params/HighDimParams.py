@@ -1,4 +1,5 @@
 from .base import ParamsBase
+from ..utils import find_file
 import os
 
 
@@ -69,8 +70,8 @@ class HighDimParams(ParamsBase):
         :return: True if both the datafile and map file are located, else returns False.
         """
         if self.get('DATA_FILE') and self.get('MAP_FILENAME'):
-            datafile_found = os.path.exists(os.path.join(self.dirname, self.DATA_FILE))
-            mapfile_found = os.path.exists(os.path.join(self.dirname, self.MAP_FILENAME))
+            datafile_found = os.path.exists(find_file(os.path.join(self.dirname, self.DATA_FILE)))
+            mapfile_found = os.path.exists(find_file(os.path.join(self.dirname, self.MAP_FILENAME)))
             return all([datafile_found, mapfile_found])
         else:
             return False
@@ -1,5 +1,8 @@
 import os
+import csv
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from IPython.display import HTML
 import tempfile
 
@@ -8,9 +11,11 @@ from .params import Params, ParamsBase
 from .highdim import HighDim
 from .annotation import Annotations
 from .tags import MetaDataTags
-from .utils import Mappings, TransmartBatch, ValidateMixin, FileBase
-from tmtk import utils, arborist
+from .utils import Mappings, TransmartBatch, ValidateMixin, FileBase, Manifest, compression_of
+from .utils.manifest import MANIFEST_NAME
+from tmtk import utils, arborist, options
 
+from collections import OrderedDict
 from itertools import chain
 
 
@@ -33,13 +38,18 @@ class Study(ValidateMixin):
     >>> tmtk.options.transmart_batch_mode = True
     """
 
-    def __init__(self, study_params_path=None, minimal=False):
+    def __init__(self, study_params_path=None, minimal=False, preload=False, workers=None):
         """
         Studies can be initialized by pointing to a study.params file.
 
         :param study_params_path: valid path to a study.params.
         :param minimal: if True, tmtk will only load parameter files.
+        :param preload: if True, load all data files concurrently, see :meth:`preload`.
+        :param workers: number of threads used to preload files.
         """
+        self.load_timings = {}
+        self._manifest = None
+
         if not study_params_path:
             self.study_folder = tempfile.mkdtemp(prefix='tmtk-')
             self.Params = Params(self.study_folder)
@@ -80,6 +90,11 @@ class Study(ValidateMixin):
             self.Tags = MetaDataTags(params=tags_params[0],
                                      parent=self)
 
+        self._share_manifest()
+
+        if preload:
+            self.preload(workers=workers)
+
     def __str__(self):
         return 'StudyObject ({})'.format(self.study_folder)
 
@@ -135,25 +150,164 @@ class Study(ValidateMixin):
         """Find dataframes that have changed since they have been loaded."""
         return [obj for obj in self.all_files if obj.df_has_changed]
 
+    @property
+    def manifest(self):
+        """
+        :class:`tmtk.utils.Manifest` with path, size, modification time, header,
+        tab delimiter check and row count of every file in this study. Entries are
+        read when requested, see :meth:`refresh_manifest` to update and store all
+        of them. Works for studies created with ``minimal=True`` as well.
+        """
+        if self._manifest is None:
+            self._manifest = Manifest(os.path.join(self.study_folder, MANIFEST_NAME))
+        return self._manifest
+
+    def _share_manifest(self):
+        """Let all file objects of this study use the manifest for metadata of their files."""
+        manifest = self.manifest
+        for obj in self.get_objects(FileBase):
+            obj._manifest = manifest
+
+    def refresh_manifest(self):
+        """
+        Update the manifest for all files in this study and store it as JSON next
+        to study.params. Only files that changed since the last refresh are read.
+
+        :return: :class:`tmtk.utils.Manifest`.
+        """
+        manifest = self.manifest
+        manifest.refresh(self._manifest_paths())
+        manifest.save()
+        return manifest
+
+    def _manifest_paths(self):
+        """Paths of all files referred to by params files, the column mapping and file objects."""
+        paths = set()
+        for params in self.Params.__dict__.values():
+            if not isinstance(params, ParamsBase):
+                continue
+            for key, value in params.__dict__.items():
+                if key.isupper() and isinstance(value, str) and value:
+                    paths.add(os.path.join(params.dirname, value))
+
+            column_map_file = params.get('COLUMN_MAP_FILE')
+            if params.datatype == 'clinical' and column_map_file and not hasattr(self, 'Clinical'):
+                paths.update(self._column_mapping_datafiles(os.path.join(params.dirname, column_map_file)))
+
+        if hasattr(self, 'Clinical'):
+            paths.update(f.path for f in self.all_files if f.path)
+        return sorted(p for p in paths if os.path.isfile(p))
+
+    @staticmethod
+    def _column_mapping_datafiles(path):
+        """Data files in the column mapping, read without creating a dataframe."""
+        if not os.path.isfile(path):
+            return []
+        with utils.open_file(path, newline='') as f:
+            rows = csv.reader(f, delimiter='\t')
+            next(rows, None)
+            filenames = {row[0] for row in rows if row}
+        return [os.path.join(os.path.dirname(path), filename) for filename in filenames]
+
+    def preload(self, workers=None, memory_budget=None):
+        """
+        Load the dataframes of all files in this study concurrently, instead of
+        one by one on first use. Mapping files of the clinical data are loaded
+        first, as loading data files can depend on them. Files that do not fit
+        in the memory budget are skipped and keep loading lazily. The memory of
+        a file is estimated from the size of its text (decompressed, for compressed
+        files) times `tmtk.options.preload_size_factor`.
+
+        :param workers: number of threads, defaults to the executor default.
+        :param memory_budget: maximum memory in MB used by the loaded dataframes,
+            defaults to `tmtk.options.preload_memory_budget`. 0 means unlimited.
+        :return: dictionary with file paths as keys and load time in seconds as values.
+        """
+        budget = (memory_budget if memory_budget is not None else options.preload_memory_budget) * 2 ** 20
+
+        files = [f for f in self.all_files
+                 if not f.df_is_loaded and f.path and os.path.exists(f.path)]
+        mapping_files = [f for f in (getattr(self.Clinical, 'ColumnMapping', None),
+                                     getattr(self.Clinical, 'WordMapping', None)) if f in files]
+        other_files = [f for f in files if f not in mapping_files]
+
+        start = time.time()
+        timings = {}
+        skipped = []
+        used = 0
+
+        def load(file_object):
+            t0 = time.time()
+            df = file_object.df
+            return file_object, time.time() - t0, int(df.memory_usage(deep=True).sum())
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for wave in (mapping_files, other_files):
+                pending = {}
+
+                def collect(futures):
+                    nonlocal used
+                    for future in futures:
+                        file_object, seconds, memory = future.result()
+                        used += memory - pending.pop(future)
+                        timings[file_object.path] = seconds
+
+                for file_object in wave:
+                    estimate = self._preload_estimate(file_object.path) if budget else 0
+
+                    # Wait for running loads if this file might not fit in the budget.
+                    while budget and pending and used + estimate > budget:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        collect(done)
+
+                    if budget and used + estimate > budget:
+                        skipped.append(file_object.path)
+                        continue
+
+                    used += estimate
+                    pending[pool.submit(load, file_object)] = estimate
+
+                collect(list(pending))
+
+        self.load_timings.update(timings)
+        self.msgs.info('Preloaded {} files ({:.1f} MB) in {:.2f} seconds.'.format(
+            len(timings), used / 2 ** 20, time.time() - start))
+        if skipped:
+            self.msgs.warning('Skipped {} files that did not fit the memory budget.'.format(len(skipped)),
+                              warning_list=skipped)
+        return timings
+
+    def _preload_estimate(self, path):
+        """Estimated memory in bytes of the dataframe of a file, see :meth:`preload`."""
+        size = self.manifest.text_size(path) if compression_of(path) else os.path.getsize(path)
+        return size * options.preload_size_factor
+
+    def clear_cache(self):
+        """Remove the binary dataframe cache files of all files in this study."""
+        for obj in self.get_objects(FileBase):
+            obj.clear_cache()
+
     def get_objects(self, of_type):
         """
         Search for objects that have inherited from a certain type.
 
         :param of_type: type to match against.
-        :return: generator for the found objects.
+        :return: list of the found objects, each object only once.
         """
 
         recursion_items = ['parent', '_parent', 'obj', 'msgs']
 
         def iterate_items(d):
-            for key, obj in d.items():
+            for key, obj in list(d.items()):
                 if hasattr(obj, '__dict__') and key not in recursion_items:
                     yield from iterate_items(obj.__dict__)
 
                 if isinstance(obj, of_type):
                     yield obj
 
-        return {i for i in iterate_items(self.__dict__)}
+        # Objects are compared by identity, as hashing file objects hashes their dataframe.
+        found = OrderedDict((id(i), i) for i in iterate_items(self.__dict__))
+        return list(found.values())
 
     @property
     def study_id(self) -> str:
@@ -329,13 +483,18 @@ class Study(ValidateMixin):
         tag_param = self.find_params_for_datatype('tags')[0]
         self.Tags = MetaDataTags(params=tag_param, parent=self)
 
-    def write_to(self, root_dir, overwrite=False, return_new=True):
+    def write_to(self, root_dir, overwrite=False, return_new=True, reuse_frames=False):
         """
-        Write this study to a new directory on file system.
+        Write this study to a new directory on file system. Files that have not
+        been loaded or have not changed are copied, only changed files are written.
 
         :param root_dir: the base directory to write the study to.
         :param overwrite: set this to True to overwrite existing files.
         :param return_new: if True load the study object from the new location and return it.
+        :param reuse_frames: if True the returned study uses the dataframes already loaded
+            in this study instead of reading them again, except for the files that are
+            read while initializing a study. The two studies then share these
+            dataframes, so only continue working with the new one.
         :return: new study object if return_new == True.
         """
         root_dir = os.path.expanduser(root_dir)
@@ -343,16 +502,31 @@ class Study(ValidateMixin):
         if not os.path.exists(root_dir) or not os.path.isdir(root_dir):
             os.makedirs(root_dir, exist_ok=True)
 
+        written = {}
         for obj in chain(self.get_objects(FileBase), self.get_objects(ParamsBase)):
             # Strip sub_path from leading slash, as os.path.join() will think its an absolute path
             sub_path = obj.path.split(self.study_folder)[1].strip(os.sep)
             new_path = os.path.join(root_dir, sub_path)
             self.msgs.info("Writing file to {}".format(new_path))
             obj.write_to(new_path, overwrite=overwrite)
+            if isinstance(obj, FileBase) and obj.df_is_loaded:
+                written[os.path.abspath(new_path)] = obj
 
-        if return_new:
+        if not return_new:
+            return
+
+        if not reuse_frames:
             return Study(os.path.join(root_dir, 'study.params'))
 
+        # Files that are loaded during initialization, e.g. the column mapping, are
+        # read from disk again. The others take over the dataframe of this study.
+        study = Study(os.path.join(root_dir, 'study.params'))
+        for obj in study.get_objects(FileBase):
+            other = written.get(os.path.abspath(obj.path)) if obj.path else None
+            if other is not None and type(other) is type(obj) and not obj.df_is_loaded:
+                obj.adopt_df(other)
+        return study
+
     def create_clinical(self):
         """ Add clinical data to a study object by creating empty params. """
 
@@ -395,6 +569,16 @@ class Study(ValidateMixin):
 
         for item in self._get_loadable_objects():
             lazy_dict.update(item._get_lazy_batch_items())
+
+        # Count rows with the manifest, so unchanged files are not read again.
+        manifest = self.manifest
+        for params_path, v in lazy_dict.items():
+            if type(v) == int:
+                continue
+            elif type(v[0]) == int:
+                lazy_dict[params_path] = v[0] * manifest.rows(v[1])
+            else:
+                lazy_dict[params_path] = sum(manifest.rows(path) for path in v)
         return lazy_dict
 
     def _get_loadable_objects(self):
@@ -4,10 +4,14 @@ from pathlib import Path
 import pandas as pd
 
 from ..params import TagsParams
-from ..utils import Exceptions, FileBase, Mappings, path_converter, TransmartBatch, ValidateMixin, path_join
+from ..utils import (Exceptions, FileBase, Mappings, path_converter, path_converter_series, TransmartBatch,
+                     ValidateMixin, path_join)
 
 
 class MetaDataTags(FileBase, ValidateMixin):
+
+    path_columns = (0, )
+
     def __init__(self, params=None, parent=None):
         if params and params.is_viable() and params.datatype == 'tags':
             self.path = os.path.join(params.dirname, params.TAGS_FILE)
@@ -29,7 +33,7 @@ class MetaDataTags(FileBase, ValidateMixin):
         """
         Return tag paths delimited by the path_converter.
         """
-        return self.df.iloc[:, 0].apply(lambda x: self._convert_path(x))
+        return self._convert_paths(self.df.iloc[:, 0])
 
     @property
     def invalid_paths(self):
@@ -39,8 +43,8 @@ class MetaDataTags(FileBase, ValidateMixin):
         study_paths = [node.path for node in self.parent.concept_tree.nodes if node.type != 'tag']
 
         # Add delimiter to both paths comparing so tag_path only matches if a complete node is matched
-        study_paths = ['{0}{1}{0}'.format(delimiter, path_converter(path)) for path in study_paths]
-        study_paths = ['{0}{1}{0}'.format(delimiter, path_converter(path)) for path in study_paths]
+        study_paths = delimiter + path_converter_series(study_paths) + delimiter
+        study_paths = list(delimiter + path_converter_series(study_paths) + delimiter)
 
         # Add study level path (no nodes)
         study_paths.append(delimiter)
@@ -62,6 +66,18 @@ class MetaDataTags(FileBase, ValidateMixin):
 
         return x.strip()
 
+    @staticmethod
+    def _convert_paths(paths):
+        """Vectorised variant of _convert_path for a `pd.Series` of paths."""
+        paths = pd.Series(paths, dtype=object)
+        starts_with_delim = paths.str.startswith(Mappings.PATH_DELIM) | paths.str.startswith(Mappings.EXT_PATH_DELIM)
+        paths = path_converter_series(paths)
+
+        # Put back the delimiter if it was removed in the previous step.
+        paths = paths.where(~starts_with_delim, Mappings.EXT_PATH_DELIM + paths)
+
+        return paths.str.strip()
+
     def get_tags(self):
         """
         generator that gets tags from tags file.
@@ -69,8 +85,9 @@ class MetaDataTags(FileBase, ValidateMixin):
         :return: tuples (<path>, <title>, <description>)
         """
 
-        for path in set(self.tag_paths):
-            associated_tags = self.tag_paths == path
+        tag_paths = self.tag_paths
+        for path in set(tag_paths):
+            associated_tags = tag_paths == path
             tags_dict = {}
             self.df[associated_tags].apply(lambda x: tags_dict.update({x[1]: (x[2], x[3])}), axis=1)
             yield path, tags_dict
@@ -81,35 +98,28 @@ class MetaDataTags(FileBase, ValidateMixin):
 
         :param blueprint: blueprint object.
         """
-        for variable in self.parent.Clinical.all_variables.values():
-            # The default blueprint key is a tuple containing the column name and the file name (without extension)
-            blueprint_key = (variable.header.strip(), Path(variable.filename).stem)
-            if blueprint_key not in blueprint:
-                # Fallback to assuming a column-name-only key
-                blueprint_key = blueprint_key[0]
-
-            blueprint_var = blueprint.get(blueprint_key, {})
+        clinical = self.parent.Clinical
+        new_tags = []
+        for variable in clinical.all_variables.values():
+            blueprint_var = clinical._blueprint_entry(blueprint, variable) or {}
             tags = blueprint_var.get('metadata_tags')
             if not tags:
                 continue
 
             path = Mappings.EXT_PATH_DELIM + path_join(blueprint_var.get('path'), blueprint_var.get('label'))
+            path = self._convert_path(path)
+            new_tags += [[path, title, description, 5] for title, description in tags.items()]
+
+        if not new_tags:
+            return
+
+        # Tags in the blueprint replace existing tags with the same path and title.
+        new_df = pd.DataFrame(new_tags, columns=self.df.columns)
+        new_df.drop_duplicates(list(new_df.columns[:2]), keep='last', inplace=True)
+        new_keys = pd.MultiIndex.from_arrays([new_df.iloc[:, 0], new_df.iloc[:, 1]])
+        existing_keys = pd.MultiIndex.from_arrays([self.df.iloc[:, 0], self.df.iloc[:, 1]])
 
-            for title, description in tags.items():
-                path = self._convert_path(path)
-                one = self.df.iloc[:, 0] == path
-                two = self.df.iloc[:, 1] == title
-                index = self.df[one & two].index
-
-                if len(index):
-                    self.df.drop(index, inplace=True)
-
-                self.df = self.df.append(
-                    pd.DataFrame(
-                        [[path, title, description, 5]],
-                        columns=self.df.columns
-                    ),
-                    ignore_index=True)
+        self.df = pd.concat([self.df[~existing_keys.isin(new_keys)], new_df], ignore_index=True)
 
     @staticmethod
     def create_df():
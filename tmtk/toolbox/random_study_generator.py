@@ -174,6 +174,7 @@ class RandomStudy(Study):
         steps_n = int(math.ceil(total_columns / step_size))
 
         print('Files to create: {}'.format(steps_n))
+        datafiles = []
         for i in range(steps_n):
             columns_for_file = min(total_columns - step_size * i, step_size)
             numerical = int(math.ceil(proportion_numerical * columns_for_file))
@@ -181,9 +182,9 @@ class RandomStudy(Study):
             first = i == 0
 
             new_df = self.create_clinical_df(numerical, categorical, first)
-            self.Clinical.add_datafile(filename='random_clinical_data{}.tsv'.format(i + 1), dataframe=new_df)
-            del new_df
+            datafiles.append(('random_clinical_data{}.tsv'.format(i + 1), new_df))
 
+        self.Clinical.add_datafiles(datafiles)
         self.Clinical.apply_blueprint(self._build_blueprint())
 
     def create_clinical_df(self, numerical=0, categorical=0, first=False):
@@ -5,6 +5,16 @@ def remap_chromosomal_regions(origin_platform=None, destination_platform=None, d
                               flag_indicator='.flag', to_dest=2, start_dest=3, end_dest=4,
                               region_dest=1, chr_origin=2, start_origin=3, end_origin=4,
                               region_origin=1, region_data=0):
+    """
+    Remap a data file with values for the regions in origin platform to the
+    regions in destination platform, by taking the mean of overlapping regions.
+
+    :param origin_platform: `pd.DataFrame` with the platform of the data file.
+    :param destination_platform: `pd.DataFrame` with the platform to remap to.
+    :param datafile: `pd.DataFrame`, or an iterable of `pd.DataFrame` chunks of rows. For
+        chunks, only the rows of regions that overlap with the destination are kept in memory.
+    :return: `pd.DataFrame` with remapped data.
+    """
     dest_regions = destination_platform.iloc[:, [to_dest, start_dest, end_dest]]
     dest_regions = _convert_xy_to_int(dest_regions)
 
@@ -14,9 +24,6 @@ def remap_chromosomal_regions(origin_platform=None, destination_platform=None, d
     # Find overlapping regions
     overlap = _map_multiple_segments_to_gene(dest_regions, orig_regions)
 
-    segments_region_column = datafile.columns[region_data]
-    flag_columns = _find_flag_columns(datafile, flag_indicator)
-
     # Remove any regions without mapping
     only_scores = overlap[~overlap.isnull()]
 
@@ -24,6 +31,13 @@ def remap_chromosomal_regions(origin_platform=None, destination_platform=None, d
     region_id_mapping = only_scores.apply(lambda x: map_index_to_region_ids(x,
                                                                             origin_platform,
                                                                             region_origin))
+
+    if not isinstance(datafile, pd.DataFrame):
+        datafile = _mapped_rows_from_chunks(datafile, region_id_mapping, region_data)
+
+    segments_region_column = datafile.columns[region_data]
+    flag_columns = _find_flag_columns(datafile, flag_indicator)
+
     # Find the mean value across the mapped regions
     remapped_regions = region_id_mapping.apply(lambda x: return_mean(datafile, x, flag_columns))
 
@@ -40,6 +54,20 @@ def remap_chromosomal_regions(origin_platform=None, destination_platform=None, d
     return new_df
 
 
+def _mapped_rows_from_chunks(chunks, region_id_mapping, region_data):
+    """
+    Concatenate only the rows needed for remapping from an iterable of dataframe chunks.
+
+    :param chunks: iterable of `pd.DataFrame` objects.
+    :param region_id_mapping: series with lists of region ids in the data file.
+    :param region_data: column index for region ids in the data file.
+    :return: `pd.DataFrame`.
+    """
+    needed = {region for regions in region_id_mapping for region in regions}
+    return pd.concat([chunk[chunk.iloc[:, region_data].isin(needed)] for chunk in chunks],
+                     ignore_index=True)
+
+
 def _find_flag_columns(datafile, flag_indicator):
     """
 
@@ -1 +1,2 @@
 from .shared import Defaults, TableRow
+from .writer import TableStats, TableWriter
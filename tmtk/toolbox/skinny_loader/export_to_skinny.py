@@ -9,8 +9,15 @@ from .i2b2demodata.trial_visit_dimension import TrialVisitDimension
 from .i2b2metadata.dimension_descriptions import DimensionDescription
 from .i2b2metadata.study_dimension_descriptions import StudyDimensionDescription
 from .i2b2metadata.i2b2_tags import I2B2Tags
+from .writer import TableWriter, table_path
 
 import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _report(stats):
+    print('Written {} rows ({} bytes) to disk: {}'.format(stats.rows, stats.bytes, stats.path))
 
 
 class SkinnyExport:
@@ -68,8 +75,19 @@ class SkinnyExport:
         # Observation fact has to be created explicitly, because it is the only expensive operation
         self.observation_fact = None
 
-    def to_disk(self):
-
+    def to_disk(self, workers=None, compression=None, threads=4):
+        """
+        Write all tables to the export directory. The dimension tables are written
+        concurrently by a pool of threads, after which the observation_fact table is
+        written. For each table the number of rows and bytes written is reported.
+
+        :param workers: if larger than 1, write the observation_fact table in a pool
+            of this many processes, see :meth:`observation_fact_to_disk`.
+        :param compression: None (default), 'gzip', 'bz2', 'xz' or 'zstd' to compress
+            all tables. The extension of the compression is added to the file names.
+        :param threads: number of dimension tables written at the same time.
+        :return: dictionary with paths as keys and `TableStats` as values.
+        """
         demo = 'i2b2demodata'
         meta = 'i2b2metadata'
 
@@ -86,27 +104,54 @@ class SkinnyExport:
             'study_dimension_descriptions': (meta, 'study_dimension_descriptions.tsv')
         }
         self._ensure_dirs()
+
+        tables = []
         for attribute, file_tuple in attribute_to_disk_map.items():
 
             table_obj = getattr(self, attribute, 0)
 
             if not table_obj:
                 continue
-            path = os.path.join(self.export_directory, file_tuple[0], file_tuple[1])
-            with open(path, 'w') as f:
-                print('Writing table to disk: {}'.format(path))
-                table_obj.df.to_csv(f, sep='\t', index=False)
+            path = table_path(os.path.join(self.export_directory, file_tuple[0], file_tuple[1]), compression)
+            tables.append((table_obj.df, path))
+
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            stats = list(pool.map(lambda table: self._write_table(*table, compression=compression), tables))
+
+        stats += self.observation_fact_to_disk(workers=workers, compression=compression)
+        return OrderedDict((s.path, s) for s in stats)
 
-        self.observation_fact_to_disk()
+    @staticmethod
+    def _write_table(df, path, compression=None):
+        with TableWriter(path, df.columns, compression=compression) as writer:
+            writer.write(df)
+        _report(writer.stats)
+        return writer.stats
 
     def build_observation_fact(self):
         self.observation_fact = ObservationFact(self)
 
-    def observation_fact_to_disk(self):
+    def observation_fact_to_disk(self, workers=None, keep_shards=False, compression=None):
+        """
+        Write the observation_fact table to the export directory.
+
+        :param workers: if larger than 1, the observations of each clinical datafile
+            are written to a separate shard by a pool of this many processes. The
+            shards are concatenated in a fixed order, so the table is the same as
+            when it is written by a single process.
+        :param keep_shards: if True, keep the shards as numbered part files
+            (observation_fact.tsv.part0001, etc.) instead of concatenating them.
+        :param compression: None (default), 'gzip', 'bz2', 'xz' or 'zstd'.
+        :return: list of `TableStats` for the files written.
+        """
         self._ensure_dirs()
-        path = os.path.join(self.export_directory, 'i2b2demodata', 'observation_fact.tsv')
+        path = table_path(os.path.join(self.export_directory, 'i2b2demodata', 'observation_fact.tsv'), compression)
         print('Writing table to disk: {}'.format(path))
-        ObservationFact(self, straight_to_disk=path)
+        observation_fact = ObservationFact(self, straight_to_disk=path, workers=workers,
+                                           keep_shards=keep_shards, compression=compression)
+        for stats in observation_fact.stats:
+            _report(stats)
+        return observation_fact.stats
 
     def _ensure_dirs(self):
         if self.export_directory:
@@ -1,14 +1,79 @@
-from ..shared import TableRow, Defaults, get_full_path, get_unix_timestamp
+import multiprocessing
+import os
+from collections import OrderedDict
 
+from ..shared import TableRow, Defaults, get_full_path, get_unix_timestamps
+from ..writer import TableWriter, TableStats, append_files
+from ....clinical import Variable
+from .... import options
+
+import numpy as np
 import pandas as pd
+from pandas.api.types import is_categorical_dtype, is_datetime64_any_dtype
 import arrow
 from tqdm import tqdm
 
 MISSING_VALUE_MOD = 'MISSVAL'  # Special case modifier where empty observations should be added to database
 
+# The valtype_cd for each visual attribute.
+VALUE_TYPE_CODES = {Variable.VIS_DATE: 'D',
+                    Variable.VIS_TEXT: 'B',
+                    Variable.VIS_NUMERIC: 'N',
+                    Variable.VIS_CATEGORICAL: 'T'}
+
+
+def _as_objects(values):
+    """
+    Values of a `pd.Series` as object array. Datetimes are converted to the text
+    DataFrame.to_csv writes for them, i.e. without time if no value has one.
+    """
+    if is_datetime64_any_dtype(values):
+        dates_only = (values.dropna().dt.normalize() == values.dropna()).all()
+        values = values.dt.strftime('%Y-%m-%d' if dates_only else '%Y-%m-%d %H:%M:%S').where(values.notnull())
+    return np.asarray(values, dtype=object)
+
+
+def _as_array(values):
+    """
+    Values of a `pd.Series` as array. Categoricals become arrays of the type of
+    their categories, or object arrays if values are missing.
+    """
+    if is_categorical_dtype(values):
+        values = values.astype(object)
+        if values.notnull().all():
+            values = values.infer_objects()
+    return values.values
+
+
+# ObservationFact object used by the processes that write shards, see ObservationFact.write_to_disk.
+_shard_writer = None
+
+
+def _init_shard_worker(observation_fact):
+    global _shard_writer
+    _shard_writer = observation_fact
+
+
+def _write_shard(shard):
+    i, path, header, compression = shard
+    groups = _shard_writer._variable_groups()
+    with TableWriter(path, _shard_writer.columns if header else None, compression=compression) as writer:
+        for df in _shard_writer._row_frames([groups[i]], progress=False):
+            writer.write(df)
+    return writer.stats
+
 
 class ObservationFact(TableRow):
-    def __init__(self, skinny, straight_to_disk=False):
+    def __init__(self, skinny, straight_to_disk=False, workers=None, keep_shards=False, compression='infer'):
+        """
+        :param skinny: `SkinnyExport` object.
+        :param straight_to_disk: if given, write the table to this path instead of
+            building it in memory.
+        :param workers: if larger than 1, write the table in a pool of this many processes,
+            see :meth:`write_to_disk`.
+        :param keep_shards: keep the files written by each process, see :meth:`write_to_disk`.
+        :param compression: compression of the file written, see :meth:`write_to_disk`.
+        """
 
         self.skinny = skinny
         self.study = skinny.study
@@ -16,28 +81,116 @@ class ObservationFact(TableRow):
         super().__init__()
 
         self.df = None
+        self.stats = None
         self._subject_id_cache = {}
+        self._clear_value_caches()
 
         if not straight_to_disk:
             self._build_in_memory()
         else:
-            self.write_to_disk(straight_to_disk)
+            self.stats = self.write_to_disk(straight_to_disk, workers=workers, keep_shards=keep_shards, compression=compression)
+
+    def _clear_value_caches(self):
+        """Forget the dates and timestamps cached per datafile column, as the study may have changed."""
+        self._date_cache = {}
+        self._timestamp_cache = {}
 
     def _build_in_memory(self):
+        self._clear_value_caches()
+        self.df = pd.concat(list(self._row_frames()), ignore_index=True)
 
-        dfs = []
-        # Loop through all variables in the clinical data and add a row
-        for variable in tqdm(self.study.Clinical.filtered_variables.values()):
-            dfs += [r for r in self.build_rows(variable)]
+    def write_to_disk(self, path, workers=None, keep_shards=False, compression='infer'):
+        """
+        Write the table to disk, streaming the rows of each part of the table to the
+        (compressed) file, see :class:`TableWriter`. If workers is larger than 1, the
+        observations of every group of variables are written to a separate shard by a
+        pool of processes, see :meth:`_variable_groups`. The shards are concatenated
+        in order, so the result is the same as when it is written by a single process.
+
+        On platforms that support it, worker processes are forked, so the study does
+        not have to be copied to them.
+
+        :param path: path to write to.
+        :param workers: number of processes.
+        :param keep_shards: if True, leave the shards as numbered part files with a header
+            each (path.part0001, path.part0002, etc.) instead of concatenating them to path.
+        :param compression: 'infer' (default) to use the file extension, None or a compression name.
+        :return: list of `TableStats` for the files written.
+        """
+        self._clear_value_caches()
+        if not workers or workers <= 1:
+            with TableWriter(path, self.columns, compression=compression) as writer:
+                for df in self._row_frames():
+                    writer.write(df)
+            return [writer.stats]
+
+        shards = [(i, '{}.part{:04d}'.format(path, i + 1), keep_shards, compression)
+                  for i in range(len(self._variable_groups()))]
+
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+
+        try:
+            with context.Pool(workers, initializer=_init_shard_worker, initargs=(self,)) as pool:
+                stats = list(tqdm(pool.imap(_write_shard, shards), total=len(shards)))
+
+            if keep_shards:
+                return stats
 
-        self.df = pd.concat(dfs, ignore_index=True)
+            # Compressed shards can be appended as they are, after a separately compressed header.
+            with TableWriter(path, self.columns, compression=compression):
+                pass
+            append_files(path, [shard_path for _, shard_path, _, _ in shards])
+            return [TableStats(path, sum(s.rows for s in stats), os.path.getsize(path))]
 
-    def write_to_disk(self, path):
-        with open(path, 'w') as f:
-            f.write('\t'.join(self.columns) + '\n')
-            for variable in tqdm(self.study.Clinical.filtered_variables.values()):
-                for df in self.build_rows(variable):
-                    df.to_csv(f, sep='\t', index=False, header=False)
+        finally:
+            if not keep_shards:
+                for _, shard_path, _, _ in shards:
+                    if os.path.exists(shard_path):
+                        os.remove(shard_path)
+
+    def _variable_groups(self):
+        """
+        Lists of filtered variables that are written together. If
+        `tmtk.options.columnar_observation_fact` is set, these are all variables of
+        a clinical datafile. Otherwise these are runs of consecutive variables of the
+        same datafile, so rows keep the order of the column mapping.
+        """
+        variables = self.study.Clinical.filtered_variables.values()
+        if options.columnar_observation_fact:
+            groups = OrderedDict()
+            for variable in variables:
+                groups.setdefault(variable.filename, []).append(variable)
+            return list(groups.values())
+
+        groups = []
+        for variable in variables:
+            if groups and groups[-1][-1].filename == variable.filename:
+                groups[-1].append(variable)
+            else:
+                groups.append([variable])
+        return groups
+
+    def _row_frames(self, groups=None, progress=True):
+        """
+        Yields all observation fact rows as multiple pd.DataFrames, per variable or, if
+        `tmtk.options.columnar_observation_fact` is set, per clinical datafile.
+
+        :param groups: lists of variables of a datafile to build rows for, by default
+            those of all datafiles, see :meth:`_variable_groups`.
+        :param progress: show a progress bar.
+        """
+        if groups is None:
+            groups = self._variable_groups()
+
+        if not options.columnar_observation_fact:
+            # Loop through all variables in the clinical data and add a row
+            for variable in tqdm([variable for group in groups for variable in group], disable=not progress):
+                yield from self.build_rows(variable)
+            return
+
+        for variables in tqdm(groups, disable=not progress):
+            yield self.build_datafile_rows(variables)
 
     def build_rows(self, var) -> pd.DataFrame:
         """
@@ -45,18 +198,21 @@ class ObservationFact(TableRow):
         It returns a DataFrame for all normal observations and one for each applicable modifier.
         """
 
-        def get_value_fields(values, visual_attributes_):
+        def get_value_fields(variable):
             """
             Update a row object with its value based on visual_attributes
 
-            :param values: values series.
-            :param visual_attributes_: visual attributes determine the type of variable (unfortunately).
+            :param variable: variable with values, after word mapping.
+                Its visual attributes determine the type of variable (unfortunately).
             :return: dictionary with variable type appropriate mapping.
             """
+            values = variable.mapped_values
+            visual_attributes_ = variable.visual_attributes
+
             if visual_attributes_ == var.VIS_DATE:
                 return {'valtype_cd': 'D',
                         'tval_char': 'E',
-                        'nval_num': values.apply(get_unix_timestamp),  # Unix time
+                        'nval_num': pd.Series(self._unix_timestamps(variable), index=values.index),  # Unix time
                         'observation_blob': values}  # UTC
 
             elif visual_attributes_ == var.VIS_TEXT:
@@ -87,12 +243,7 @@ class ObservationFact(TableRow):
         else:
             trial_visit_num = self.skinny.trial_visit_dimension.get_num(Defaults.TRIAL_VISIT)
 
-        var_full_path = get_full_path(var, self.study)
-
-        concept_code = var.concept_code or self.skinny.concept_dimension.map.get(var_full_path)
-
-        if not concept_code:
-            raise Exception('No concept code found for {}'.format(var))
+        concept_code = self._concept_code(var)
 
         try:
             internal_subj_ids = self._subject_id_cache[var.filename]
@@ -104,10 +255,10 @@ class ObservationFact(TableRow):
             'encounter_num': -1,
             # Find the internal identifiers for a given series of external identifiers
             'patient_num': internal_subj_ids,
-            'concept_cd': var.concept_code or self.skinny.concept_dimension.map.get(var_full_path),
+            'concept_cd': concept_code,
             'provider_id': '@',
-            'start_date': start_date.values if start_date else None,
-            'end_date': end_date.values if end_date else None,
+            'start_date': self._dates(start_date) if start_date else None,
+            'end_date': self._dates(end_date) if end_date else None,
             'modifier_cd': '@',
             'trial_visit_num': trial_visit_num,
             # because of poorly suited primary key on observation_fact
@@ -116,7 +267,7 @@ class ObservationFact(TableRow):
         }
 
         var_wide_data.update(
-            get_value_fields(var.mapped_values, var.visual_attributes)
+            get_value_fields(var)
         )
 
         # This dataframe contains all normal values, but also rows for missing values.
@@ -137,7 +288,7 @@ class ObservationFact(TableRow):
                 var_wide_data['modifier_cd'] = modifier_variable.modifier_code
 
                 var_wide_data.update(
-                    get_value_fields(modifier_variable.mapped_values, modifier_variable.visual_attributes)
+                    get_value_fields(modifier_variable)
                 )
                 modifier_dfs.append(pd.DataFrame(var_wide_data, columns=self.columns))
 
@@ -168,6 +319,174 @@ class ObservationFact(TableRow):
                 mod_df = mod_df.loc[load_mod_value]
                 yield mod_df
 
+    def build_datafile_rows(self, variables) -> pd.DataFrame:
+        """
+        Returns all observation fact rows for the given variables of a single datafile
+        as one pd.DataFrame, with the same rows in the same order as :meth:`build_rows`
+        gives for these variables.
+
+        The values of all variables are melted into long format at once. Subject
+        identifiers, dates and trial visits are taken from tables of the keyword
+        variables in the datafile, and value fields are set with masks by visual
+        attribute.
+
+        :param variables: list of variables that are all in the same datafile.
+        :return: pd.DataFrame.
+        """
+        n = len(variables[0].values)
+        k = len(variables)
+
+        try:
+            internal_subj_ids = self._subject_id_cache[variables[0].filename]
+        except KeyError:
+            internal_subj_ids = variables[0].subj_id.values.map(self.skinny.patient_mapping.map)
+            self._subject_id_cache[variables[0].filename] = internal_subj_ids
+
+        get_num = self.skinny.trial_visit_dimension.get_num
+
+        # Columns of all observations in long format, variable after variable.
+        main = {
+            'patient_num': np.tile(_as_array(internal_subj_ids), k),
+            'concept_cd': np.repeat(np.array([self._concept_code(var) for var in variables], dtype=object), n),
+            'start_date': self._keyword_column([var.start_date for var in variables], n, self._dates),
+            'end_date': self._keyword_column([var.end_date for var in variables], n, self._dates),
+            'modifier_cd': np.full(n * k, '@', dtype=object),
+            'trial_visit_num': self._keyword_column([var.trial_visit for var in variables], n,
+                                                    lambda v: _as_array(v.values.map(get_num)),
+                                                    default=get_num(Defaults.TRIAL_VISIT)),
+            'instance_num': np.tile(np.arange(n), k),
+        }
+        values = np.concatenate([_as_objects(var.mapped_values) for var in variables])
+        main.update(self._value_fields(values, variables, n))
+        main_present = pd.notnull(values)
+
+        # Observations without value are kept if a MISSVAL modifier has a value for them.
+        keep = main_present.copy()
+        modifiers = [var.modifiers for var in variables]
+        for i, var_modifiers in enumerate(modifiers):
+            for modifier in var_modifiers:
+                if modifier.modifier_code == MISSING_VALUE_MOD:
+                    keep[i * n:(i + 1) * n] |= modifier.mapped_values.notnull().values
+
+        rows = {column: array[keep] for column, array in main.items()}
+        var_pos = np.repeat(np.arange(k), n)[keep]
+        block = np.zeros(len(var_pos), dtype=int)
+
+        pairs = [(i, j, modifier) for i, var_modifiers in enumerate(modifiers)
+                 for j, modifier in enumerate(var_modifiers, 1)]
+
+        if pairs:
+            # Position of the observation that each modifier observation belongs to.
+            parent = np.repeat([i for i, _, _ in pairs], n) * n + np.tile(np.arange(n), len(pairs))
+
+            mod = {column: array[parent] for column, array in main.items()}
+            mod['modifier_cd'] = np.repeat(np.array([m.modifier_code for _, _, m in pairs], dtype=object), n)
+            mod_values = np.concatenate([_as_objects(m.mapped_values) for _, _, m in pairs])
+            mod.update(self._value_fields(mod_values, [m for _, _, m in pairs], n))
+
+            # Modifiers are only loaded for observations with a value, except MISSVAL.
+            is_missing_value_mod = np.repeat([m.modifier_code == MISSING_VALUE_MOD for _, _, m in pairs], n)
+            mod_keep = pd.notnull(mod_values) & (main_present[parent] | is_missing_value_mod)
+
+            for column, array in mod.items():
+                rows[column] = np.concatenate([rows[column], array[mod_keep]])
+            var_pos = np.concatenate([var_pos, parent[mod_keep] // n])
+            block = np.concatenate([block, np.repeat([j for _, j, _ in pairs], n)[mod_keep]])
+
+            # Rows of a variable, followed by those of each of its modifiers.
+            order = np.lexsort((rows['instance_num'], block, var_pos))
+            rows = {column: array[order] for column, array in rows.items()}
+
+        rows.update({'encounter_num': -1, 'provider_id': '@'})
+        return pd.DataFrame(rows, columns=self.columns)
+
+    def _dates(self, variable):
+        """
+        Values of a START_DATE or END_DATE variable as object array, with datetimes
+        as text. These are cached per datafile column, as they apply to many variables.
+        """
+        key = variable.filename, variable.column
+        if key not in self._date_cache:
+            self._date_cache[key] = _as_objects(variable.text_values)
+        return self._date_cache[key]
+
+    def _unix_timestamps(self, variable):
+        """
+        Unix timestamps in milliseconds of the values of a DATE variable after word
+        mapping, see :func:`get_unix_timestamps`. Cached per datafile column.
+        """
+        key = variable.filename, variable.column
+        if key not in self._timestamp_cache:
+            self._timestamp_cache[key] = get_unix_timestamps(variable.mapped_values)
+        return self._timestamp_cache[key]
+
+    def _concept_code(self, var):
+        concept_code = var.concept_code or self.skinny.concept_dimension.map.get(get_full_path(var, self.study))
+        if not concept_code:
+            raise Exception('No concept code found for {}'.format(var))
+        return concept_code
+
+    @staticmethod
+    def _keyword_column(keyword_variables, n, get_values, default=None):
+        """
+        Long format column from keyword variables (e.g. START_DATE) that apply to a
+        list of variables. The values of each keyword variable are read only once.
+
+        :param keyword_variables: list with a keyword variable or None per variable.
+        :param n: number of rows in the datafile.
+        :param get_values: callable that returns an array of values for a keyword variable.
+        :param default: value for variables without keyword variable.
+        :return: array with n values per variable.
+        """
+        table, positions = [], {}
+        for keyword_variable in keyword_variables:
+            if keyword_variable is not None and keyword_variable.column not in positions:
+                positions[keyword_variable.column] = len(table)
+                table.append(get_values(keyword_variable))
+
+        if not table:
+            return np.full(n * len(keyword_variables), default, dtype=object if default is None else None)
+
+        default_position = len(table)
+        table.append(np.full(n, default, dtype=object if default is None else None))
+        index = [default_position if v is None else positions[v.column] for v in keyword_variables]
+        return np.column_stack(table)[:, index].ravel(order='F')
+
+    def _value_fields(self, values, variables, n):
+        """
+        Vectorised counterpart of the value fields in :meth:`build_rows`.
+
+        :param values: array with the values of the variables in long format.
+        :param variables: list of variables.
+        :param n: number of values per variable.
+        :return: dict with arrays for valtype_cd, tval_char, nval_num and observation_blob.
+        """
+        visual_attributes = [variable.visual_attributes for variable in variables]
+        valtype_cd = np.repeat(np.array([VALUE_TYPE_CODES[v] for v in visual_attributes], dtype=object), n)
+        visual_attributes = np.repeat(visual_attributes, n)
+        is_date = visual_attributes == Variable.VIS_DATE
+        is_text = visual_attributes == Variable.VIS_TEXT
+        is_numeric = visual_attributes == Variable.VIS_NUMERIC
+        is_categorical = visual_attributes == Variable.VIS_CATEGORICAL
+
+        tval_char = np.full(len(values), np.nan, dtype=object)
+        tval_char[is_date | is_numeric] = 'E'
+        tval_char[is_categorical] = values[is_categorical]
+
+        nval_num = np.full(len(values), np.nan, dtype=object)
+        nval_num[is_numeric] = values[is_numeric]
+        if is_date.any():
+            nval_num[is_date] = np.concatenate([self._unix_timestamps(variable) for variable in variables
+                                                if variable.visual_attributes == Variable.VIS_DATE])
+
+        observation_blob = np.full(len(values), np.nan, dtype=object)
+        observation_blob[is_date | is_text] = values[is_date | is_text]
+
+        return {'valtype_cd': valtype_cd,
+                'tval_char': tval_char,
+                'nval_num': nval_num,
+                'observation_blob': observation_blob}
+
     @property
     def _row_definition(self):
         return pd.Series(
@@ -7,8 +7,12 @@ class TrialVisitDimension(TableRow):
 
     def __init__(self, study):
         super().__init__()
-        self.df = pd.DataFrame([self.build_row(trial_visit) for trial_visit in study.Clinical.get_trial_visits()],
-                               columns=self.columns)
+        visits = study.Clinical.get_trial_visits()
+        self.df = pd.DataFrame({'rel_time_label': visits.name,
+                                'rel_time_num': visits.relative_time,
+                                'rel_time_unit_cd': visits.time_unit})
+        self.df = self.df.reindex(columns=self.columns)
+        self.df.study_num = self.row.study_num
 
         self.df.iloc[:, 0] = self.df.index
         self.df.study_num = self.df.study_num.astype(pd.np.int64)
@@ -25,15 +29,6 @@ class TrialVisitDimension(TableRow):
         """
         return self.map.get(label, self.map.get(Defaults.TRIAL_VISIT))
 
-    def build_row(self, trial_visit):
-        row = self.row
-
-        row.rel_time_label = trial_visit.get('name')
-        row.rel_time_num = trial_visit.get('relative_time')
-        row.rel_time_unit_cd = trial_visit.get('time_unit')
-
-        return row
-
     @property
     def _row_definition(self):
         return pd.Series(
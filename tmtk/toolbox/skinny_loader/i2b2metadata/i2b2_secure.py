@@ -5,6 +5,16 @@ from tqdm import tqdm
 from hashlib import sha1
 
 
+class _PathNode:
+    """ Node in a trie of tree paths, with a child per path component. """
+
+    __slots__ = ('children', 'has_row')
+
+    def __init__(self):
+        self.children = {}
+        self.has_row = False
+
+
 class I2B2Secure(TableRow):
 
     def __init__(self, study, concept_dimension, add_top_node, omit_fas):
@@ -18,21 +28,27 @@ class I2B2Secure(TableRow):
         self.concept_dimension = concept_dimension
         super().__init__()
 
-        # To be used for faster lookups in add_missing_paths method
-        self._paths_set = set()
+        self._defaults = tuple(self._cached_row)
+        self._column_index = {column: i for i, column in enumerate(self.columns)}
 
-        row_list = [self.build_variable_row(var) for var in tqdm(study.Clinical.filtered_variables.values())]
+        # Concept paths by code, the first path is used for codes that occur more than once.
+        concepts = concept_dimension.df
+        self._concept_paths = {code: path for code, path in zip(concepts.concept_cd[::-1], concepts.concept_path[::-1])
+                               if pd.notnull(code)}
 
-        if add_top_node:
-            row_list += [r for r in self.add_top_nodes()]
+        # Rows are collected as tuples in column order, and only turned into a dataframe when complete.
+        self._rows = [self.build_variable_row(var) for var in tqdm(study.Clinical.filtered_variables.values())]
 
-        self.df = pd.DataFrame(row_list, columns=self.columns)
+        if add_top_node:
+            self._rows += [r for r in self.add_top_nodes()]
 
         # Add Ontology paths as nodes in tree. This creates paths in i2b2_secure for
         # each term defined in ontology mapping.
         if study.Clinical.OntologyMapping and study.Clinical.OntologyMapping.df.shape[0] > 1:
             self.add_ontology_tree()
 
+        self.df = pd.DataFrame(self._rows, columns=self.columns)
+
         # Add 'unmapped' variables from i2b2_secure to concept dimension
         self.concept_dimension.add_one_timer_concepts(self)
 
@@ -44,101 +60,141 @@ class I2B2Secure(TableRow):
         """ Convert paths and ensure start and end with single backslash """
         return path_slash_all(path_converter(path))
 
+    def _build_row(self, base=None, **values):
+        """
+        Create a row tuple from the row definition, or from another row,
+        with values set for the given columns.
+        """
+        row = list(self._defaults if base is None else base)
+        for column, value in values.items():
+            row[self._column_index[column]] = value
+        return tuple(row)
+
     def build_variable_row(self, var):
         """ Create a row for a variable object. """
 
-        row = self.row
-        row.c_fullname = get_full_path(var, self.study)
-        row.c_hlevel = calc_hlevel(row.c_fullname)
-        row.c_name = var.data_label
-        row.c_visualattributes = var.visual_attributes
-        row.c_basecode = var.concept_code or sha1(row.c_fullname.encode()).hexdigest()
-        row.c_dimcode = self.concept_dimension.get_path_for_code(var.concept_code) or row.c_fullname
-
-        return row
+        fullname = get_full_path(var, self.study)
+        return self._build_row(
+            c_fullname=fullname,
+            c_hlevel=calc_hlevel(fullname),
+            c_name=var.data_label,
+            c_visualattributes=var.visual_attributes,
+            c_basecode=var.concept_code or sha1(fullname.encode()).hexdigest(),
+            c_dimcode=self._concept_paths.get(var.concept_code) or fullname,
+        )
 
     def add_top_nodes(self):
         """
         Generate add study node itself and any preceding nodes as 'CA' containers.
         """
 
-        row = self.row
-
-        row.c_fullname = self.sanitize_path(self.study.top_node)
-        row.c_hlevel = calc_hlevel(row.c_fullname)
-        row.c_visualattributes = 'FA' if self.omit_fas else 'FAS'
-        row.c_facttablecolumn = '@'
-        row.c_tablename = 'STUDY'
-        row.c_columnname = 'STUDY_ID'
-        row.c_operator = '='
-        row.c_name = path_converter(self.study.study_name)
-        row.c_dimcode = self.study.study_id
+        fullname = self.sanitize_path(self.study.top_node)
+        row = self._build_row(
+            c_fullname=fullname,
+            c_hlevel=calc_hlevel(fullname),
+            c_visualattributes='FA' if self.omit_fas else 'FAS',
+            c_facttablecolumn='@',
+            c_tablename='STUDY',
+            c_columnname='STUDY_ID',
+            c_operator='=',
+            c_name=path_converter(self.study.study_name),
+            c_dimcode=self.study.study_id,
+        )
 
         yield row
 
-        parent_nodes = row.c_fullname.strip(Defaults.DELIMITER).split(Defaults.DELIMITER)
+        parent_nodes = fullname.strip(Defaults.DELIMITER).split(Defaults.DELIMITER)
         path = Defaults.DELIMITER
         for i, parent in enumerate(parent_nodes[:-1]):
-            row = row.copy()
             path = '{}{}{}'.format(path, parent, Defaults.DELIMITER)
-            row.c_fullname = path
-            row.c_name = parent
-            row.c_hlevel = i
-            row.c_visualattributes = 'CA'
-            row.c_tablename = '@'
-            row.c_columnname = '@'
-            row.c_dimcode = '@'
-            row.secure_obj_token = Defaults.PUBLIC_TOKEN
-            row.sourcesystem_cd = None
+            row = self._build_row(
+                row,
+                c_fullname=path,
+                c_name=parent,
+                c_hlevel=i,
+                c_visualattributes='CA',
+                c_tablename='@',
+                c_columnname='@',
+                c_dimcode='@',
+                secure_obj_token=Defaults.PUBLIC_TOKEN,
+                sourcesystem_cd=None,
+            )
 
             yield row
 
     def add_ontology_tree(self):
         """ Create rows for ontology terms. """
+        basecode = self._column_index['c_basecode']
+        rows_by_code = {}
+        for row in self._rows:
+            rows_by_code.setdefault(row[basecode], row)
+
         for concept_row in self.study.Clinical.OntologyMapping.tree.get_concept_rows(single_row_per_concept=False):
 
             concept_code, concept_path, concept_name, _ = concept_row
 
             # This filters out concepts that have no associated data points (not defined in column mapping)
-            rows = self.df[self.df.c_basecode == concept_code].copy()
-            if len(rows) == 0:
+            row = rows_by_code.get(concept_code)
+            if row is None:
                 continue
 
-            row = rows.iloc[[0]].copy()
-            row.c_fullname = self.sanitize_path(concept_path)
-            row.c_hlevel = calc_hlevel(concept_path)
-            row.c_name = concept_name
-            row.sourcesystem_cd = None
-            row.secure_obj_token = Defaults.PUBLIC_TOKEN
-            self.df = self.df.append(row, ignore_index=True, verify_integrity=False)
+            self._rows.append(self._build_row(
+                row,
+                c_fullname=self.sanitize_path(concept_path),
+                c_hlevel=calc_hlevel(concept_path),
+                c_name=concept_name,
+                sourcesystem_cd=None,
+                secure_obj_token=Defaults.PUBLIC_TOKEN,
+            ))
 
     def add_missing_folders(self):
-        """ Add rows for all parent folders not present yet. """
-        self._paths_set = set(self.df.c_fullname)
-        self.df.apply(lambda x: self._add_folders(x.c_fullname), axis=1)
-
-    def _add_folders(self, path):
-        """ Strips the path leaf and adds it to the frame if it does not exist. """
-        parent = path.rsplit('\\', 2)[0] + '\\'
-        if parent == '\\':
-            return
-        if parent not in self._paths_set:
-            self.add_folder_row(parent)
-        self._add_folders(parent)
-
-    def add_folder_row(self, path):
-        row = self.row
-        row.c_fullname = path
-        row.c_dimcode = path
-        row.c_hlevel = calc_hlevel(path)
-        row.c_name = path.strip(Defaults.DELIMITER).split(Defaults.DELIMITER)[-1]
-
-        if not path.startswith(self.sanitize_path(self.study.top_node)):
-            row.sourcesystem_cd = None
-            row.secure_obj_token = Defaults.PUBLIC_TOKEN
-
-        self._paths_set.add(path)
-        self.df = self.df.append(row, ignore_index=True, verify_integrity=False)
+        """
+        Add rows for all parent folders not present yet. All paths are put in a
+        trie first, after which the folders missing for each row are found in a
+        single walk down its path. Folders are added in the order of the rows they
+        were found for, deepest folder first.
+        """
+        fullname = self._column_index['c_fullname']
+        paths = [row[fullname] for row in self._rows]
+
+        root = _PathNode()
+        for path in paths:
+            node = root
+            for part in path[1:-1].split(Defaults.DELIMITER):
+                node = node.children.setdefault(part, _PathNode())
+            node.has_row = True
+
+        top_node = self.sanitize_path(self.study.top_node)
+        for path in paths:
+            node = root
+            parent = Defaults.DELIMITER
+            missing = []
+            for part in path[1:-1].split(Defaults.DELIMITER)[:-1]:
+                node = node.children[part]
+                parent = '{}{}{}'.format(parent, part, Defaults.DELIMITER)
+                if not node.has_row:
+                    node.has_row = True
+                    missing.append(parent)
+            self._rows += [self.add_folder_row(folder, top_node) for folder in reversed(missing)]
+
+        self.df = pd.DataFrame(self._rows, columns=self.columns)
+
+    def add_folder_row(self, path, top_node=None):
+        """ Create a row for a folder, which is public if it is not in the study. """
+        if top_node is None:
+            top_node = self.sanitize_path(self.study.top_node)
+
+        values = {}
+        if not path.startswith(top_node):
+            values.update(sourcesystem_cd=None, secure_obj_token=Defaults.PUBLIC_TOKEN)
+
+        return self._build_row(
+            c_fullname=path,
+            c_dimcode=path,
+            c_hlevel=calc_hlevel(path),
+            c_name=path.strip(Defaults.DELIMITER).split(Defaults.DELIMITER)[-1],
+            **values
+        )
 
     @property
     def _row_definition(self):
@@ -1,5 +1,5 @@
-from ..shared import TableRow, path_slash_all
-from tmtk.utils import path_converter
+from ..shared import TableRow, paths_slash_all
+from tmtk.utils import path_converter_series
 
 import pandas as pd
 
@@ -17,9 +17,7 @@ class I2B2Tags(TableRow):
                                 'tags_idx': study.Tags.df.iloc[:, 3],
                                 }, columns=self.columns)
 
-        self.df.path = self.df.path.apply(lambda x:
-                                          path_slash_all(path_converter('{}\\{}'.format(self.study.top_node, x)))
-                                          )
+        self.df.path = paths_slash_all(path_converter_series(self.study.top_node + '\\' + self.df.path.astype(str)))
         self.df.tags_idx = self.df.tags_idx.astype(pd.np.int64)
 
         self.df.iloc[:, 0] = self.df.index
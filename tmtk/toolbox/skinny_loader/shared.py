@@ -1,7 +1,11 @@
 from ...utils import path_converter
 
+import re
+
 import arrow
+import numpy as np
 import pandas as pd
+from pandas.api.types import is_datetime64_any_dtype
 
 class TableRow:
     """ Used as base class to create table rows from a pd.Series object defined in child class. """
@@ -66,12 +70,62 @@ def path_slash_all(path):
     return path
 
 
+def paths_slash_all(paths):
+    """Vectorised variant of path_slash_all for a `pd.Series` of paths."""
+    paths = paths.where(paths.str.startswith('\\'), '\\' + paths)
+    return paths.where(paths.str.endswith('\\'), paths + '\\')
+
+
 def get_unix_timestamp(date):
     """ Returns timestamp if date is not None or pd.np.nan, else returns nan """
-    if date not in (None, pd.np.nan):
+    if date is not None and not pd.isnull(date):
         try:
             return arrow.get(date).format('X') + '000'  # transmart needs milliseconds
         except OSError:
             return pd.np.nan
     else:
         return pd.np.nan
+
+
+# Date formats that are parsed with pd.to_datetime instead of arrow, by a pattern they must match exactly.
+_ISO_DATE_FORMATS = ((re.compile(r'^\d{4}-\d{2}-\d{2}$'), '%Y-%m-%d'),
+                     (re.compile(r'^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}$'), '%Y-%m-%d %H:%M:%S'),
+                     (re.compile(r'^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}$'), '%Y-%m-%dT%H:%M:%S'))
+
+# Depending on the version, arrow formats timestamps as integers or as floats.
+_FLOAT_TIMESTAMPS = arrow.get(0).format('X') != '0'
+
+
+def get_unix_timestamps(values):
+    """
+    Vectorised get_unix_timestamp, which converts every distinct value only once.
+    Dates in common ISO 8601 formats and datetimes are converted with pandas,
+    other values with arrow.
+
+    :param values: `pd.Series` or array of dates.
+    :return: object array with a timestamp string or nan for every value.
+    """
+    codes, uniques = pd.factorize(pd.Series(values))
+    uniques = pd.Series(uniques)
+
+    if is_datetime64_any_dtype(uniques):
+        parsed = uniques
+    else:
+        parsed = pd.Series(pd.NaT, index=uniques.index)
+        for pattern, fmt in _ISO_DATE_FORMATS:
+            matches = uniques.map(lambda v: isinstance(v, str) and pattern.match(v) is not None).astype(bool)
+            if matches.any():
+                parsed[matches] = pd.to_datetime(uniques[matches], format=fmt, errors='coerce')
+
+    # Nanoseconds since epoch, only whole seconds are converted here.
+    nanoseconds = parsed.values.astype('datetime64[ns]').astype(np.int64)
+    fast = (parsed.notnull() & (nanoseconds % 10 ** 9 == 0)).values
+
+    timestamps = np.empty(len(uniques), dtype=object)
+    seconds = nanoseconds[fast] // 10 ** 9
+    timestamps[fast] = [(repr(float(x)) if _FLOAT_TIMESTAMPS else str(x)) + '000' for x in seconds]
+    timestamps[~fast] = [get_unix_timestamp(v) for v in uniques[~fast]]
+
+    result = np.full(len(codes), np.nan, dtype=object)
+    result[codes >= 0] = timestamps[codes[codes >= 0]]
+    return result
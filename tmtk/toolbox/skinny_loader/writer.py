@@ -0,0 +1,124 @@
+import os
+import shutil
+from collections import namedtuple
+
+from ...utils import open_file
+from ...utils.compression import COMPRESSION_EXTENSIONS
+
+# Number of characters of text collected before it is written to the file.
+BLOCK_SIZE = 1 << 23
+
+# Number of rows of a dataframe that are converted to text at once.
+BLOCK_ROWS = 100000
+
+TableStats = namedtuple('TableStats', ['path', 'rows', 'bytes'])
+
+
+def table_path(path, compression=None):
+    """
+    Path of a table file written with the given compression, i.e. with the
+    extension of that compression added.
+
+    :param path: path of the uncompressed file.
+    :param compression: None, 'gzip', 'bz2', 'xz' or 'zstd'.
+    :return: path.
+    """
+    if compression is None:
+        return path
+    for extension, name in COMPRESSION_EXTENSIONS.items():
+        if name == compression:
+            return path + extension
+    raise ValueError('Unknown compression: {!r}.'.format(compression))
+
+
+class TableWriter:
+    """
+    Streaming writer for tab separated tables. Dataframes are converted to text
+    in the same way as by ``pd.DataFrame.to_csv``, collected in blocks of
+    BLOCK_SIZE characters, and written to the (compressed) file. The number of
+    rows written is counted.
+
+    Example usage:
+    ```
+        with TableWriter('observation_fact.tsv.gz', columns) as writer:
+            for df in frames:
+                writer.write(df)
+        print(writer.stats)
+    ```
+    """
+
+    def __init__(self, path, columns=None, compression='infer', block_size=BLOCK_SIZE):
+        """
+        :param path: path to write to.
+        :param columns: if given, these column names are written as header.
+        :param compression: 'infer' (default) to use the file extension, None or a compression name.
+        :param block_size: number of characters to collect before writing.
+        """
+        self.path = path
+        self.rows = 0
+        self.block_size = block_size
+        self._blocks = []
+        self._buffered = 0
+        self._file = open_file(path, 'w', compression=compression)
+
+        if columns is not None:
+            self.write_text('\t'.join(columns) + '\n')
+
+    def __repr__(self):
+        return 'TableWriter ({})'.format(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def write(self, df):
+        """
+        Add the rows of a dataframe to the table, without header and index.
+
+        :param df: `pd.DataFrame`.
+        """
+        for start in range(0, df.shape[0], BLOCK_ROWS):
+            chunk = df.iloc[start:start + BLOCK_ROWS]
+            self.write_text(chunk.to_csv(sep='\t', index=False, header=False))
+            self.rows += chunk.shape[0]
+
+    def write_text(self, text):
+        """Add text to the table as it is."""
+        self._blocks.append(text)
+        self._buffered += len(text)
+        if self._buffered >= self.block_size:
+            self.flush()
+
+    def flush(self):
+        """Write all collected text to the file."""
+        if self._blocks:
+            self._file.write(''.join(self._blocks))
+            self._blocks = []
+            self._buffered = 0
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    @property
+    def stats(self):
+        """Path, number of rows and number of bytes on disk, available after closing."""
+        return TableStats(self.path, self.rows, os.path.getsize(self.path))
+
+
+def append_files(path, paths):
+    """
+    Append the contents of files to a file as they are. This also works for
+    files with the same compression, as gzip, bz2, xz and zstd files can hold
+    multiple compressed parts after each other.
+
+    :param path: file to append to.
+    :param paths: files to append.
+    """
+    with open(path, 'ab') as f:
+        for part in paths:
+            with open(part, 'rb') as src:
+                shutil.copyfileobj(src, f, 1 << 20)
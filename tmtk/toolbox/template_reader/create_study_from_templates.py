@@ -60,6 +60,7 @@ def template_reader(template_file, source_dir=None) -> Study:
 
     # Add clinical data files to the study
     source_dir_files = {path.name: path for path in source_dir.glob('*')}
+    datafiles = []
     for data_source in sheet_dict['tree structure'].data_sources:
         if data_source in template.sheet_names:
             data_df = template.parse(data_source, comment=COMMENT)
@@ -67,7 +68,8 @@ def template_reader(template_file, source_dir=None) -> Study:
             if data_source not in source_dir_files:
                 raise TemplateException('Data source "{}" not found in template or source_dir'.format(data_source))
             data_df = _get_external_source_df(source_dir_files[data_source])
-        study.Clinical.add_datafile(filename='{}.txt'.format(Path(data_source).stem), dataframe=data_df)
+        datafiles.append(('{}.txt'.format(Path(data_source).stem), data_df))
+    study.Clinical.add_datafiles(datafiles)
 
     # Process 17.x sheets
     if not tmtk.options.transmart_batch_mode:
@@ -1,12 +1,16 @@
 import os
 import pandas as pd
 import random
+import shutil
 from IPython.display import YouTubeVideo
 import hashlib
 import re
+from functools import lru_cache
 
+from tmtk import options
 from .Exceptions import *
 from .mappings import Mappings
+from .compression import compression_of, open_file
 
 
 def clean_for_namespace(path) -> str:
@@ -50,17 +54,18 @@ def summarise(list_or_dict=None, max_items: int = 7) -> str:
 
 def file2df(path=None):
     """
-    Load a file specified by path into a Pandas dataframe.  If hashed is True, return a
-    a (dataframe, hash) value tuple.
+    Load a file specified by path into a Pandas dataframe. Compressed files
+    (.gz, .bz2, .xz, .zst) are decompressed while reading.
 
     :param path: to file to load
     :return: `pd.DataFrame`
     """
     if not os.path.exists(path):
         raise PathError('File ({}) does not exist.'.format(path))
-    df = pd.read_csv(path,
-                     sep='\t',
-                     dtype=object)
+    with open_file(path) as f:
+        df = pd.read_csv(f,
+                         sep='\t',
+                         dtype=object)
     return df
 
 
@@ -74,14 +79,20 @@ def md5(s: str):
     return hashlib.md5(s.encode('utf-8')).hexdigest()
 
 
-def df2file(df=None, path=None, overwrite=False, **kwargs):
+def df2file(df=None, path=None, overwrite=False, path_columns=None, chunksize=100000, **kwargs):
     """
     Write a dataframe to file safely.  Does not overwrite existing files
-    automatically. This function converts concept path delimiters.
+    automatically. This function converts concept path delimiters, without
+    changing the dataframe itself. Rows are written to a temporary file in
+    chunks, which replaces the file in path when everything has been written.
+    Paths ending with .gz, .bz2, .xz or .zst are written compressed.
 
     :param df: `pd.DataFrame`
     :param path: path to write to
     :param overwrite: False (default) or True
+    :param path_columns: positions of the columns that hold concept paths. By
+        default delimiters are converted in all text columns.
+    :param chunksize: number of rows written at once.
     :param kwargs: all kwargs are passed on to ``pd.DataFrame.to_csv()``
     """
     if not path:
@@ -90,14 +101,113 @@ def df2file(df=None, path=None, overwrite=False, **kwargs):
     if not overwrite and os.path.exists(path):
         raise PathError("{} already exists. Consider setting `overwrite=True`".format(path))
 
-    os.makedirs(os.path.dirname(path), exist_ok=True)
+    dirname, basename = os.path.split(os.path.abspath(path))
+    os.makedirs(dirname, exist_ok=True)
+
+    if path_columns is None:
+        path_columns = [i for i, dtype in enumerate(df.dtypes) if dtype == object]
+
+    header = kwargs.pop('header', True)
+    encoding = kwargs.pop('encoding', 'utf-8')
+    tmp_path = os.path.join(dirname, '.{}.{}.tmp'.format(basename, os.getpid()))
+
+    try:
+        with open_file(tmp_path, 'w', compression=compression_of(path), encoding=encoding, newline='') as f:
+            for start in range(0, max(df.shape[0], 1), chunksize):
+                chunk = _convert_path_delimiters(df.iloc[start:start + chunksize], path_columns)
+                chunk.to_csv(f,
+                             sep='\t',
+                             index=False,
+                             header=header if start == 0 else False,
+                             **kwargs)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def copy_file(src, dst, overwrite=False, hardlink=None):
+    """
+    Copy a file safely. Does not overwrite existing files automatically.
+    The copy is a reflink (copy on write clone) where the file system supports
+    it, or a hard link if requested, and a regular byte copy otherwise. Like
+    :func:`df2file`, the file is first written under a temporary name.
+
+    :param src: path of the file to copy.
+    :param dst: path to copy to.
+    :param overwrite: False (default) or True
+    :param hardlink: if True, hard link instead of copy, defaults to `tmtk.options.write_hardlinks`.
+    """
+    if not dst:
+        raise PathError(dst)
+
+    if os.path.exists(dst):
+        if os.path.samefile(src, dst):
+            return
+        if not overwrite:
+            raise PathError("{} already exists. Consider setting `overwrite=True`".format(dst))
+
+    dirname, basename = os.path.split(os.path.abspath(dst))
+    os.makedirs(dirname, exist_ok=True)
+    tmp_path = os.path.join(dirname, '.{}.{}.tmp'.format(basename, os.getpid()))
+
+    hardlink = options.write_hardlinks if hardlink is None else hardlink
+
+    try:
+        if not (hardlink and _try_hardlink(src, tmp_path)) and not _try_reflink(src, tmp_path):
+            shutil.copyfile(src, tmp_path)
+        os.replace(tmp_path, dst)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _try_hardlink(src, dst):
+    try:
+        os.link(src, dst)
+        return True
+    except OSError:
+        return False
+
 
-    df.replace(Mappings.PATH_DELIM, '\\\\', inplace=True, regex=True)
+# ioctl request code to clone a file on Linux file systems like btrfs and xfs.
+_FICLONE = 0x40049409
 
-    df.to_csv(path,
-              sep='\t',
-              index=False,
-              **kwargs)
+
+def _try_reflink(src, dst):
+    try:
+        import fcntl
+    except ImportError:
+        return False
+
+    try:
+        with open(src, 'rb') as s, open(dst, 'wb') as d:
+            fcntl.ioctl(d.fileno(), _FICLONE, s.fileno())
+        return True
+    except OSError:
+        if os.path.exists(dst):
+            os.remove(dst)
+        return False
+
+
+def _convert_path_delimiters(df, path_columns):
+    """
+    Return dataframe with internal concept path delimiters replaced by backslashes
+    in the given column positions. The original dataframe is not changed.
+    """
+    if not path_columns:
+        return df
+
+    columns = [df.iloc[:, i] for i in range(df.shape[1])]
+    for i in path_columns:
+        columns[i] = columns[i].map(lambda x: x.replace(Mappings.PATH_DELIM, Mappings.EXT_PATH_DELIM)
+                                    if isinstance(x, str) else x)
+
+    converted = pd.concat(columns, axis=1)
+    converted.columns = df.columns
+    return converted
 
 
 def find_fully_unique_columns(df):
@@ -129,31 +239,47 @@ def fix_everything():
     return YouTubeVideo('dQw4w9WgXcQ', autoplay=True)
 
 
+# Maximum number of converted paths remembered by path_converter.
+PATH_CACHE_SIZE = 2 ** 16
+
+_ESCAPE_PLUS = re.compile('\\\\*\\+')
+_ESCAPE_UNDERSCORE = re.compile('\\\\*_')
+_UNESCAPED_UNDERSCORE = re.compile('(?<!\\\\)_')
+_UNESCAPED_PLUS = re.compile('(?<!\\\\)\\+')
+_BACKSLASH = re.compile('\\\\(?![_+])')
+
+
 def path_converter(path, to_internal=False, from_internal=False):
     """
     Convert paths by creating delimiters of backslash "\" and "+" sign, additionally converting
-    underscores "_" to a single space.
+    underscores "_" to a single space. Results are memoised, see `PATH_CACHE_SIZE`, use
+    :func:`path_converter_series` to convert a whole column.
 
     :param path: concept path
     :param to_internal: if path is for internal use delimit with Mappings.PATH_DELIM
     :param from_internal: replace + and _ with escaped versions.
     :return: delimited path
     """
+    return _convert_path(path, to_internal, from_internal)
+
+
+@lru_cache(maxsize=PATH_CACHE_SIZE)
+def _convert_path(path, to_internal, from_internal):
     delimiter = Mappings.PATH_DELIM
 
     # is expected to have come from arborist.
     if from_internal:
         # Make sure all + and _ are escaped
-        path = re.sub('\\\\*\+', '\\+', path)
-        path = re.sub('\\\\*_', '\\_', path)
+        path = _ESCAPE_PLUS.sub('\\+', path)
+        path = _ESCAPE_UNDERSCORE.sub('\\_', path)
     else:
         # Using negative look behind replace unescaped _ and +
-        path = re.sub('(?<!\\\\)_', ' ', path)
-        path = re.sub('(?<!\\\\)\\+', delimiter, path)
+        path = _UNESCAPED_UNDERSCORE.sub(' ', path)
+        path = _UNESCAPED_PLUS.sub(delimiter, path)
 
     # Use negative look ahead to replace all backslashes not
     # followed by + or _ with a internal delimiter.
-    path = re.sub('\\\\(?![_+])', delimiter, path)
+    path = _BACKSLASH.sub(delimiter, path)
 
     path = path.strip(delimiter)
 
@@ -171,6 +297,55 @@ def path_converter(path, to_internal=False, from_internal=False):
     return path
 
 
+def _str_sub(series, pattern, repl):
+    """Regular expression substitution on a series of strings, for all supported pandas versions."""
+    try:
+        return series.str.replace(pattern, repl, regex=True)
+    except TypeError:
+        return series.str.replace(pattern, repl)
+
+
+def _str_replace(series, old, new):
+    """Literal replacement on a series of strings, for all supported pandas versions."""
+    try:
+        return series.str.replace(old, new, regex=False)
+    except TypeError:
+        return series.map(lambda x: x.replace(old, new) if isinstance(x, str) else x)
+
+
+def path_converter_series(paths, to_internal=False, from_internal=False):
+    """
+    Vectorised variant of :func:`path_converter` that converts a whole column at once,
+    with identical results. Values that are not strings become NaN.
+
+    :param paths: `pd.Series` with concept paths.
+    :param to_internal: if path is for internal use delimit with Mappings.PATH_DELIM
+    :param from_internal: replace + and _ with escaped versions.
+    :return: `pd.Series` with delimited paths.
+    """
+    delimiter = Mappings.PATH_DELIM
+    paths = pd.Series(paths, dtype=object)
+
+    if from_internal:
+        paths = _str_sub(paths, _ESCAPE_PLUS.pattern, '\\+')
+        paths = _str_sub(paths, _ESCAPE_UNDERSCORE.pattern, '\\_')
+    else:
+        paths = _str_sub(paths, _UNESCAPED_UNDERSCORE.pattern, ' ')
+        paths = _str_sub(paths, _UNESCAPED_PLUS.pattern, delimiter)
+
+    paths = _str_sub(paths, _BACKSLASH.pattern, delimiter)
+    paths = paths.str.strip(delimiter)
+    paths = _str_sub(paths, r'{}+'.format(delimiter * 2), r'{}'.format(delimiter))
+
+    if to_internal:
+        paths = _str_replace(paths, '\\_', '_')
+        paths = _str_replace(paths, '\\+', '+')
+    else:
+        paths = _str_replace(paths, Mappings.PATH_DELIM, Mappings.EXT_PATH_DELIM)
+
+    return paths
+
+
 def path_join(*args):
     """
     Join items with the used path delimiter.
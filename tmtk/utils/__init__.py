@@ -1,10 +1,13 @@
 from .cached_property import cached_property
-from .Generic import (clean_for_namespace, df2file, find_fully_unique_columns, summarise,
-                      file2df, fix_everything, md5, path_converter, path_join, is_not_a_value,
+from .compression import compression_of, find_file, open_file
+from .Generic import (clean_for_namespace, df2file, copy_file, find_fully_unique_columns, summarise,
+                      file2df, fix_everything, md5, path_converter, path_converter_series, path_join, is_not_a_value,
                       merge_two_dicts, column_map_diff, word_map_diff)
 from .Exceptions import (PathError, ClassError, DatatypeError, ReservedKeywordException, TooManyValues,
                          BlueprintException, ArboristException)
 from .mappings import Mappings
 from .batch import TransmartBatch
 from .validate import ValidateMixin, Message
+from .file_cache import clear_df_cache
+from .manifest import Manifest
 from .filebase import FileBase
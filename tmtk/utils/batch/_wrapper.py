@@ -15,6 +15,7 @@ from tqdm import tqdm
 from tmtk import options
 from ._job_descriptions import job_map
 from ..Generic import clean_for_namespace
+from ..compression import open_file
 
 logger = logging.getLogger('tmtk')
 logger.setLevel(level=logging.INFO)
@@ -98,7 +99,7 @@ class Destinations:
 
 
 def file_length(fname):
-    with open(fname, 'r') as f:
+    with open_file(fname) as f:
         return sum(1 for _ in f) - 1
 
 
@@ -286,7 +287,9 @@ class StatusParser:
     def items_expected(self, path_dict):
         """ The dict present has a specific format, this translates it to params: expected_items pairs """
         for k, v in path_dict.items():
-            if type(v[0]) == int:
+            if type(v) == int:
+                continue
+            elif type(v[0]) == int:
                 path_dict[k] = v[0] * file_length(v[1])
             else:
                 path_dict[k] = sum([file_length(n) for n in v])
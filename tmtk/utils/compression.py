@@ -0,0 +1,89 @@
+import bz2
+import gzip
+import io
+import lzma
+import os
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# File extensions of compressed files and the name of their compression.
+COMPRESSION_EXTENSIONS = {'.gz': 'gzip',
+                          '.bz2': 'bz2',
+                          '.xz': 'xz',
+                          '.zst': 'zstd'}
+
+_OPENERS = {'gzip': gzip.open,
+            'bz2': bz2.open,
+            'xz': lzma.open}
+
+
+def compression_of(path):
+    """
+    Name of the compression of a file based on its extension, or None for
+    uncompressed files.
+
+    :param path: path to file.
+    :return: 'gzip', 'bz2', 'xz', 'zstd' or None.
+    """
+    return COMPRESSION_EXTENSIONS.get(os.path.splitext(str(path))[1].lower())
+
+
+def find_file(path):
+    """
+    Return path if it exists, else the path of a compressed version of the
+    same file (e.g. data.tsv.gz for data.tsv) if that exists. If neither
+    exists, path is returned unchanged.
+
+    :param path: path to file.
+    :return: path.
+    """
+    if os.path.exists(path) or compression_of(path):
+        return path
+    for extension in COMPRESSION_EXTENSIONS:
+        if os.path.exists(path + extension):
+            return path + extension
+    return path
+
+
+def open_file(path, mode='r', compression='infer', encoding='utf-8', newline=None):
+    """
+    Open a file for streaming reading or writing, with transparent (de)compression
+    for gzip, bz2, xz and, if the zstandard package is installed, zstd files.
+
+    :param path: path to file.
+    :param mode: 'r', 'w' or 'a', with 'b' for binary mode.
+    :param compression: 'infer' (default) to use the file extension, None or a compression name.
+    :param encoding: encoding used in text mode.
+    :param newline: newline handling in text mode, see :func:`open`.
+    :return: file object.
+    """
+    if compression == 'infer':
+        compression = compression_of(path)
+
+    binary = 'b' in mode
+    mode = mode.replace('b', '').replace('t', '')
+    text_kwargs = {} if binary else {'encoding': encoding, 'newline': newline}
+
+    if compression is None:
+        return open(path, mode + ('b' if binary else ''), **text_kwargs)
+
+    if compression in _OPENERS:
+        return _OPENERS[compression](path, mode + ('b' if binary else 't'), **text_kwargs)
+
+    if compression != 'zstd':
+        raise ValueError('Unknown compression: {!r}.'.format(compression))
+
+    if zstandard is None:
+        raise ImportError('Reading or writing zstd compressed files ({}) requires '
+                          'the zstandard package.'.format(path))
+
+    f = open(path, mode + 'b')
+    if mode == 'r':
+        stream = zstandard.ZstdDecompressor().stream_reader(f, closefd=True)
+    else:
+        stream = zstandard.ZstdCompressor().stream_writer(f, closefd=True)
+
+    return stream if binary else io.TextIOWrapper(stream, **text_kwargs)
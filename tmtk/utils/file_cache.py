@@ -0,0 +1,196 @@
+import glob
+import hashlib
+import os
+import pickle
+
+import pandas as pd
+
+from tmtk import options
+
+CACHE_SUFFIX = '.tmtkcache'
+CACHE_FORMAT_VERSION = 1
+
+# Block size used when streaming file contents for hashing.
+_BLOCK_SIZE = 1 << 20
+
+
+def content_hash(path) -> str:
+    """
+    Streaming sha1 hex digest of the bytes in a file.
+
+    :param path: path to file.
+    :return: hex digest string.
+    """
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(_BLOCK_SIZE), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def file_signature(path, with_hash=False) -> dict:
+    """
+    Describes the state of a file on disk by its absolute path, size and
+    modification time. Optionally adds a content hash.
+
+    :param path: path to file.
+    :param with_hash: if True, add a sha1 hash of the file contents.
+    :return: dict.
+    """
+    stat = os.stat(path)
+    signature = {'path': os.path.abspath(path),
+                 'size': stat.st_size,
+                 'mtime': stat.st_mtime_ns}
+    if with_hash:
+        signature['hash'] = content_hash(path)
+    return signature
+
+
+def same_state(signature, current) -> bool:
+    """
+    Check whether two signatures describe the same file state by size and
+    modification time, without reading the file. The path is not compared, so
+    that copied files are recognized as well.
+
+    :param signature: dict as created by :func:`file_signature`.
+    :param current: dict as created by :func:`file_signature`.
+    :return: bool.
+    """
+    return (signature is not None and current is not None
+            and signature.get('size') == current.get('size')
+            and signature.get('mtime') == current.get('mtime'))
+
+
+def signature_matches(signature, path) -> bool:
+    """
+    Check whether a previously taken signature still describes the file in path.
+    Size has to match. If the modification time differs, the content hash is
+    compared so that touched or copied files are still recognized. The path is
+    not compared, as the signature is always stored under the path of the file.
+
+    :param signature: dict as created by :func:`file_signature`.
+    :param path: path to file.
+    :return: bool.
+    """
+    if not signature or not os.path.exists(path):
+        return False
+
+    current = file_signature(path)
+    if current['size'] != signature.get('size'):
+        return False
+
+    if same_state(signature, current):
+        return True
+
+    return signature.get('hash') is not None and content_hash(path) == signature.get('hash')
+
+
+def cache_path(path, suffix='') -> str:
+    """
+    Location of the cache file for a data file. This is a hidden file next to the data file,
+    unless ``tmtk.options.df_cache_dir`` is set.
+
+    :param path: path to data file.
+    :param suffix: added to the name of the cache file, used for other caches of the same file.
+    :return: path to cache file.
+    """
+    path = os.path.abspath(path)
+    if options.df_cache_dir:
+        name = hashlib.sha1(path.encode('utf-8')).hexdigest()
+        return os.path.join(os.path.expanduser(options.df_cache_dir), name + CACHE_SUFFIX + suffix)
+
+    dirname, basename = os.path.split(path)
+    return os.path.join(dirname, '.{}{}{}'.format(basename, CACHE_SUFFIX, suffix))
+
+
+def _cache_meta(signature):
+    return {'format': CACHE_FORMAT_VERSION,
+            'pandas': pd.__version__,
+            'signature': signature}
+
+
+def read_df_cache(path):
+    """
+    Load the cached dataframe for a data file. Returns None if there is no cache,
+    or if the cache is stale or unreadable.
+
+    :param path: path to data file.
+    :return: `pd.DataFrame` or None.
+    """
+    cache = cache_path(path)
+    if not os.path.exists(cache):
+        return None
+
+    try:
+        with open(cache, 'rb') as f:
+            meta = pickle.load(f)
+            if meta.get('format') != CACHE_FORMAT_VERSION or meta.get('pandas') != pd.__version__:
+                return None
+
+            signature = meta.get('signature')
+            if not signature_matches(signature, path):
+                return None
+
+            df = pickle.load(f)
+
+    except Exception:
+        return None
+
+    # Data file was touched, but has the same contents. Refresh the cache so
+    # the content hash does not have to be recomputed on the next load.
+    if signature.get('mtime') != os.stat(path).st_mtime_ns:
+        write_df_cache(path, df)
+
+    return df
+
+
+def write_df_cache(path, df):
+    """
+    Write dataframe loaded from path to its cache file. Failures to write,
+    e.g. on read only file systems, are ignored.
+
+    :param path: path to data file the dataframe was loaded from.
+    :param df: `pd.DataFrame`.
+    """
+    cache = cache_path(path)
+    tmp_path = '{}.{}.tmp'.format(cache, os.getpid())
+    try:
+        os.makedirs(os.path.dirname(cache), exist_ok=True)
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(_cache_meta(file_signature(path, with_hash=True)), f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache)
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+def clear_df_cache(path=None) -> int:
+    """
+    Remove cache files, including other caches stored under the same name
+    (e.g. matrix stores). If path points to a data file, only its caches are removed.
+    If it points to a directory all cache files in that directory tree are
+    removed. If no path is given, the ``tmtk.options.df_cache_dir`` is emptied.
+
+    :param path: data file, directory or None.
+    :return: number of cache files removed.
+    """
+    if path is None:
+        if not options.df_cache_dir:
+            return 0
+        caches = glob.glob(os.path.join(os.path.expanduser(options.df_cache_dir), '*' + CACHE_SUFFIX + '*'))
+    elif os.path.isdir(path):
+        caches = glob.glob(os.path.join(path, '**', '.*' + CACHE_SUFFIX + '*'), recursive=True)
+    else:
+        caches = glob.glob(glob.escape(cache_path(path)) + '*')
+
+    removed = 0
+    for cache in caches:
+        try:
+            os.remove(cache)
+            removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
@@ -1,14 +1,43 @@
 import os
 from hashlib import sha256
 
+import numpy as np
 import pandas as pd
 from pandas.util import hash_pandas_object
 
-from . import file2df, df2file, cached_property, Message
+from tmtk import options
+from . import file2df, df2file, copy_file, cached_property, Message
+from .compression import open_file
+from .file_cache import read_df_cache, write_df_cache, clear_df_cache, file_signature, signature_matches
 
 
-def hash_df_to_single_int(df) -> int:
-    return int.from_bytes(sha256(pd.util.hash_pandas_object(df).values).digest(), 'big')
+def hash_df_to_single_int(df, index=True) -> int:
+    return int.from_bytes(sha256(hash_pandas_object(df, index=index).values).digest(), 'big')
+
+
+def same_values(a, b) -> bool:
+    """
+    Check whether two column arrays, e.g. a column and its copy taken earlier, hold
+    the same values. Object arrays are compared element wise, which is a pointer
+    comparison for values that were not replaced, and missing values in the same
+    places are equal. Other arrays are compared byte for byte.
+
+    :param a: `np.ndarray` or `pd.Categorical`.
+    :param b: `np.ndarray` or `pd.Categorical`.
+    :return: bool.
+    """
+    if type(a) is not type(b) or a.shape != b.shape or a.dtype != b.dtype:
+        return False
+    if isinstance(a, pd.Categorical):
+        return a.categories.equals(b.categories) and same_values(a.codes, b.codes)
+    if not isinstance(a, np.ndarray):
+        return pd.Series(a).equals(pd.Series(b))
+    if a is b:
+        return True
+    if a.dtype == object:
+        differ = ~(a == b)
+        return not differ.any() or bool(pd.isnull(a[differ]).all() and pd.isnull(b[differ]).all())
+    return np.array_equal(np.ascontiguousarray(a).view(np.uint8), np.ascontiguousarray(b).view(np.uint8))
 
 
 class FileBase:
@@ -16,8 +45,28 @@ class FileBase:
     Super class with shared utilities for file objects.
     """
 
+    # Positions of columns that hold concept paths. Path delimiters are only
+    # converted in these columns when writing to disk.
+    path_columns = ()
+
+    # Positions of columns of which the state at load is kept, see initial_df.
+    snapshot_columns = ()
+
     def __init__(self):
-        self._hash_init = None
+        # Change tracking: the version is bumped by every tracked modification and
+        # compared to the version at load or save. If it did not change, the columns
+        # are compared to the copies taken at load or save, see df_has_changed.
+        self._df_version = 0
+        self._clean_version = 0
+        self._clean_columns = None
+        self._clean_values = None
+        # Signature of the file on disk the dataframe was read from, None if it was created.
+        self._source_signature = None
+        # Copy of the snapshot columns of the dataframe when it was loaded.
+        self._snapshot = None
+        # Manifest of the study of this file, used for metadata of the file on
+        # disk so it is not opened again while it does not change, see tmtk.Study.
+        self._manifest = None
 
     # The df property is setup like this so dataframe are only loaded from disk on first request.
     # Upon load self._df_mods will be performed if this method has been defined.  After first
@@ -25,14 +74,42 @@ class FileBase:
     @cached_property
     def _df(self):
         if self.path and os.path.exists(self.path) and self.tabs_in_first_line():
-            df = file2df(self.path)
+            self._source_signature = file_signature(self.path)
+            df = self._read_df()
         else:
             Message.okay("Creating dataframe for: {}".format(self))
             df = self.create_df()
         df = self._df_processing(df)
-        self._hash_init = hash_df_to_single_int(df)
+        self._keep_clean_state(df)
+        self._take_snapshot(df)
         return df
 
+    def _take_snapshot(self, df):
+        columns = [i for i in self.snapshot_columns if i < df.shape[1]]
+        if columns:
+            self._snapshot = df.iloc[:, columns].copy()
+
+    def _read_df(self):
+        """
+        Read the file from disk. If `tmtk.options.df_cache` is set, the binary
+        cache of the file is used when valid, or created after parsing.
+
+        :return: `pd.DataFrame`.
+        """
+        if not options.df_cache:
+            return file2df(self.path)
+
+        df = read_df_cache(self.path)
+        if df is None:
+            df = file2df(self.path)
+            write_df_cache(self.path, df)
+        return df
+
+    def clear_cache(self):
+        """Remove the binary cache files (dataframe cache, matrix store) for this file object."""
+        if self.path:
+            clear_df_cache(self.path)
+
     @property
     def df(self):
         """The pd.DataFrame for this file object."""
@@ -42,9 +119,11 @@ class FileBase:
     def df(self, value):
         if not isinstance(value, pd.DataFrame):
             raise TypeError('Expected pd.DataFrame object.')
+        if self.snapshot_columns and not self.df_is_loaded:
+            self._df  # Load the dataframe so its initial state is kept.
         value = self._df_processing(value)
-        self._hash_init = self._hash_init if self._hash_init is not None else 1
         self._df = value
+        self.mark_changed()
 
     def _df_processing(self, df):
         """
@@ -63,15 +142,71 @@ class FileBase:
             pass
         return df
 
+    @property
+    def df_is_loaded(self):
+        """True if the dataframe has been loaded from disk or set."""
+        return '_df' in self.__dict__
+
+    @property
+    def initial_df(self):
+        """
+        The snapshot columns (see `snapshot_columns`) of the dataframe as it was
+        first loaded from disk or created, or None if it has not been loaded yet.
+
+        :return: `pd.DataFrame` or None.
+        """
+        return self._snapshot
+
+    def mark_changed(self):
+        """
+        Register that the dataframe has been modified. Use this after making in place
+        changes directly on the dataframe, which are not tracked otherwise.
+        """
+        self._df_version += 1
+
+    def _mark_clean(self):
+        """Set the current state of the dataframe as the unchanged state."""
+        self._clean_version = self._df_version
+        self._keep_clean_state(self.df)
+
+    def _keep_clean_state(self, df):
+        """
+        Keep the column labels and a copy of the values of every column. For text
+        columns this only copies references to the values, not the values themselves.
+        """
+        self._clean_columns = df.columns.copy()
+        self._clean_values = [df.iloc[:, i].values.copy() for i in range(df.shape[1])]
+
+    def _track_columns(self, columns):
+        """
+        Call before modifying columns of the dataframe in place. These changes are
+        found by :attr:`df_has_changed` without further action, subclasses use this
+        to drop information they derived from these columns.
+
+        :param columns: list of zero based column positions.
+        """
+
     def __hash__(self):
         return hash_df_to_single_int(self.df)
 
     @property
     def df_has_changed(self):
-        if self._hash_init is None:
+        """
+        True if the dataframe has been changed since it was loaded or last saved.
+        Setting a new dataframe, changes through setters of this object and calls
+        to :meth:`mark_changed` are registered without looking at the dataframe.
+        Other changes, e.g. ``df.iloc[0, 1] = 'value'``, are found by comparing the
+        columns to copies taken at load or save. For text columns that compares
+        references to the values, which is much cheaper than hashing them.
+        """
+        if not self.df_is_loaded:
             return False
-        else:
-            return hash_df_to_single_int(self.df) != self._hash_init
+        if self._df_version != self._clean_version:
+            return True
+        df = self.df
+        if not df.columns.equals(self._clean_columns) or df.shape[1] != len(self._clean_values):
+            return True
+        return any(not same_values(df.iloc[:, i].values, clean) for i, clean in enumerate(self._clean_values))
 
     @property
     def header(self):
@@ -88,24 +223,74 @@ class FileBase:
     def __repr__(self):
         return self.path
 
+    def _has_tabs(self):
+        if self._manifest is not None:
+            return self._manifest.has_tabs(self.path)
+        with open_file(self.path) as file:
+            return '\t' in file.readline()
+
     def tabs_in_first_line(self):
         """Check if file is tab delimited."""
-        with open(self.path, 'r') as file:
-            has_tab = '\t' in file.readline()
-
-        if has_tab:
+        if self._has_tabs():
             return True
         Message.warning('{} is invalid as it contains no tabs on first line.'.format(self))
 
+    @property
+    def source_is_current(self):
+        """
+        True if the file on disk has the same contents as the dataframe, so it can
+        be copied instead of written. This is the case if the dataframe has not been
+        loaded yet, or if it was read from this file and has not changed since,
+        see :attr:`df_has_changed`.
+        """
+        if not self.path or not os.path.exists(self.path):
+            return False
+
+        if not self.df_is_loaded:
+            return self._has_tabs()
+
+        if self._source_signature is None or self.df_has_changed:
+            return False
+
+        return signature_matches(self._source_signature, self.path)
+
+    def text_df(self):
+        """Dataframe as it is written to disk."""
+        return self.df
+
     def write_to(self, path, overwrite=False):
         """
-        Wrapper for :func:`tmtk.utils.df2file()`.
+        Wrapper for :func:`tmtk.utils.df2file()`. If the file on disk is still
+        current (see :attr:`source_is_current`) it is copied by
+        :func:`tmtk.utils.copy_file()` instead, without loading the dataframe.
 
         :param path: path to write file to.
         :param overwrite: write over existing files in the filesystem)
         """
-        df2file(self.df, path, overwrite=overwrite)
+        if self.source_is_current:
+            copy_file(self.path, path, overwrite=overwrite)
+        else:
+            df2file(self.text_df(), path, overwrite=overwrite, path_columns=self.path_columns)
 
     def save(self):
         """Overwrite the original file with the current dataframe."""
-        self.write_to(self.path, overwrite=True)
+        df2file(self.text_df(), self.path, overwrite=True, path_columns=self.path_columns)
+        self._mark_clean()
+        self._source_signature = file_signature(self.path)
+
+    def adopt_df(self, other):
+        """
+        Take over the loaded dataframe of another file object of the same type instead
+        of reading the file, e.g. after writing that object to the path of this one.
+        The dataframe is shared, not copied, and is the unchanged state of this object.
+
+        :param other: file object of the same type.
+        """
+        if type(other) is not type(self):
+            raise TypeError('Expected {} object.'.format(type(self).__name__))
+        df = other.df
+        self._df = df
+        self._mark_clean()
+        if self.path and os.path.exists(self.path):
+            self._source_signature = file_signature(self.path)
+        self._take_snapshot(df)
@@ -0,0 +1,152 @@
+import json
+import os
+
+from .compression import open_file
+from .file_cache import file_signature, same_state
+
+MANIFEST_FORMAT_VERSION = 2
+MANIFEST_NAME = '.study_manifest.json'
+
+# Block size used when streaming through files to count lines.
+_BLOCK_SIZE = 1 << 20
+
+
+def describe_file(path) -> dict:
+    """
+    Describe a tab separated file in a single streaming pass: size, modification
+    time, header, whether the first line contains tabs, the number of rows below
+    the header and the size of the text. Size and modification time are those of
+    the file on disk, the others those of the decompressed contents for compressed
+    files.
+
+    :param path: path to file.
+    :return: dict.
+    """
+    entry = file_signature(path)
+    first_line = b''
+    lines = 0
+    text_size = 0
+    last_block = b''
+
+    with open_file(path, 'rb') as f:
+        for block in iter(lambda: f.read(_BLOCK_SIZE), b''):
+            if not lines and not first_line.endswith(b'\n'):
+                first_line += block.split(b'\n', 1)[0] + (b'\n' if b'\n' in block else b'')
+            lines += block.count(b'\n')
+            text_size += len(block)
+            last_block = block
+
+    # Last line without a line ending still counts as a line.
+    if last_block and not last_block.endswith(b'\n'):
+        lines += 1
+
+    first_line = first_line.decode('utf-8', errors='replace').rstrip('\r\n')
+    entry.update({'header': first_line.split('\t') if first_line else [],
+                  'tabs': '\t' in first_line,
+                  'rows': max(lines - 1, 0),
+                  'text_size': text_size})
+    return entry
+
+
+class Manifest:
+    """
+    Metadata of the files in a study, stored as JSON. Entries are kept up to
+    date by comparing size and modification time of each file, so only files
+    that changed are read again.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: path to the JSON file of this manifest.
+        """
+        self.path = path
+        self.entries = {}
+        self._changed = False
+
+        if os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    content = json.load(f)
+            except (OSError, ValueError):
+                content = {}
+            if content.get('format') == MANIFEST_FORMAT_VERSION:
+                self.entries = content.get('files', {})
+
+    def __repr__(self):
+        return 'Manifest ({})'.format(self.path)
+
+    def __getitem__(self, path):
+        return self.entry(path)
+
+    def __contains__(self, path):
+        return os.path.abspath(path) in self.entries
+
+    def _is_current(self, entry, path):
+        try:
+            return same_state(entry, file_signature(path))
+        except OSError:
+            return False
+
+    def entry(self, path) -> dict:
+        """
+        Up to date metadata for a file. The file is only read if it is not in
+        the manifest yet, or if it changed.
+
+        :param path: path to file.
+        :return: dict with path, size, mtime, header, tabs, rows and text_size.
+        """
+        key = os.path.abspath(path)
+        entry = self.entries.get(key)
+        if entry is None or not self._is_current(entry, key):
+            entry = describe_file(key)
+            self.entries[key] = entry
+            self._changed = True
+        return entry
+
+    def refresh(self, paths):
+        """
+        Make sure the manifest has up to date entries for all paths, and remove
+        entries of files that no longer exist.
+
+        :param paths: iterable of file paths.
+        """
+        for path in paths:
+            if path and os.path.isfile(path):
+                self.entry(path)
+
+        for key in [k for k in self.entries if not os.path.exists(k)]:
+            del self.entries[key]
+            self._changed = True
+
+    def rows(self, path) -> int:
+        """Number of rows below the header of a file."""
+        return self.entry(path)['rows']
+
+    def header(self, path) -> list:
+        """Column names in the first line of a file."""
+        return self.entry(path)['header']
+
+    def has_tabs(self, path) -> bool:
+        """True if the first line of a file contains tabs."""
+        return self.entry(path)['tabs']
+
+    def text_size(self, path) -> int:
+        """Size in bytes of the text of a file, after decompression for compressed files."""
+        return self.entry(path)['text_size']
+
+    def save(self):
+        """Write the manifest to disk if it changed. Failures to write are ignored."""
+        if not self._changed:
+            return
+
+        tmp_path = '{}.{}.tmp'.format(self.path, os.getpid())
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump({'format': MANIFEST_FORMAT_VERSION, 'files': self.entries}, f, indent=2)
+            os.replace(tmp_path, self.path)
+            self._changed = False
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass